@@ -1,6 +1,7 @@
-import base64
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 import json
+import logging
 import os
 import datetime
 import pathlib
@@ -16,24 +17,75 @@ import google.auth.transport.requests
 from pip._vendor import cachecontrol
 from database import userdatahandler
 from werkzeug.utils import secure_filename
-import fitz  
-from PIL import Image
 import bcrypt
 from datetime import timedelta
 
 from database.admindatahandler import  is_admin
 from database.userdatahandler import ( 
+    content_hash_in_use,
     delete_image,
     get_image_by_id,
     get_images_by_user, 
     get_user_by_username, 
-    save_image, 
+    parse_search_args,
+    search_images,
+    sentiment_facets,
+    save_uploads,
     update_image,
-    save_notification,
     get_all_users
 )
 from database.databaseConfig import get_beehive_notification_collection, get_beehive_message_collection
+from database.notificationdatahandler import format_notification, notification_channels
+from database.streamticketdatahandler import STREAM_TICKET_TTL, mint_stream_ticket
+from database.chatdatahandler import (
+    DEFAULT_HISTORY_SIZE,
+    MAX_HISTORY_SIZE,
+    admin_conversation_id,
+    chat_channel,
+    format_message,
+    get_conversation_messages,
+    message_channels,
+    parse_position,
+    save_message,
+)
 from utils.clerk_auth import require_auth
+from utils.job_queue import start_background_worker
+from utils.thumbnails import THUMBNAIL_JOB, thumbnail_key
+from utils.storage import StorageError, get_storage
+from utils.media import send_media
+from utils.audio import (
+    AUDIO_EXTENSIONS,
+    MAX_VOICE_NOTE_SIZE,
+    VOICE_NOTE_JOB,
+    AudioError,
+    audio_extension,
+    data_url_reader,
+)
+from utils.pagination import parse_limit
+from utils.pubsub import get_broker, publish, use_change_streams, watch_collection
+from utils.sse import event_stream, sse_response
+from utils.response_cache import cached_response, uploads_scope
+from utils.derivatives import DERIVATIVES_JOB, VARIANTS, ensure_derivatives, remove_derivatives, supports_derivatives
+from utils.blobstore import (
+    is_blob_path,
+    release as release_blob,
+    store_file,
+    store_stream,
+)
+from database.jobdatahandler import enqueue_jobs
+from database.indexes import ensure_indexes
+from utils.chunked_upload import (
+    SESSION_FOLDER,
+    ChunkInProgress,
+    ChunkOffsetMismatch,
+    UploadError,
+    UploadTooLarge,
+    append_chunk,
+    create_session,
+    discard_session,
+    finalize_session,
+    get_session,
+)
 
 # Import blueprints
 from routes.adminroutes import admin_bp
@@ -57,13 +109,50 @@ CORS(app, resources={
 })  # Enable CORS for all routes with specific configuration
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
 app.secret_key = 'beehive'
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
-app.config['PDF_THUMBNAIL_FOLDER'] = 'static/uploads/thumbnails/'
+# Local root of the storage backend when STORAGE_BACKEND=local (see utils/storage.py)
+app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'static/uploads')
+# Partial files of resumable uploads live outside the public static folder
+app.config['CHUNKED_UPLOAD_FOLDER'] = SESSION_FOLDER
+app.config['MAX_CHUNKED_UPLOAD_SIZE'] = int(os.getenv('MAX_CHUNKED_UPLOAD_SIZE', 512 * 1024 * 1024))
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 client_secrets_file = os.path.join(pathlib.Path(__file__).parent, "client_secret.json")
 
 # Register blueprints
 app.register_blueprint(admin_bp)
+
+# Where uploads, variants and thumbnails live (local folder or S3-compatible bucket)
+storage = get_storage()
+
+# Files of an upload batch are stored in parallel, at most UPLOAD_WORKERS at a
+# time per process across all requests
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', 4))
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='upload')
+
+messages_col = get_beehive_message_collection()
+
+def start_services():
+    """Per-process startup that talks to MongoDB.
+
+    Runs at import, except under gunicorn with a preloaded app
+    (``BEEHIVE_DEFER_SERVICES=true``, set by gunicorn.conf.py), where it runs in
+    each worker after the fork so the master never opens database connections.
+    """
+    # With several worker processes, relay new chat messages and admin notifications
+    # between them via change streams
+    if use_change_streams():
+        watch_collection(messages_col, message_channels, format_message)
+        watch_collection(get_beehive_notification_collection(), notification_channels, format_notification)
+
+    # Create any missing MongoDB indexes (idempotent); see database/indexes.py
+    if os.getenv('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true':
+        try:
+            ensure_indexes()
+        except Exception as e:
+            logging.error(f"Index creation failed: {str(e)}")
+
+if os.getenv('BEEHIVE_DEFER_SERVICES', 'false').lower() != 'true':
+    start_services()
+
 flow = Flow.from_client_secrets_file(
     client_secrets_file=client_secrets_file,
     scopes=["https://www.googleapis.com/auth/userinfo.profile", "https://www.googleapis.com/auth/userinfo.email", "openid"],
@@ -117,6 +206,8 @@ def upload_images(user_id):
         title = request.form.get('title', '')
         sentiment = request.form.get('sentiment')
         description = request.form.get('description', '')
+        # Voice note as an `audio` file part; `audioData` (a base64 data URL) is still accepted from older clients
+        audio_file = request.files.get('audio')
         audio_data = request.form.get('audioData')
 
         if not files or not files[0]:
@@ -125,69 +216,336 @@ def upload_images(user_id):
         if not title or not description:
             return jsonify({'error': 'Title and description are required'}), 400
 
-        # notification_collection = get_beehive_notification_collection()
-
+        # Check every file type before writing anything
+        files = [file for file in files if file]
         for file in files:
-            if file:
-                # Check file extension
-                filename = secure_filename(file.filename)
-                file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-                if file_ext not in ALLOWED_EXTENSIONS:
-                    return jsonify({'error': f'File type not allowed. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
-
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                file.save(filepath)
-
-                # Handle audio file if provided
-                audio_filename = None
-                if audio_data:
-                    audio_filename = f"{secure_filename(title)}.wav"
-                    audio_path = os.path.join(app.config['UPLOAD_FOLDER'], audio_filename)
-                    os.makedirs(os.path.dirname(audio_path), exist_ok=True)
-                    audio_binary = base64.b64decode(audio_data.split(',')[1])
-                    with open(audio_path, "wb") as f:
-                        f.write(audio_binary)
-
-                time_created = datetime.datetime.now()
-                save_image(user_id, filename, title, description, time_created, audio_filename, sentiment)
-                save_notification(user_id, username, filename, title, time_created, sentiment)
-
-                # Generate PDF thumbnail if applicable
-                if filename.lower().endswith('.pdf'):
-                    generate_pdf_thumbnail(filepath, filename)
-
-        return jsonify({'message': 'Upload successful'}), 200
+            if not allowed_file(secure_filename(file.filename)):
+                return jsonify({'error': f'File type not allowed. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
+
+        audio_stream = None
+        if audio_file:
+            audio_ext = audio_extension(audio_file.filename, audio_file.mimetype)
+            if not audio_ext:
+                return jsonify({'error': f'Audio type not allowed. Allowed types: {", ".join(sorted(AUDIO_EXTENSIONS))}'}), 400
+            audio_stream = audio_file.stream
+        elif audio_data:
+            try:
+                audio_stream, audio_ext = data_url_reader(audio_data)
+            except AudioError as e:
+                return jsonify({'error': str(e)}), 400
+
+        # One voice note shared by every file of the batch; transcoded later by the job worker
+        audio = None
+        if audio_stream:
+            audio = store_stream(audio_stream, storage, audio_ext, references=len(files),
+                                 max_bytes=MAX_VOICE_NOTE_SIZE)
+
+        stored = store_upload_files(files)
+        uploads = []
+        store_errors = {}
+        for i, (file, blob) in enumerate(zip(files, stored)):
+            original_filename = secure_filename(file.filename)
+            if 'error' in blob:
+                store_errors[i] = {'original_filename': original_filename, 'error': blob['error']}
+                continue
+            uploads.append({
+                'filename': blob['path'],
+                'original_filename': original_filename,
+                'content_hash': blob['content_hash'],
+                'size': blob['size'],
+                'title': title,
+                'description': description,
+                'audio_filename': audio['path'] if audio else None,
+                'voice_note': {'status': 'pending'} if audio else None,
+                'sentiment': sentiment
+            })
+        if audio and store_errors:
+            # The voice note was referenced once per file
+            release_blob(storage, audio['path'], count=len(store_errors))
+
+        # One result per file, in the order the files were sent
+        recorded = iter(record_uploads(user_id, username, uploads) if uploads else [])
+        results = [
+            {'index': i, **(store_errors[i] if i in store_errors else next(recorded))}
+            for i in range(len(files))
+        ]
+        failed = [result for result in results if 'error' in result]
+        if failed:
+            logging.error(f"Upload of {len(failed)} of {len(results)} files failed: {failed[0]['error']}")
+        if len(failed) == len(results):
+            return jsonify({'error': 'Error uploading files', 'results': results}), 500
+        return jsonify({
+            'message': 'Upload successful' if not failed else 'Some files could not be uploaded',
+            'results': results
+        }), 200 if not failed else 207
 
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
     except Exception as e:
         logging.error(f"Upload error: {str(e)}")  # Add logging
         return jsonify({'error': f'Error uploading file: {str(e)}'}), 500
 
 
 
-# generate thumbnail for the pdf
-def generate_pdf_thumbnail(pdf_path, filename):
-    """Generate an image from the first page of a PDF using PyMuPDF."""
-    # Ensure the thumbnails directory exists
-    thumbnails_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'thumbnails')
-    os.makedirs(thumbnails_dir, exist_ok=True) 
+def allowed_file(filename):
+    """Check whether a (secured) filename has an allowed extension."""
+    file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    return file_ext in ALLOWED_EXTENSIONS
+
+
+def store_upload_files(files):
+    """Stream the files of an upload batch into the blob store in parallel.
+
+    Each file is hashed and stored on ``upload_executor``, so a batch takes
+    about as long as its slowest file. Returns one outcome per file, in
+    order: the blob (``{'path', 'content_hash', 'size'}``) or
+    ``{'error': message}``; a failing file does not stop the others.
+    """
+    def store(file):
+        original_filename = secure_filename(file.filename)
+        try:
+            return store_stream(file.stream, storage, original_filename.rsplit('.', 1)[1])
+        except Exception as e:
+            logging.error(f"Storing upload {original_filename} failed: {str(e)}")
+            return {'error': f'Error storing file: {str(e)}'}
+
+    if len(files) == 1:
+        return [store(files[0])]
+    return list(upload_executor.map(store, files))
+
+
+def record_uploads(user_id, username, uploads):
+    """Create the MongoDB records for files that are already in the blob store.
+
+    ``uploads`` holds dicts with filename (the blob path), title, description
+    and optionally original_filename, content_hash, size, audio_filename and
+    sentiment. Images, notifications and follow-up jobs are each written with
+    a single bulk insert. Uploads whose records could not be saved give their
+    blob references back. Returns one result per upload:
+    ``{'filename', 'original_filename', 'image_id'}`` or
+    ``{'filename', 'original_filename', 'error'}``.
+    """
+    time_created = datetime.datetime.now()
+    for upload in uploads:
+        if upload['filename'].lower().endswith('.pdf'):
+            upload['thumbnail_status'] = 'pending'
+    try:
+        saved = save_uploads(user_id, username, uploads, time_created)
+    except Exception:
+        for upload in uploads:
+            discard_upload(upload)
+        raise
+
+    results = []
+    jobs = []
+    voice_notes = set()
+    for upload, outcome in zip(uploads, saved):
+        if 'error' in outcome:
+            discard_upload(upload)
+            results.append({
+                'filename': upload['filename'],
+                'original_filename': upload.get('original_filename'),
+                'error': outcome['error']
+            })
+            continue
+        image_id = str(outcome['image_id'])
+        results.append({
+            'filename': upload['filename'],
+            'original_filename': upload.get('original_filename'),
+            'image_id': image_id
+        })
+
+        # PDF thumbnails are rendered by the job worker; a placeholder is served until then
+        if upload.get('thumbnail_status') == 'pending':
+            jobs.append((THUMBNAIL_JOB, {'image_id': image_id, 'filename': upload['filename']}))
+        elif supports_derivatives(upload['filename']):
+            jobs.append((DERIVATIVES_JOB, {'image_id': image_id}))
+        if upload.get('voice_note'):
+            voice_notes.add(upload['audio_filename'])
+    # A voice note shared by the batch is transcoded once
+    jobs.extend((VOICE_NOTE_JOB, {'audio_filename': audio_filename}) for audio_filename in sorted(voice_notes))
+    enqueue_jobs(jobs)
+    return results
+
+
+def discard_upload(upload):
+    """Release the blobs of an upload whose records were not saved."""
+    release_upload_file(upload['filename'])
+    if upload.get('audio_filename'):
+        release_upload_file(upload['audio_filename'])
+
+
+def release_upload_file(filename):
+    """Drop one reference to a stored upload; returns True if the file was removed.
+
+    Files saved before the blob store (plain names in the upload folder) are
+    not shared and are removed directly.
+    """
+    if is_blob_path(filename):
+        return release_blob(storage, filename)
+    storage.delete(filename)
+    return True
+
+
+# Resumable (chunked) uploads for large files.
+# 1. POST   .../chunked                      -> start a session, returns upload_id
+# 2. PUT    .../chunked/<upload_id>?offset=N -> append the raw request body
+# 3. GET    .../chunked/<upload_id>          -> current offset, to resume after a failure
+# 4. POST   .../chunked/<upload_id>/complete -> move the file into place and save records
+@app.route('/api/user/upload/<user_id>/chunked', methods=['POST'])
+def start_chunked_upload(user_id):
+    try:
+        data = request.get_json(silent=True) or request.form
+        filename = secure_filename(data.get('filename', ''))
+        try:
+            size = int(data.get('size', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'size must be an integer'}), 400
+
+        if not filename or not allowed_file(filename):
+            return jsonify({'error': f'File type not allowed. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
+        if size <= 0 or size > app.config['MAX_CHUNKED_UPLOAD_SIZE']:
+            return jsonify({'error': f"size must be between 1 and {app.config['MAX_CHUNKED_UPLOAD_SIZE']} bytes"}), 400
+
+        upload = create_session(app.config['CHUNKED_UPLOAD_FOLDER'], user_id, filename, size)
+        return jsonify(upload), 201
+
+    except Exception as e:
+        logging.error(f"Chunked upload error: {str(e)}")
+        return jsonify({'error': f'Error starting upload: {str(e)}'}), 500
+
+
+@app.route('/api/user/upload/<user_id>/chunked/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def chunked_upload(user_id, upload_id):
+    try:
+        folder = app.config['CHUNKED_UPLOAD_FOLDER']
+        upload = get_session(folder, upload_id)
+        if upload is None or upload['user_id'] != user_id:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        if request.method == 'GET':
+            return jsonify(upload), 200
+
+        if request.method == 'DELETE':
+            discard_session(folder, upload_id)
+            return jsonify({'message': 'Upload cancelled'}), 200
+
+        try:
+            offset = int(request.args.get('offset', upload['offset']))
+        except ValueError:
+            return jsonify({'error': 'offset must be an integer'}), 400
+
+        try:
+            new_offset = append_chunk(folder, upload_id, request.stream, offset)
+        except ChunkOffsetMismatch as e:
+            # 409 tells the client to resume from the offset we actually have
+            return jsonify({'error': str(e), 'offset': e.expected}), 409
+        except ChunkInProgress as e:
+            return jsonify({'error': str(e)}), 409
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+
+        return jsonify({'upload_id': upload_id, 'offset': new_offset, 'size': upload['size']}), 200
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Chunked upload error: {str(e)}")
+        return jsonify({'error': f'Error uploading chunk: {str(e)}'}), 500
+
+
+@app.route('/api/user/upload/<user_id>/chunked/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(user_id, upload_id):
+    try:
+        username = request.form.get('username', '')
+        title = request.form.get('title', '')
+        sentiment = request.form.get('sentiment')
+        description = request.form.get('description', '')
+
+        if not title or not description:
+            return jsonify({'error': 'Title and description are required'}), 400
+
+        folder = app.config['CHUNKED_UPLOAD_FOLDER']
+        upload = get_session(folder, upload_id)
+        if upload is None or upload['user_id'] != user_id:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        original_filename = upload['filename']
+        tmp_path = storage.temp_path()
+        try:
+            finalize_session(folder, upload_id, tmp_path)
+        except UploadError as e:
+            return jsonify({'error': str(e), 'offset': upload['offset']}), 409
+        blob = store_file(tmp_path, storage, original_filename.rsplit('.', 1)[1])
+
+        # Records are only written now that the whole file is stored
+        result = record_uploads(user_id, username, [{
+            'filename': blob['path'],
+            'original_filename': original_filename,
+            'content_hash': blob['content_hash'],
+            'size': blob['size'],
+            'title': title,
+            'description': description,
+            'sentiment': sentiment
+        }])[0]
+        if 'error' in result:
+            return jsonify({'error': f"Error saving upload: {result['error']}"}), 500
+        return jsonify({'message': 'Upload successful', **result}), 200
+
+    except Exception as e:
+        logging.error(f"Chunked upload error: {str(e)}")
+        return jsonify({'error': f'Error completing upload: {str(e)}'}), 500
 
-    pdf_document = fitz.open(pdf_path)
-    
-    #select only the first page for the thumbnail
-    first_page = pdf_document.load_page(0)
-    
-    zoom = 2  # Increase for higher resolution
-    mat = fitz.Matrix(zoom, zoom)
-    pix = first_page.get_pixmap(matrix=mat)
-    
-    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-    
-    thumbnail_filename = filename.replace('.pdf', '.jpg')
-    thumbnail_path = os.path.join(thumbnails_dir, thumbnail_filename)
-    image.save(thumbnail_path, 'JPEG')
-    
-    return thumbnail_path
+
+# Uploaded media by storage key (the `filename`/`audio_filename` of an image), with
+# range requests, ETags and cache headers; see utils/media.py
+@app.route('/media/<path:key>')
+def serve_media(key):
+    return send_media(storage, key)
+
+# Serve a PDF thumbnail, or a placeholder while the worker is still rendering it
+@app.route('/thumbnails/<path:filename>')
+def serve_thumbnail(filename):
+    key = thumbnail_key(filename)
+    try:
+        if storage.exists(key):
+            return send_media(storage, key)
+    except StorageError:
+        abort(404)
+    response = send_from_directory(app.static_folder, 'pdf-placeholder.svg')
+    # Do not let browsers hold on to the placeholder once the real thumbnail exists
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Redirect to a downscaled variant of an image, rendering it on first request if needed
+@app.route('/derivatives/<image_id>/<variant>')
+def serve_derivative(image_id, variant):
+    try:
+        image_id = ObjectId(image_id)
+    except Exception as e:
+        return jsonify({'error': f'Invalid image ID format: {str(e)}'}), 400
+
+    if variant not in VARIANTS:
+        return jsonify({'error': f'Unknown variant. Available variants: {", ".join(VARIANTS)}'}), 400
+
+    image = get_image_by_id(image_id)
+    if not image:
+        return jsonify({'error': 'Image not found.'}), 404
+
+    try:
+        variants = ensure_derivatives(image, storage)
+    except (FileNotFoundError, StorageError):
+        return jsonify({'error': 'Image file not found.'}), 404
+    if not variants:
+        # Not a raster image (e.g. PDF); fall back to the original
+        return redirect(storage.url(image['filename']))
+
+    formats = variants.get(variant) or {}
+    key = formats.get(request.args.get('format', 'webp')) or formats.get('webp')
+    if key is None:
+        # Rendered before this variant existed; the original still works
+        return redirect(storage.url(image['filename']))
+    return redirect(storage.url(key))
 
 # Edit images uploaded by the user
 @app.route('/edit/<image_id>', methods=['POST'])
@@ -219,9 +577,9 @@ def edit_image(image_id):
     except Exception as e:
         return jsonify({'error': f'Error updating image: {str(e)}'}), 500
 
-@app.route('/audio/<filename>')
+@app.route('/audio/<path:filename>')
 def serve_audio(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_media(storage, filename)
    
 # Delete images uploaded by the user
 @app.route('/delete/<image_id>')
@@ -238,39 +596,62 @@ def delete_image_route(image_id):
         if not image:
             return jsonify({'error': 'Image not found.'}), 404
 
-        # Delete image file from upload directory
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], image['filename'])
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        # Delete image record from database
+        delete_image(image_id)
+
+        # Give back the stored files; shared blobs stay until their last record is gone
+        if release_upload_file(image['filename']):
             # Also delete thumbnail if it exists
             if image['filename'].lower().endswith('.pdf'):
-                thumbnail_path = os.path.join(app.config['UPLOAD_FOLDER'], 'thumbnails', 
-                                            image['filename'].replace('.pdf', '.jpg'))
-                if os.path.exists(thumbnail_path):
-                    os.remove(thumbnail_path)
+                storage.delete(thumbnail_key(image['filename']))
+
+        # Variants are keyed by content hash alone, so they are shared by every
+        # image with the same bytes (whatever its blob or extension)
+        if image.get('content_hash') and not content_hash_in_use(image['content_hash']):
+            remove_derivatives(storage, image['content_hash'])
 
-        # Delete audio file if it exists
+        # Delete audio file if it exists, with its transcoded copy once no other upload uses it
         if image.get('audio_filename'):
-            audio_path = os.path.join(app.config['UPLOAD_FOLDER'], image['audio_filename'])
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            if release_upload_file(image['audio_filename']) and (image.get('voice_note') or {}).get('key'):
+                storage.delete(image['voice_note']['key'])
 
-        # Delete image record from database
-        delete_image(image_id)
         return jsonify({'message': 'Image deleted successfully!'}), 200
 
     except Exception as e:
         return jsonify({'error': f'Error deleting image: {str(e)}'}), 500
 
-# Get all images uploaded by a user
+# Search a user's uploads by words and sentiments, newest first, with per-sentiment counts
+@app.route('/api/user/search/<user_id>')
+@require_auth
+def search_user_images(user_id):
+    try:
+        try:
+            options = parse_search_args(request.args)
+            images, next_cursor = search_images(user_id=user_id, **options)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'images': images,
+            'next_cursor': next_cursor,
+            'facets': sentiment_facets(options['text'], user_id)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Get images uploaded by a user, one page at a time
 @app.route('/api/user/user_uploads/<user_id>')
 @require_auth
+@cached_response(lambda user_id: [uploads_scope(user_id)])
 def user_images_show(user_id):
     try:
-        images = get_images_by_user(user_id)
-        images_list = list(images) if images else []        
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            images, next_cursor = get_images_by_user(user_id, limit, request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         response_data = {
-            'images': images_list,
+            'images': images,
+            'next_cursor': next_cursor,
             'user_id': user_id,
             'message': 'Success'
         }
@@ -280,27 +661,6 @@ def user_images_show(user_id):
             'error': str(e)
         }), 500
 
-@app.route('/api/admin/notifications', methods=['GET'])
-@require_auth
-def get_admin_notifications():
-    try:
-        notification_collection = get_beehive_notification_collection()
-        mark_seen = request.args.get('mark_seen', 'false').lower() == 'true'
-        # Get all unseen notifications
-        notifications = list(notification_collection.find({"seen": False}).sort("timestamp", -1))
-        # Mark them as seen if requested
-        if mark_seen and notifications:
-            notification_ids = [n['_id'] for n in notifications]
-            notification_collection.update_many({"_id": {"$in": notification_ids}}, {"$set": {"seen": True}})
-        # Convert ObjectId and datetime to string for JSON
-        for n in notifications:
-            n['_id'] = str(n['_id'])
-            if 'timestamp' in n:
-                n['timestamp'] = n['timestamp'].isoformat()
-        return jsonify({"notifications": notifications}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
 @app.route('/api/chat/send', methods=['POST'])
 @require_auth
 def send_chat_message():
@@ -311,20 +671,12 @@ def send_chat_message():
         to_id = data.get('to_id')
         to_role = data.get('to_role')
         content = data.get('content')
-        timestamp = datetime.datetime.now()
         if not (from_id and from_role and to_id and to_role and content):
             return jsonify({'error': 'Missing required fields'}), 400
-        message = {
-            'from_id': from_id,
-            'from_role': from_role,
-            'to_id': to_id,
-            'to_role': to_role,
-            'content': content,
-            'timestamp': timestamp
-        }
-        messages_col = get_beehive_message_collection()
-        messages_col.insert_one(message)
-        return jsonify({'message': 'Message sent'}), 200
+        message = save_message(from_id, from_role, to_id, to_role, content)
+        # Push to open chat streams
+        publish(messages_col.name, message_channels(message), format_message(message))
+        return jsonify({'message': 'Message sent', 'data': format_message(message)}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -333,27 +685,76 @@ def send_chat_message():
 def get_chat_messages():
     try:
         user_id = request.args.get('user_id')
-        with_admin = request.args.get('with_admin', 'false').lower() == 'true'
         if not user_id:
             return jsonify({'error': 'user_id is required'}), 400
-        messages_col = get_beehive_message_collection()
-        # Get messages between this user and admin
-        query = {
-            '$or': [
-                {'from_id': user_id, 'to_role': 'admin'},
-                {'to_id': user_id, 'from_role': 'admin'}
-            ]
-        }
-        messages = list(messages_col.find(query).sort('timestamp', 1))
-        for m in messages:
-            m['_id'] = str(m['_id'])
-            if 'timestamp' in m:
-                m['timestamp'] = m['timestamp'].isoformat()
-        return jsonify({'messages': messages}), 200
+        try:
+            limit = parse_limit(request.args.get('limit'), DEFAULT_HISTORY_SIZE, MAX_HISTORY_SIZE)
+            since = parse_position(request.args.get('since'))
+            before = parse_position(request.args.get('before'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Messages between this user and admin: the latest window, the window
+        # before `before`, or everything after `since`
+        messages, has_more = get_conversation_messages(
+            admin_conversation_id(user_id), limit, since=since, before=before
+        )
+        messages = [format_message(m) for m in messages]
+        return jsonify({
+            'messages': messages,
+            'has_more': has_more,
+            # Pass as `before` to load older messages
+            'before_cursor': messages[0]['cursor'] if messages else request.args.get('before'),
+            # Pass as `since` to load newer messages
+            'since_cursor': messages[-1]['cursor'] if messages else request.args.get('since')
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Event streams that can be opened with a stream ticket
+STREAM_PATHS = {'/api/chat/stream', '/api/admin/notifications/stream'}
 
+# Mint a single-use ticket to open an event stream with (EventSource cannot send the session token)
+@app.route('/api/stream_tickets', methods=['POST'])
+@require_auth
+def create_stream_ticket():
+    path = (request.get_json(silent=True) or {}).get('path')
+    if path not in STREAM_PATHS:
+        return jsonify({'error': f'path must be one of: {", ".join(sorted(STREAM_PATHS))}'}), 400
+    ticket = mint_stream_ticket(request.current_user['id'], path)
+    return jsonify({'ticket': ticket, 'expires_in': STREAM_TICKET_TTL}), 201
+
+# Server-Sent Events stream of new messages between a user and the admins.
+# On reconnect the browser sends Last-Event-ID (the cursor of the last
+# message it got) and the messages it missed are replayed first.
+@app.route('/api/chat/stream', methods=['GET'])
+@require_auth
+def stream_chat_messages():
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    try:
+        since = parse_position(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conversation_id = admin_conversation_id(user_id)
+    # Subscribe before reading the backlog so nothing falls in between
+    subscription = get_broker().subscribe(chat_channel(conversation_id))
+    backlog = []
+    if since is not None:
+        messages, _ = get_conversation_messages(conversation_id, MAX_HISTORY_SIZE, since=since)
+        backlog = [format_message(m) for m in messages]
+    return sse_response(event_stream(
+        subscription,
+        backlog,
+        event='message',
+        event_id=lambda message: message.get('cursor')
+    ))
 
 if __name__ == '__main__':
+    # The development server runs background jobs in-process (only in the reloader's
+    # child process); in production run `python worker.py` alongside the app
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_worker()
     app.run(debug=True)
@@ -0,0 +1,251 @@
+"""Upload analytics for the admin Analytics page.
+
+Uploads are aggregated per calendar day into the ``daily_rollups`` collection:
+
+    {'_id': '2025-01-31', 'version': 2, 'uploads': n, 'images': n, 'voice_notes': n,
+     'sentiments': {'joyful': n, ...}, 'per_user': [{'user_id': ..., 'uploads': n}],
+     'computed_at': datetime}
+
+Sentiments are counted per tag (``sentiment_tags``: lowercased, split on
+commas), like the search facets, so an upload tagged "Joyful, hopeful"
+counts once for each. ``images`` counts uploads that are images rather than
+PDFs, with or without a voice note.
+
+A day is aggregated from ``images`` (a range scan on the ``created_at``
+index) the first time it is asked for and then served from its rollup.
+Today's rollup is recomputed once it is older than ``TODAY_ROLLUP_TTL``;
+past days only change when an upload is edited or deleted, which drops that
+day's rollup (``invalidate_rollup``). Weekly series and per-user totals are
+summed from the daily rollups, and whole responses are memoized for
+``ANALYTICS_CACHE_TTL`` seconds.
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from cachetools import TTLCache
+from pymongo import ReplaceOne
+
+from database import databaseConfig
+from database.userdirectoryhandler import resolve_users
+
+beehive_image_collection = databaseConfig.get_beehive_image_collection()
+beehive_daily_rollup_collection = databaseConfig.get_beehive_daily_rollup_collection()
+
+SENTIMENTS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'sentiments.json')
+
+DEFAULT_ANALYTICS_DAYS = 30
+MAX_ANALYTICS_DAYS = 365
+
+# How many uploaders the per-user breakdown lists
+TOP_USERS = 10
+
+TODAY_ROLLUP_TTL = timedelta(seconds=int(os.getenv('TODAY_ROLLUP_TTL', 300)))
+
+# Rollups stored with another version are rebuilt when asked for
+ROLLUP_VERSION = 2
+
+_analytics_cache = TTLCache(maxsize=32, ttl=int(os.getenv('ANALYTICS_CACHE_TTL', 300)))
+_analytics_cache_lock = threading.Lock()
+
+
+def load_sentiments():
+    with open(SENTIMENTS_FILE) as f:
+        return json.load(f)['sentiments']
+
+SENTIMENTS = load_sentiments()
+
+# Sentiment tags of an image: the comma-separated parts of its sentiment,
+# lowercased so tag filters match regardless of case. Stored as
+# `sentiment_tags` (a multikey index) so tag filters never need a $regex.
+def sentiment_tags(sentiment):
+    if not isinstance(sentiment, str):
+        return []
+    return sorted({tag.strip().lower() for tag in sentiment.split(',') if tag.strip()})
+
+
+def day_key(moment):
+    return moment.strftime('%Y-%m-%d')
+
+def day_start(moment):
+    return datetime(moment.year, moment.month, moment.day)
+
+def week_key(day):
+    """ISO week of a day key, e.g. '2025-W05'."""
+    year, week, _ = datetime.strptime(day, '%Y-%m-%d').isocalendar()
+    return f'{year}-W{week:02d}'
+
+def empty_rollup(day, computed_at):
+    return {
+        '_id': day,
+        'version': ROLLUP_VERSION,
+        'uploads': 0,
+        'images': 0,
+        'voice_notes': 0,
+        'sentiments': {},
+        'per_user': [],
+        'computed_at': computed_at
+    }
+
+# Aggregate uploads per (day, user, sentiment) for created_at in [start, end)
+# and store one rollup per day, including days without uploads.
+def build_rollups(start, end):
+    computed_at = datetime.now()
+    rows = beehive_image_collection.aggregate([
+        {'$match': {'created_at': {'$gte': start, '$lt': end}}},
+        {'$group': {
+            '_id': {
+                'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}},
+                'user_id': '$user_id',
+                # Images saved before tagging only have the raw sentiment
+                'sentiment_tags': {'$ifNull': ['$sentiment_tags', '$sentiment']}
+            },
+            'uploads': {'$sum': 1},
+            'images': {'$sum': {'$cond': [
+                {'$regexMatch': {'input': {'$ifNull': ['$filename', '']}, 'regex': r'\.pdf$', 'options': 'i'}}, 0, 1
+            ]}},
+            'voice_notes': {'$sum': {'$cond': [{'$ifNull': ['$audio_filename', False]}, 1, 0]}}
+        }}
+    ])
+
+    rollups = {}
+    day = start
+    while day < end:
+        rollups[day_key(day)] = empty_rollup(day_key(day), computed_at)
+        day += timedelta(days=1)
+
+    per_user = {key: Counter() for key in rollups}
+    for row in rows:
+        key = row['_id']
+        rollup = rollups[key['day']]
+        rollup['uploads'] += row['uploads']
+        rollup['images'] += row['images']
+        rollup['voice_notes'] += row['voice_notes']
+        tags = key.get('sentiment_tags')
+        for tag in tags if isinstance(tags, list) else sentiment_tags(tags):
+            rollup['sentiments'][tag] = rollup['sentiments'].get(tag, 0) + row['uploads']
+        per_user[key['day']][key.get('user_id')] += row['uploads']
+
+    for key, rollup in rollups.items():
+        rollup['per_user'] = [
+            {'user_id': user_id, 'uploads': uploads}
+            for user_id, uploads in per_user[key].most_common()
+        ]
+    if rollups:
+        beehive_daily_rollup_collection.bulk_write(
+            [ReplaceOne({'_id': key}, rollup, upsert=True) for key, rollup in rollups.items()],
+            ordered=False
+        )
+    return rollups
+
+# Rollups for every day in [start, end), building the ones that are missing or stale
+def get_rollups(start, end):
+    first, last = day_key(start), day_key(end - timedelta(days=1))
+    today = day_key(datetime.now())
+    rollups = {
+        r['_id']: r
+        for r in beehive_daily_rollup_collection.find({'_id': {'$gte': first, '$lte': last}})
+    }
+    today_rollup = rollups.get(today)
+    if today_rollup is not None and datetime.now() - today_rollup['computed_at'] > TODAY_ROLLUP_TTL:
+        del rollups[today]
+    rollups = {key: r for key, r in rollups.items() if r.get('version') == ROLLUP_VERSION}
+
+    missing = []
+    day = start
+    while day < end:
+        if day_key(day) not in rollups:
+            missing.append(day)
+        day += timedelta(days=1)
+    if missing:
+        # One aggregation over the span of the missing days
+        built = build_rollups(missing[0], missing[-1] + timedelta(days=1))
+        for day in missing:
+            rollups[day_key(day)] = built[day_key(day)]
+    return [rollups[key] for key in sorted(rollups)]
+
+# Drop the rollup of the day an upload was created on, after it changed
+def invalidate_rollup(created_at):
+    if isinstance(created_at, datetime):
+        beehive_daily_rollup_collection.delete_one({'_id': day_key(created_at)})
+
+def summarize(rollups):
+    daily = []
+    weekly = {}
+    sentiments = Counter()
+    users = Counter()
+    for rollup in rollups:
+        daily.append({
+            'date': rollup['_id'],
+            'uploads': rollup['uploads'],
+            'images': rollup['images'],
+            'voiceNotes': rollup['voice_notes'],
+            'activeUsers': len(rollup['per_user'])
+        })
+        week = weekly.setdefault(week_key(rollup['_id']), {
+            'week': week_key(rollup['_id']),
+            'start': rollup['_id'],
+            'uploads': 0,
+            'images': 0,
+            'voiceNotes': 0,
+            'users': set()
+        })
+        week['uploads'] += rollup['uploads']
+        week['images'] += rollup['images']
+        week['voiceNotes'] += rollup['voice_notes']
+        week['users'].update(entry['user_id'] for entry in rollup['per_user'])
+        sentiments.update(rollup['sentiments'])
+        for entry in rollup['per_user']:
+            users[entry['user_id']] += entry['uploads']
+
+    for week in weekly.values():
+        week['activeUsers'] = len(week.pop('users'))
+
+    # Sentiments in the order of the vocabulary; any other tag is grouped as 'Other'
+    by_sentiment = [{'sentiment': s, 'count': sentiments.pop(s.lower(), 0)} for s in SENTIMENTS]
+    other = sum(sentiments.values())
+    if other:
+        by_sentiment.append({'sentiment': 'Other', 'count': other})
+
+    top_users = users.most_common(TOP_USERS)
+    resolved = resolve_users(user_id for user_id, _ in top_users if user_id)
+    per_user = [
+        {
+            'userId': user_id,
+            'name': (resolved.get(user_id) or {}).get('name') or 'Unknown User',
+            'uploads': uploads
+        }
+        for user_id, uploads in top_users
+    ]
+
+    return {
+        'totals': {
+            'uploads': sum(d['uploads'] for d in daily),
+            'images': sum(d['images'] for d in daily),
+            'voiceNotes': sum(d['voiceNotes'] for d in daily),
+            'activeUsers': len(users)
+        },
+        'daily': daily,
+        'weekly': list(weekly.values()),
+        'sentiments': by_sentiment,
+        'users': per_user
+    }
+
+# Analytics for the last `days` days, including today
+def get_analytics(days=DEFAULT_ANALYTICS_DAYS):
+    with _analytics_cache_lock:
+        cached = _analytics_cache.get(days)
+    if cached is not None:
+        return cached
+
+    end = day_start(datetime.now()) + timedelta(days=1)
+    start = end - timedelta(days=days)
+    analytics = summarize(get_rollups(start, end))
+    analytics['range'] = {'start': day_key(start), 'end': day_key(end - timedelta(days=1)), 'days': days}
+
+    with _analytics_cache_lock:
+        _analytics_cache[days] = analytics
+    return analytics
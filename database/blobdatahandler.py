@@ -0,0 +1,72 @@
+"""Reference counts of content-addressed upload blobs (see utils/blobstore.py).
+
+One document per stored blob, keyed by its path relative to the upload
+folder:
+
+    {'_id': 'blobs/ab/cd/abcd...ef.png', 'refs': 2, 'size': 12345, 'created_at': ...}
+
+When the last reference is released the document is marked with
+``deleting_at`` while the file is removed, and deleted afterwards. Uploads of
+the same content wait for the document to go away and then write the file
+again, so a delete never removes a blob an upload has just referenced.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import databaseConfig
+
+beehive_blob_collection = databaseConfig.get_beehive_blob_collection()
+
+# A delete that has not finished after this long is assumed to have crashed
+BLOB_DELETE_TIMEOUT = timedelta(seconds=60)
+BLOB_DELETE_POLL_INTERVAL = 0.05
+
+
+# Count `count` more records pointing at a blob; returns True when the file
+# has to be written (new blob, or one whose last reference was just released)
+def add_blob_references(path, size, count=1):
+    while True:
+        stale = datetime.now() - BLOB_DELETE_TIMEOUT
+        try:
+            blob = beehive_blob_collection.find_one_and_update(
+                {'_id': path, '$or': [{'deleting_at': None}, {'deleting_at': {'$lt': stale}}]},
+                {
+                    '$inc': {'refs': count},
+                    '$unset': {'deleting_at': ''},
+                    '$setOnInsert': {'size': size, 'created_at': datetime.now()}
+                },
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # Being deleted: wait until the document is gone
+            time.sleep(BLOB_DELETE_POLL_INTERVAL)
+            continue
+        return blob is None or blob['refs'] <= 0 or blob.get('deleting_at') is not None
+
+# Drop `count` references; returns True when none are left and the blob can be
+# removed, in which case the caller must call forget_blob once it is
+def release_blob_references(path, count=1):
+    blob = beehive_blob_collection.find_one_and_update(
+        {'_id': path},
+        {'$inc': {'refs': -count}},
+        return_document=ReturnDocument.AFTER
+    )
+    if blob is None:
+        # Not tracked (e.g. stored before reference counting); nobody else can be using it
+        return True
+    if blob['refs'] > 0:
+        return False
+    # Only delete if no upload took a new reference in the meantime
+    return beehive_blob_collection.update_one(
+        {'_id': path, 'refs': {'$lte': 0}, 'deleting_at': None},
+        {'$set': {'deleting_at': datetime.now()}}
+    ).modified_count == 1
+
+# Drop the document of a blob whose file has been removed
+def forget_blob(path):
+    beehive_blob_collection.delete_one({'_id': path, 'refs': {'$lte': 0}})
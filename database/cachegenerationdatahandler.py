@@ -0,0 +1,39 @@
+"""Generations of response cache scopes, shared by every process (see utils/response_cache.py).
+
+One document per scope that has been invalidated:
+
+    {'_id': 'uploads:<user id>', 'generation': '<ObjectId>', 'updated_at': ...}
+
+A generation is a fresh ObjectId rather than a counter, so a scope whose
+document expired never gets a generation it had before. Documents are
+removed by a TTL index ``CACHE_GENERATION_TTL`` seconds after the scope was
+last invalidated; that has to be longer than ``RESPONSE_CACHE_TTL`` so that
+every response cached under the old generation has expired by then.
+"""
+
+import os
+from datetime import datetime
+
+from bson import ObjectId
+
+from database import databaseConfig
+
+beehive_cache_generation_collection = databaseConfig.get_beehive_cache_generation_collection()
+
+CACHE_GENERATION_TTL = int(os.getenv('CACHE_GENERATION_TTL', 24 * 3600))
+
+# Scopes that were never invalidated (or not recently) are at this generation
+INITIAL_GENERATION = '0'
+
+
+def get_generations(scopes):
+    documents = beehive_cache_generation_collection.find({'_id': {'$in': list(scopes)}}, {'generation': 1})
+    generations = {document['_id']: document['generation'] for document in documents}
+    return [generations.get(scope, INITIAL_GENERATION) for scope in scopes]
+
+def bump_generation(scope):
+    beehive_cache_generation_collection.update_one(
+        {'_id': scope},
+        {'$set': {'generation': str(ObjectId()), 'updated_at': datetime.now()}},
+        upsert=True
+    )
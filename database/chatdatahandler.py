@@ -0,0 +1,136 @@
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from database import databaseConfig
+from utils.pagination import decode_cursor, encode_cursor
+
+beehive_message_collection = databaseConfig.get_beehive_message_collection()
+
+DEFAULT_HISTORY_SIZE = 50
+MAX_HISTORY_SIZE = 200
+
+# A participant of a conversation. All admins share one inbox, so they
+# collapse into a single "admin" participant.
+def participant_key(participant_id, role):
+    return 'admin' if role == 'admin' else f"{role}:{participant_id}"
+
+# Normalized conversation id: the same for both directions of a conversation
+def conversation_id_for(from_id, from_role, to_id, to_role):
+    return '|'.join(sorted([participant_key(from_id, from_role), participant_key(to_id, to_role)]))
+
+# Conversation between a user and the admins
+def admin_conversation_id(user_id):
+    return conversation_id_for(user_id, 'user', None, 'admin')
+
+# Pub/sub channel carrying the messages of one conversation
+def chat_channel(conversation_id):
+    return f"chat:{conversation_id}"
+
+def message_channels(message):
+    return [chat_channel(message['conversation_id'])]
+
+def message_cursor(message):
+    return encode_cursor(message['timestamp'], message['_id'])
+
+# Convert ObjectId and datetime to string for JSON; `cursor` is what clients
+# pass back as `since`/`before`
+def format_message(message):
+    formatted = dict(message)
+    formatted['_id'] = str(message['_id'])
+    if 'timestamp' in message:
+        formatted['cursor'] = message_cursor(message)
+        formatted['timestamp'] = message['timestamp'].isoformat()
+    return formatted
+
+# Save a chat message to MongoDB and return it
+def save_message(from_id, from_role, to_id, to_role, content, timestamp=None):
+    timestamp = timestamp or datetime.now()
+    message = {
+        'conversation_id': conversation_id_for(from_id, from_role, to_id, to_role),
+        'from_id': from_id,
+        'from_role': from_role,
+        'to_id': to_id,
+        'to_role': to_role,
+        'content': content,
+        # MongoDB stores milliseconds; truncate so the timestamp pushed to
+        # streams matches the stored one when clients resume with `since`
+        'timestamp': timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+    }
+    message['_id'] = beehive_message_collection.insert_one(message).inserted_id
+    return message
+
+# Parse a `since`/`before` position: a message cursor, or an ISO timestamp
+# (older clients). Returns (timestamp, ObjectId or None).
+def parse_position(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value), None
+    except ValueError:
+        pass
+    try:
+        return decode_cursor(value)
+    except ValueError:
+        raise ValueError('since/before must be a message cursor or an ISO 8601 timestamp')
+
+def position_filter(position, op):
+    timestamp, object_id = position
+    if object_id is None:
+        return {'timestamp': {op: timestamp}}
+    return {'$or': [
+        {'timestamp': {op: timestamp}},
+        {'timestamp': timestamp, '_id': {op: object_id}}
+    ]}
+
+# Get a window of a conversation, oldest first, served by the
+# (conversation_id, timestamp, _id) index so the cost does not depend on
+# how long the conversation is.
+#  - since:   up to `limit` messages after that position (catching up)
+#  - before:  the `limit` messages just before that position (scrolling back)
+#  - neither: the latest `limit` messages
+# Returns (messages, has_more): with `since`, has_more means newer messages
+# remain; otherwise it means older messages remain.
+def get_conversation_messages(conversation_id, limit=DEFAULT_HISTORY_SIZE, since=None, before=None):
+    query = {'conversation_id': conversation_id}
+    if since is not None:
+        query = {'$and': [query, position_filter(since, '$gt')]}
+        direction = 1
+    else:
+        if before is not None:
+            query = {'$and': [query, position_filter(before, '$lt')]}
+        direction = -1
+
+    messages = list(
+        beehive_message_collection.find(query)
+        .sort([('timestamp', direction), ('_id', direction)])
+        .limit(limit + 1)
+    )
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if direction == -1:
+        messages.reverse()
+    return messages, has_more
+
+# One-off migration: set conversation_id on messages stored before it existed
+def backfill_conversation_ids(batch_size=1000):
+    updated = 0
+    batch = []
+    for message in beehive_message_collection.find(
+        {'conversation_id': {'$exists': False}},
+        {'from_id': 1, 'from_role': 1, 'to_id': 1, 'to_role': 1}
+    ):
+        conversation_id = conversation_id_for(
+            message.get('from_id'), message.get('from_role'), message.get('to_id'), message.get('to_role')
+        )
+        batch.append(UpdateOne({'_id': message['_id']}, {'$set': {'conversation_id': conversation_id}}))
+        if len(batch) >= batch_size:
+            updated += beehive_message_collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += beehive_message_collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+if __name__ == '__main__':
+    print(f"Backfilled conversation_id on {backfill_conversation_ids()} messages")
@@ -1,27 +1,233 @@
+"""MongoDB client factory.
+
+The client is created lazily, on first use, and once per process: a process
+that finds a client created by its parent (gunicorn workers, ``fork``-based
+multiprocessing) builds its own instead of sharing the parent's sockets and
+monitor threads. Collection getters return ``LazyCollection`` handles, so
+modules can keep grabbing them at import time and still end up on the current
+process's client.
+
+Pool and timeout settings come from the environment:
+
+    MONGODB_CONNECTION_STRING           connection URI
+    MONGODB_DATABASE                    database name (default beehive)
+    MONGODB_MAX_POOL_SIZE               connections per server (default 100)
+    MONGODB_MIN_POOL_SIZE               connections kept open when idle (default 0)
+    MONGODB_MAX_CONNECTING              connections being opened at once (default 2)
+    MONGODB_MAX_IDLE_TIME_MS            close connections idle for longer than this
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS       how long a request waits for a free connection
+    MONGODB_CONNECT_TIMEOUT_MS          (default 10000)
+    MONGODB_SOCKET_TIMEOUT_MS           per-operation socket timeout
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS (default 10000)
+    MONGODB_READ_PREFERENCE             e.g. primary, primaryPreferred, secondaryPreferred
+    MONGODB_WRITE_CONCERN               w value, e.g. 1 or majority
+
+``pool_metrics`` counts connection pool events of the current process.
+"""
+
 from dotenv import load_dotenv, find_dotenv
 import os
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, monitoring
 
 load_dotenv(find_dotenv())
 
 connectionString = os.environ.get("MONGODB_CONNECTION_STRING")
 
-dbclient = MongoClient(connectionString)
+DATABASE_NAME = os.environ.get("MONGODB_DATABASE", "beehive")
+
+# Environment variable -> MongoClient option, and how to parse it
+CLIENT_OPTIONS = {
+    'MONGODB_MAX_POOL_SIZE': ('maxPoolSize', int),
+    'MONGODB_MIN_POOL_SIZE': ('minPoolSize', int),
+    'MONGODB_MAX_CONNECTING': ('maxConnecting', int),
+    'MONGODB_MAX_IDLE_TIME_MS': ('maxIdleTimeMS', int),
+    'MONGODB_WAIT_QUEUE_TIMEOUT_MS': ('waitQueueTimeoutMS', int),
+    'MONGODB_CONNECT_TIMEOUT_MS': ('connectTimeoutMS', int),
+    'MONGODB_SOCKET_TIMEOUT_MS': ('socketTimeoutMS', int),
+    'MONGODB_SERVER_SELECTION_TIMEOUT_MS': ('serverSelectionTimeoutMS', int),
+    'MONGODB_READ_PREFERENCE': ('readPreference', str),
+    'MONGODB_WRITE_CONCERN': ('w', lambda value: int(value) if value.isdigit() else value),
+}
+
+DEFAULT_CLIENT_OPTIONS = {
+    'maxPoolSize': 100,
+    'minPoolSize': 0,
+    'maxConnecting': 2,
+    'connectTimeoutMS': 10000,
+    'serverSelectionTimeoutMS': 10000,
+}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool counters for the current process."""
+
+    FIELDS = (
+        'pools_created', 'pools_cleared', 'connections_created', 'connections_closed',
+        'checkouts', 'checkout_failures', 'checked_out', 'checkout_wait_ms_total', 'checkout_wait_ms_max'
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def _add(self, field, amount=1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        counts['checkout_wait_ms_avg'] = (
+            counts['checkout_wait_ms_total'] / counts['checkouts'] if counts['checkouts'] else 0
+        )
+        return counts
+
+    def pool_created(self, event):
+        self._add('pools_created')
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add('pools_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add('connections_created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add('connections_closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add('checkout_failures')
+
+    def connection_checked_out(self, event):
+        # `duration` (seconds spent waiting for the connection) exists since PyMongo 4.7
+        wait_ms = (getattr(event, 'duration', 0) or 0) * 1000
+        with self._lock:
+            self._counts['checkouts'] += 1
+            self._counts['checked_out'] += 1
+            self._counts['checkout_wait_ms_total'] += wait_ms
+            self._counts['checkout_wait_ms_max'] = max(self._counts['checkout_wait_ms_max'], wait_ms)
 
-beehive = dbclient.beehive
+    def connection_checked_in(self, event):
+        self._add('checked_out', -1)
+
+
+pool_metrics = PoolMetrics()
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def client_options(environ=os.environ):
+    options = dict(DEFAULT_CLIENT_OPTIONS)
+    for variable, (option, parse) in CLIENT_OPTIONS.items():
+        value = environ.get(variable)
+        if value not in (None, ''):
+            options[option] = parse(value)
+    return options
+
+def get_client():
+    """The MongoClient of the current process, created on first use."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            if _client_pid != pid:
+                # Counters inherited from the parent describe its pool, not ours
+                pool_metrics.reset()
+            # The parent's client (if any) is abandoned, not closed: closing it
+            # here would tear down sockets the parent is still using
+            _client = MongoClient(connectionString, event_listeners=[pool_metrics], **client_options())
+            _client_pid = pid
+    return _client
+
+def close_client():
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+def get_database():
+    return get_client()[DATABASE_NAME]
+
+
+class LazyCollection:
+    """Collection handle that resolves against the current process's client on every use."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def resolve(self):
+        return get_database()[self.name]
+
+    def __getattr__(self, attribute):
+        return getattr(self.resolve(), attribute)
+
+    def __getitem__(self, key):
+        return self.resolve()[key]
+
+    def __repr__(self):
+        return f"LazyCollection({self.name!r})"
 
 
 def get_beehive_user_collection():
-    return beehive.users
+    return LazyCollection('users')
 
 def get_beehive_image_collection():
-    return beehive.images
+    return LazyCollection('images')
 
 def get_beehive_admin_collection():
-    return beehive.admins
+    return LazyCollection('admins')
 
 def get_beehive_notification_collection():
-    return beehive.notifications
+    return LazyCollection('notifications')
 
 def get_beehive_message_collection():
-    return beehive.messages
\ No newline at end of file
+    return LazyCollection('messages')
+
+def get_beehive_job_collection():
+    return LazyCollection('jobs')
+
+def get_beehive_clerk_user_collection():
+    return LazyCollection('clerk_users')
+
+def get_beehive_sync_state_collection():
+    return LazyCollection('sync_state')
+
+def get_beehive_stats_collection():
+    return LazyCollection('stats')
+
+def get_beehive_daily_rollup_collection():
+    return LazyCollection('daily_rollups')
+
+def get_beehive_blob_collection():
+    return LazyCollection('blobs')
+
+def get_beehive_notification_state_collection():
+    return LazyCollection('notification_state')
+
+def get_beehive_stream_ticket_collection():
+    return LazyCollection('stream_tickets')
+
+def get_beehive_cache_generation_collection():
+    return LazyCollection('cache_generations')
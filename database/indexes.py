@@ -0,0 +1,249 @@
+"""Declarative MongoDB index registry.
+
+Every index the application relies on is declared in ``INDEXES`` next to the
+collection it belongs to. ``ensure_indexes`` applies the registry
+idempotently (MongoDB ignores an index that already exists with the same
+spec) and is run at application startup; the report helpers list declared
+indexes that are missing, indexes that exist but are not declared or never
+used, and the query plans of the hot queries.
+
+Usage:
+    python -m database.indexes ensure
+    python -m database.indexes report
+    python -m database.indexes explain
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from database import databaseConfig
+from database.cachegenerationdatahandler import CACHE_GENERATION_TTL
+from database.jobdatahandler import JOB_RETENTION_DAYS
+from database.notificationdatahandler import NOTIFICATION_TTL_DAYS
+
+INDEXES = {
+    'images': [
+        # Per-user upload listing, keyset-paginated on (created_at, _id)
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+                   name='user_id_created_at_id'),
+        # Recent uploads on the dashboard and analytics rollups by date range
+        IndexModel([('created_at', DESCENDING)], name='created_at'),
+        # Upload search: words in title/description, and sentiment tags per user or overall
+        IndexModel([('title', TEXT), ('description', TEXT)], name='title_description_text',
+                   weights={'title': 3, 'description': 1}, default_language='english'),
+        IndexModel([('user_id', ASCENDING), ('sentiment_tags', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+                   name='user_id_sentiment_tags_created_at_id'),
+        IndexModel([('sentiment_tags', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+                   name='sentiment_tags_created_at_id'),
+        # Whether other images still use the derivatives of a deleted image's content
+        IndexModel([('content_hash', ASCENDING)], name='content_hash', sparse=True),
+        # Recording a transcoded voice note on every image sharing the recording
+        IndexModel([('audio_filename', ASCENDING)], name='audio_filename', sparse=True),
+    ],
+    'notifications': [
+        # Notification feed, newest first, paginated on seq
+        IndexModel([('seq', DESCENDING)], name='seq', unique=True,
+                   partialFilterExpression={'seq': {'$exists': True}}),
+        # Expire old notifications. Changing NOTIFICATION_TTL_DAYS on an existing
+        # deployment needs a collMod, as MongoDB will not redefine the index.
+        IndexModel([('timestamp', ASCENDING)], name='timestamp_ttl',
+                   expireAfterSeconds=NOTIFICATION_TTL_DAYS * 24 * 3600),
+    ],
+    'messages': [
+        # Windowed conversation history, keyed on (timestamp, _id)
+        IndexModel([('conversation_id', ASCENDING), ('timestamp', ASCENDING), ('_id', ASCENDING)],
+                   name='conversation_id_timestamp_id'),
+    ],
+    'admins': [
+        IndexModel([('google_id', ASCENDING)], name='google_id', unique=True),
+    ],
+    'users': [
+        IndexModel([('username', ASCENDING)], name='username'),
+    ],
+    'clerk_users': [
+        # Admin user listing, optionally filtered by role, newest first
+        IndexModel([('role', ASCENDING), ('createdAt', DESCENDING)], name='role_created_at'),
+        IndexModel([('createdAt', DESCENDING)], name='created_at'),
+        # Removing users that disappeared from Clerk after a full sync
+        IndexModel([('synced_at', ASCENDING)], name='synced_at'),
+    ],
+    'stream_tickets': [
+        # Remove tickets that were never redeemed once they expire
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0),
+    ],
+    'cache_generations': [
+        # Forget scopes that were not invalidated for CACHE_GENERATION_TTL seconds
+        IndexModel([('updated_at', ASCENDING)], name='updated_at_ttl', expireAfterSeconds=CACHE_GENERATION_TTL),
+    ],
+    'jobs': [
+        # Claiming due jobs and reclaiming jobs of dead workers
+        IndexModel([('status', ASCENDING), ('run_at', ASCENDING)], name='status_run_at'),
+        IndexModel([('status', ASCENDING), ('locked_at', ASCENDING)], name='status_locked_at'),
+        # Remove finished jobs after JOB_RETENTION_DAYS; failed jobs are kept for inspection
+        IndexModel([('finished_at', ASCENDING)], name='finished_at_ttl',
+                   expireAfterSeconds=JOB_RETENTION_DAYS * 24 * 3600,
+                   partialFilterExpression={'status': 'done'}),
+    ],
+}
+
+# Queries on the request path, with the index each one is expected to use
+HOT_QUERIES = [
+    {
+        'name': 'uploads by user',
+        'collection': 'images',
+        'filter': {'user_id': 'example-user'},
+        'sort': [('created_at', DESCENDING), ('_id', DESCENDING)],
+    },
+    {
+        'name': 'recent uploads',
+        'collection': 'images',
+        'filter': {},
+        'sort': [('created_at', DESCENDING)],
+    },
+    {
+        'name': 'analytics rollup range',
+        'collection': 'images',
+        'filter': {'created_at': {'$gte': datetime(2025, 1, 1), '$lt': datetime(2025, 1, 31)}},
+        'sort': None,
+    },
+    {
+        'name': 'notification feed page',
+        'collection': 'notifications',
+        'filter': {'seq': {'$lt': 1000}},
+        'sort': [('seq', DESCENDING)],
+    },
+    {
+        'name': 'search uploads by sentiment',
+        'collection': 'images',
+        'filter': {'user_id': 'example-user', 'sentiment_tags': {'$in': ['joyful', 'hopeful']}},
+        'sort': [('created_at', DESCENDING), ('_id', DESCENDING)],
+    },
+    {
+        'name': 'search uploads by words',
+        'collection': 'images',
+        'filter': {'$text': {'$search': 'sunset beach'}},
+        'sort': [('created_at', DESCENDING), ('_id', DESCENDING)],
+    },
+    {
+        'name': 'latest chat messages',
+        'collection': 'messages',
+        'filter': {'conversation_id': 'admin|user:example-user'},
+        'sort': [('timestamp', DESCENDING), ('_id', DESCENDING)],
+    },
+    {
+        'name': 'admin by google id',
+        'collection': 'admins',
+        'filter': {'google_id': 'example-google-id'},
+        'sort': None,
+    },
+]
+
+
+def get_database():
+    return databaseConfig.get_database()
+
+
+def ensure_indexes(db=None):
+    """Create every declared index that does not exist yet.
+
+    Returns ``{collection: [created or confirmed index names]}``. A failure on
+    one collection (e.g. duplicate keys blocking a unique index) is logged and
+    does not stop the others.
+    """
+    db = db if db is not None else get_database()
+    result = {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            result[collection_name] = db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            logging.error(f"Could not create indexes on '{collection_name}': {str(e)}")
+            result[collection_name] = []
+    return result
+
+
+def index_report(db=None):
+    """Compare declared indexes with the ones that exist, and their usage.
+
+    For each collection returns the declared indexes that are ``missing``,
+    existing indexes that are ``undeclared``, and indexes that have not been
+    used since the server started (``unused``, from ``$indexStats``).
+    """
+    db = db if db is not None else get_database()
+    report = {}
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        declared = {index.document['name'] for index in indexes}
+        existing = set(collection.index_information()) - {'_id_'}
+        try:
+            stats = list(collection.aggregate([{'$indexStats': {}}]))
+            unused = sorted(s['name'] for s in stats if s['name'] != '_id_' and s['accesses']['ops'] == 0)
+        except OperationFailure:
+            # $indexStats needs privileges some hosted deployments do not grant
+            unused = None
+        report[collection_name] = {
+            'missing': sorted(declared - existing),
+            'undeclared': sorted(existing - declared),
+            'unused': unused,
+        }
+    return report
+
+
+def winning_plan_summary(plan):
+    """Flatten a winning plan into its stages, e.g. ``['FETCH', 'IXSCAN user_id_created_at_id']``."""
+    stages = []
+    while plan:
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage = f"{stage} {plan['indexName']}"
+        stages.append(stage)
+        if 'inputStages' in plan:
+            for child in plan['inputStages']:
+                stages.extend(winning_plan_summary(child))
+            break
+        plan = plan.get('inputStage')
+    return stages
+
+
+def explain_hot_queries(db=None):
+    """Return the winning plan of every hot query and whether it scans the collection."""
+    db = db if db is not None else get_database()
+    plans = []
+    for query in HOT_QUERIES:
+        cursor = db[query['collection']].find(query['filter'])
+        if query['sort']:
+            cursor = cursor.sort(query['sort'])
+        explained = cursor.explain()
+        winning_plan = explained.get('queryPlanner', {}).get('winningPlan', {})
+        # Newer servers wrap the classic plan in a queryPlan field
+        winning_plan = winning_plan.get('queryPlan', winning_plan)
+        stages = winning_plan_summary(winning_plan)
+        plans.append({
+            'name': query['name'],
+            'collection': query['collection'],
+            'stages': stages,
+            'collection_scan': any(stage.startswith('COLLSCAN') for stage in stages),
+        })
+    return plans
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage Beehive MongoDB indexes.')
+    parser.add_argument('command', choices=['ensure', 'report', 'explain'])
+    args = parser.parse_args(argv)
+
+    if args.command == 'ensure':
+        output = ensure_indexes()
+    elif args.command == 'report':
+        output = index_report()
+    else:
+        output = explain_hot_queries()
+    print(json.dumps(output, indent=2, default=lambda o: o.isoformat() if isinstance(o, datetime) else str(o)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import databaseConfig
+
+beehive_job_collection = databaseConfig.get_beehive_job_collection()
+
+# A running job whose worker has not reported back within this window is
+# assumed dead and handed to another worker.
+JOB_LOCK_TIMEOUT = timedelta(minutes=5)
+
+# Base delay for retries; doubled on every failed attempt
+JOB_RETRY_DELAY = timedelta(seconds=10)
+
+# How long finished jobs are kept, in days (TTL index in database/indexes.py)
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', 7))
+
+ABANDONED_ERROR = 'Worker stopped responding while running the job'
+
+
+def _new_job(job_type, payload, max_attempts, now):
+    return {
+        'type': job_type,
+        'payload': payload,
+        'status': 'queued',
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'run_at': now,
+        'created_at': now,
+        'locked_at': None,
+        'worker_id': None,
+        'last_error': None
+    }
+
+# Add several (job_type, payload) jobs with a single insert
+def enqueue_jobs(jobs, max_attempts=3):
+    if not jobs:
+        return []
+    now = datetime.now()
+    documents = [_new_job(job_type, payload, max_attempts, now) for job_type, payload in jobs]
+    return beehive_job_collection.insert_many(documents, ordered=False).inserted_ids
+
+# Queue the single instance of a recurring job, unless it is already queued,
+# running, or finished less than `interval` ago. Safe to call from every worker.
+def schedule_periodic_job(job_type, interval, payload=None, max_attempts=1):
+    now = datetime.now()
+    try:
+        beehive_job_collection.update_one(
+            {
+                '_id': f'periodic:{job_type}',
+                'status': {'$in': ['done', 'failed']},
+                'finished_at': {'$lte': now - interval}
+            },
+            {'$set': {
+                'type': job_type,
+                'payload': payload or {},
+                'status': 'queued',
+                'attempts': 0,
+                'max_attempts': max_attempts,
+                'run_at': now,
+                'created_at': now,
+                'locked_at': None,
+                'worker_id': None,
+                'last_error': None
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The job exists but is not due yet
+        pass
+
+def _abandoned(now):
+    return {'status': 'running', 'locked_at': {'$lt': now - JOB_LOCK_TIMEOUT}}
+
+# Atomically claim the next due job (or a job abandoned by a dead worker that
+# still has attempts left; see fail_abandoned_jobs for the others)
+def claim_next_job(worker_id):
+    now = datetime.now()
+    query = {
+        '$or': [
+            {'status': 'queued', 'run_at': {'$lte': now}},
+            {**_abandoned(now), '$expr': {'$lt': ['$attempts', '$max_attempts']}}
+        ]
+    }
+    update = {
+        '$set': {'status': 'running', 'locked_at': now, 'worker_id': worker_id},
+        '$inc': {'attempts': 1}
+    }
+    return beehive_job_collection.find_one_and_update(
+        query,
+        update,
+        sort=[('run_at', 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+# Fail abandoned jobs that used up their attempts, so a job that takes its
+# worker down (e.g. out of memory) is not reclaimed forever. Returns the jobs.
+def fail_abandoned_jobs():
+    now = datetime.now()
+    query = {**_abandoned(now), '$expr': {'$gte': ['$attempts', '$max_attempts']}}
+    failed = []
+    for job in beehive_job_collection.find(query, {'_id': 1}):
+        # Conditional update, so only one worker fails (and reports) each job
+        job = beehive_job_collection.find_one_and_update(
+            {'_id': job['_id'], **query},
+            {'$set': {'status': 'failed', 'finished_at': now, 'locked_at': None, 'last_error': ABANDONED_ERROR}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            failed.append(job)
+    return failed
+
+# Mark a job as done
+def complete_job(job_id):
+    beehive_job_collection.update_one(
+        {'_id': job_id},
+        {'$set': {'status': 'done', 'finished_at': datetime.now(), 'locked_at': None}}
+    )
+
+# Record a failure; the job is retried with exponential backoff until it runs out of attempts
+def fail_job(job, error):
+    if job.get('attempts', 0) >= job.get('max_attempts', 1):
+        update = {'status': 'failed', 'finished_at': datetime.now()}
+    else:
+        delay = JOB_RETRY_DELAY * (2 ** (job['attempts'] - 1))
+        update = {'status': 'queued', 'run_at': datetime.now() + delay}
+    update.update({'locked_at': None, 'last_error': str(error)})
+    beehive_job_collection.update_one({'_id': job['_id']}, {'$set': update})
+    return update['status']
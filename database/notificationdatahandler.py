@@ -0,0 +1,155 @@
+"""Admin notification feed.
+
+Every notification gets a sequence number ``seq`` from a single counter, so
+the feed is ordered and paginated by one indexed integer:
+
+    {'_id': ..., 'seq': 1042, 'type': 'image_upload', 'user_id': ..., 'timestamp': ..., ...}
+
+What an admin has seen is a watermark, not a flag on each notification:
+
+    {'_id': 'seq', 'value': 1042}                          (latest sequence number handed out)
+    {'_id': 'seen:<admin id>', 'seq': 1030, 'updated_at': ...}
+
+Marking the feed as seen is one write however many notifications it covers,
+and the unread count is ``latest - watermark``: two ``_id`` lookups. Sequence
+numbers reserved for notifications that failed to insert leave gaps, so the
+count can be slightly high until the admin next marks the feed as seen.
+
+Notifications expire ``NOTIFICATION_TTL_DAYS`` after their timestamp via a
+TTL index (see database/indexes.py).
+
+New notifications are also published on ``NOTIFICATIONS_CHANNEL`` (see
+utils/pubsub.py) for admins connected to the notification stream; the
+``seq`` doubles as the event id a reconnecting stream resumes from.
+"""
+
+import os
+from datetime import datetime
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import databaseConfig
+from utils.pubsub import publish
+
+beehive_notification_collection = databaseConfig.get_beehive_notification_collection()
+beehive_notification_state_collection = databaseConfig.get_beehive_notification_state_collection()
+
+SEQ_ID = 'seq'
+
+NOTIFICATIONS_CHANNEL = 'admin:notifications'
+
+# How long notifications are kept, in days
+NOTIFICATION_TTL_DAYS = int(os.getenv('NOTIFICATION_TTL_DAYS', 90))
+
+FEED_PROJECTION = {'seen': 0}
+
+
+def _seen_id(admin_id):
+    return f'seen:{admin_id}'
+
+# Reserve `count` sequence numbers; returns the first one
+def reserve_seqs(count):
+    counter = beehive_notification_state_collection.find_one_and_update(
+        {'_id': SEQ_ID},
+        {'$inc': {'value': count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['value'] - count + 1
+
+def latest_seq():
+    counter = beehive_notification_state_collection.find_one({'_id': SEQ_ID}) or {}
+    return counter.get('value', 0)
+
+def get_seen_seq(admin_id):
+    state = beehive_notification_state_collection.find_one({'_id': _seen_id(admin_id)}) or {}
+    return state.get('seq', 0)
+
+# Move an admin's watermark forward to `seq` (never backwards); returns the watermark
+def mark_seen(admin_id, seq):
+    seq = min(seq, latest_seq())
+    try:
+        state = beehive_notification_state_collection.find_one_and_update(
+            {'_id': _seen_id(admin_id), 'seq': {'$lt': seq}},
+            {'$set': {'seq': seq, 'updated_at': datetime.now()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return state['seq']
+    except DuplicateKeyError:
+        # The watermark is already at or past `seq`
+        return get_seen_seq(admin_id)
+
+def unread_count(admin_id, seen_seq=None):
+    seen_seq = get_seen_seq(admin_id) if seen_seq is None else seen_seq
+    return max(0, latest_seq() - seen_seq)
+
+def parse_feed_cursor(cursor):
+    """The feed cursor is the ``seq`` of the last notification of the previous page."""
+    try:
+        return int(cursor)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+# One page of the feed, newest first. Returns (notifications, next_cursor).
+def get_feed(limit, cursor=None, seen_seq=0):
+    # Notifications not numbered yet (see backfill_seqs) are left out
+    query = {'seq': {'$lt': parse_feed_cursor(cursor)} if cursor else {'$exists': True}}
+    notifications = list(
+        beehive_notification_collection.find(query, FEED_PROJECTION)
+        .sort('seq', -1)
+        .limit(limit + 1)
+    )
+    next_cursor = None
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        next_cursor = str(notifications[-1]['seq'])
+    return [format_notification(n, seen_seq) for n in notifications], next_cursor
+
+# Notifications after `seq`, oldest first, for a stream resuming from its last event id
+def get_feed_since(seq, limit):
+    notifications = (
+        beehive_notification_collection.find({'seq': {'$gt': seq}}, FEED_PROJECTION)
+        .sort('seq', 1)
+        .limit(limit)
+    )
+    return [format_notification(n) for n in notifications]
+
+def notification_channels(notification):
+    return [NOTIFICATIONS_CHANNEL]
+
+# Push newly inserted notifications to open admin streams
+def publish_notifications(notifications):
+    for notification in notifications:
+        publish(beehive_notification_collection.name, notification_channels(notification),
+                format_notification(notification))
+
+def format_notification(notification, seen_seq=0):
+    timestamp = notification.get('timestamp')
+    return {
+        **notification,
+        '_id': str(notification['_id']),
+        'timestamp': timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+        'seen': notification['seq'] <= seen_seq
+    }
+
+# Give notifications created before the feed (no `seq`) one, oldest first.
+# They are numbered below every numbered notification (down to zero or less),
+# so they stay older than those in the feed and count as seen.
+def backfill_seqs():
+    missing = list(beehive_notification_collection.find({'seq': {'$exists': False}}, {'_id': 1}).sort('timestamp', 1))
+    if not missing:
+        return 0
+    lowest = beehive_notification_collection.find_one({'seq': {'$exists': True}}, {'seq': 1}, sort=[('seq', 1)])
+    first = (lowest['seq'] if lowest else 1) - len(missing)
+    beehive_notification_collection.bulk_write([
+        UpdateOne({'_id': notification['_id']}, {'$set': {'seq': first + offset}, '$unset': {'seen': ''}})
+        for offset, notification in enumerate(missing)
+    ], ordered=False)
+    return len(missing)
+
+
+if __name__ == '__main__':
+    # Number notifications of an existing deployment: python -m database.notificationdatahandler
+    print(f"Numbered {backfill_seqs()} notifications")
@@ -0,0 +1,166 @@
+"""Running upload counters for the admin dashboard.
+
+Instead of counting the ``images`` collection on every dashboard hit, the
+``stats`` collection holds counters that are incremented and decremented by
+the image write functions in ``userdatahandler``:
+
+    {'_id': 'totals', 'images': n, 'voice_notes': n}
+    {'_id': 'day:2025-01-31', 'kind': 'day', 'day': '2025-01-31', 'images': n, 'voice_notes': n}
+    {'_id': 'day_sentiment:2025-01-31:Joyful', 'kind': 'day_sentiment', 'day': ..., 'sentiment': ..., 'images': n}
+
+Reading the dashboard is then a couple of ``_id`` lookups regardless of how
+many uploads exist. ``reconcile_stats`` rebuilds every counter from the
+images collection; it runs periodically in the job worker to repair drift
+(e.g. writes made outside the app, or a crash between the two writes).
+"""
+
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from database import databaseConfig
+from utils.job_queue import register_handler, register_periodic
+
+beehive_stats_collection = databaseConfig.get_beehive_stats_collection()
+beehive_image_collection = databaseConfig.get_beehive_image_collection()
+
+TOTALS_ID = 'totals'
+
+RECONCILE_STATS_JOB = 'reconcile_stats'
+
+# How often the job worker rebuilds the counters, in seconds
+RECONCILE_INTERVAL = 3600
+
+
+def day_key(moment):
+    return moment.strftime('%Y-%m-%d')
+
+def is_voice_note(image):
+    return image.get('audio_filename') is not None
+
+def _counter_updates(image, delta):
+    created_at = image.get('created_at')
+    voice_notes = delta if is_voice_note(image) else 0
+    updates = [
+        UpdateOne({'_id': TOTALS_ID}, {'$inc': {'images': delta, 'voice_notes': voice_notes}}, upsert=True)
+    ]
+    if isinstance(created_at, datetime):
+        day = day_key(created_at)
+        updates.append(UpdateOne(
+            {'_id': f'day:{day}'},
+            {'$set': {'kind': 'day', 'day': day}, '$inc': {'images': delta, 'voice_notes': voice_notes}},
+            upsert=True
+        ))
+        if image.get('sentiment'):
+            updates.append(_sentiment_update(day, image['sentiment'], delta))
+    return updates
+
+def _sentiment_update(day, sentiment, delta):
+    return UpdateOne(
+        {'_id': f'day_sentiment:{day}:{sentiment}'},
+        {'$set': {'kind': 'day_sentiment', 'day': day, 'sentiment': sentiment}, '$inc': {'images': delta}},
+        upsert=True
+    )
+
+# Count a batch of newly saved images in one round trip
+def record_images_added(images):
+    updates = [update for image in images for update in _counter_updates(image, 1)]
+    if updates:
+        beehive_stats_collection.bulk_write(updates, ordered=False)
+
+# Uncount a deleted image
+def record_image_removed(image):
+    beehive_stats_collection.bulk_write(_counter_updates(image, -1), ordered=False)
+
+# Move an image between sentiment buckets after an edit
+def record_sentiment_changed(image, new_sentiment):
+    old_sentiment = image.get('sentiment')
+    created_at = image.get('created_at')
+    if old_sentiment == new_sentiment or not isinstance(created_at, datetime):
+        return
+    day = day_key(created_at)
+    updates = []
+    if old_sentiment:
+        updates.append(_sentiment_update(day, old_sentiment, -1))
+    if new_sentiment:
+        updates.append(_sentiment_update(day, new_sentiment, 1))
+    if updates:
+        beehive_stats_collection.bulk_write(updates, ordered=False)
+
+def get_totals():
+    totals = beehive_stats_collection.find_one({'_id': TOTALS_ID}) or {}
+    return {
+        'images': totals.get('images', 0),
+        'voice_notes': totals.get('voice_notes', 0)
+    }
+
+def get_day(moment):
+    day = beehive_stats_collection.find_one({'_id': f'day:{day_key(moment)}'}) or {}
+    return {
+        'images': day.get('images', 0),
+        'voice_notes': day.get('voice_notes', 0)
+    }
+
+# Rebuild every counter from the images collection
+def reconcile_stats():
+    voice_note = {'$cond': [{'$ifNull': ['$audio_filename', False]}, 1, 0]}
+    day = {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}}
+    has_date = {'$match': {'created_at': {'$type': 'date'}}}
+
+    totals = list(beehive_image_collection.aggregate([
+        {'$group': {'_id': None, 'images': {'$sum': 1}, 'voice_notes': {'$sum': voice_note}}}
+    ]))
+    days = beehive_image_collection.aggregate([
+        has_date,
+        {'$group': {'_id': day, 'images': {'$sum': 1}, 'voice_notes': {'$sum': voice_note}}}
+    ])
+    day_sentiments = beehive_image_collection.aggregate([
+        has_date,
+        {'$match': {'sentiment': {'$nin': [None, '']}}},
+        {'$group': {'_id': {'day': day, 'sentiment': '$sentiment'}, 'images': {'$sum': 1}}}
+    ])
+
+    reconciled_at = datetime.now()
+    totals = totals[0] if totals else {'images': 0, 'voice_notes': 0}
+    updates = [UpdateOne(
+        {'_id': TOTALS_ID},
+        {'$set': {'images': totals['images'], 'voice_notes': totals['voice_notes'], 'reconciled_at': reconciled_at}},
+        upsert=True
+    )]
+    for bucket in days:
+        updates.append(UpdateOne(
+            {'_id': f"day:{bucket['_id']}"},
+            {'$set': {'kind': 'day', 'day': bucket['_id'], 'images': bucket['images'],
+                      'voice_notes': bucket['voice_notes'], 'reconciled_at': reconciled_at}},
+            upsert=True
+        ))
+    for bucket in day_sentiments:
+        key = bucket['_id']
+        updates.append(UpdateOne(
+            {'_id': f"day_sentiment:{key['day']}:{key['sentiment']}"},
+            {'$set': {'kind': 'day_sentiment', 'day': key['day'], 'sentiment': key['sentiment'],
+                      'images': bucket['images'], 'reconciled_at': reconciled_at}},
+            upsert=True
+        ))
+    beehive_stats_collection.bulk_write(updates, ordered=False)
+
+    # Buckets of past days that no longer have any images. Today's buckets
+    # are left alone: uploads arriving during the rebuild may have created them.
+    beehive_stats_collection.delete_many({
+        'kind': {'$in': ['day', 'day_sentiment']},
+        'day': {'$lt': day_key(reconciled_at)},
+        'reconciled_at': {'$ne': reconciled_at}
+    })
+    return len(updates)
+
+
+@register_handler(RECONCILE_STATS_JOB)
+def handle_reconcile_stats_job(payload):
+    reconcile_stats()
+
+register_periodic(RECONCILE_STATS_JOB, RECONCILE_INTERVAL)
+
+
+if __name__ == '__main__':
+    # Build the counters for an existing deployment: python -m database.statsdatahandler
+    print(f"Reconciled {reconcile_stats()} counters")
@@ -0,0 +1,45 @@
+"""Single-use tickets for opening event streams.
+
+``EventSource`` cannot send an ``Authorization`` header, so stream URLs used
+to carry the Clerk session token, which then ended up in access and proxy
+logs. Instead the client mints a ticket with an authenticated ``POST`` and
+opens the stream with ``?ticket=``:
+
+    {'_id': <random ticket>, 'user_id': ..., 'path': '/api/chat/stream', 'expires_at': ...}
+
+A ticket only opens the stream at ``path``, expires after
+``STREAM_TICKET_TTL`` seconds and is deleted when redeemed, so one that leaks
+into a log is worthless. Unredeemed tickets are removed by a TTL index, which
+reads ``expires_at`` as UTC, so it is written and compared in UTC.
+"""
+
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from database import databaseConfig
+
+beehive_stream_ticket_collection = databaseConfig.get_beehive_stream_ticket_collection()
+
+STREAM_TICKET_TTL = int(os.getenv('STREAM_TICKET_TTL', 60))
+
+
+# Create a ticket for `user_id` to open the stream at `path`
+def mint_stream_ticket(user_id, path):
+    ticket = secrets.token_urlsafe(32)
+    beehive_stream_ticket_collection.insert_one({
+        '_id': ticket,
+        'user_id': user_id,
+        'path': path,
+        'expires_at': datetime.now(timezone.utc) + timedelta(seconds=STREAM_TICKET_TTL)
+    })
+    return ticket
+
+# Use up a ticket; returns its user id, or None if it is unknown, expired or for another stream
+def redeem_stream_ticket(ticket, path):
+    document = beehive_stream_ticket_collection.find_one_and_delete({
+        '_id': ticket,
+        'path': path,
+        'expires_at': {'$gt': datetime.now(timezone.utc)}
+    })
+    return document['user_id'] if document else None
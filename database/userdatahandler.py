@@ -1,14 +1,52 @@
-from datetime import datetime, timedelta
+import logging
+import os
+import threading
+from datetime import datetime
 # import re
 # import bcrypt
 from flask import session
 from database import databaseConfig
-import requests
-import os
+from database.analyticsdatahandler import SENTIMENTS, invalidate_rollup, sentiment_tags
+from database.notificationdatahandler import publish_notifications, reserve_seqs
+from database.userdirectoryhandler import resolve_users
+from database.statsdatahandler import (
+    get_day,
+    get_totals,
+    record_images_added,
+    record_image_removed,
+    record_sentiment_changed,
+)
+from bson import ObjectId
+from cachetools import TTLCache
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, ExecutionTimeout
+from utils.pagination import DEFAULT_PAGE_SIZE, paginate, parse_limit
+from utils.response_cache import DASHBOARD_SCOPE, invalidate, uploads_scope
 
+beehive_user_collection = databaseConfig.get_beehive_user_collection()
 beehive_image_collection = databaseConfig.get_beehive_image_collection()
 beehive_notification_collection = databaseConfig.get_beehive_notification_collection()
 
+# Only the fields the upload listings need
+IMAGE_LIST_PROJECTION = {
+    'filename': 1,
+    'original_filename': 1,
+    'title': 1,
+    'description': 1,
+    'audio_filename': 1,
+    'sentiment': 1,
+    'thumbnail_status': 1,
+    'variants': 1,
+    'voice_note': 1,
+    'created_at': 1
+}
+
+# Server-side time limit of search queries, in milliseconds
+SEARCH_MAX_TIME_MS = int(os.getenv('SEARCH_MAX_TIME_MS', 2000))
+
+_facet_cache = TTLCache(maxsize=256, ttl=int(os.getenv('SEARCH_FACET_CACHE_TTL', 60)))
+_facet_cache_lock = threading.Lock()
+
 # Get user by username from MongoDB
 def get_user_by_username(username: str):
     query = {
@@ -18,30 +56,127 @@ def get_user_by_username(username: str):
     return user
 
     
-# Save image to MongoDB  
-def save_image(id, filename, title, description, time_created,audio_filename=None,sentiment=None):
-    image = {
-        'user_id': id,
-        'filename': filename,
-        'title': title,
-        'description': description,
-        'created_at': time_created,
-        'audio_filename': audio_filename,
-        'sentiment': sentiment
-    }
-    beehive_image_collection.insert_one(image)
+def _failed_indexes(insert_many, documents):
+    """Run an unordered insert_many; return {index: error message} of the documents that failed."""
+    if not documents:
+        return {}
+    try:
+        insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        return {error['index']: error.get('errmsg', 'insert failed') for error in e.details.get('writeErrors', [])}
+    return {}
+
+# Save a batch of uploads with one insert for the images and one for the admin
+# notifications. `uploads` holds dicts with filename, title, description and
+# optionally audio_filename, sentiment and thumbnail_status. Returns one result
+# per upload, in order: {'image_id': id} or {'error': message}. An upload whose
+# notification cannot be saved has its image removed again, so every saved
+# image has a notification; if the batch fails halfway, everything it inserted
+# is removed before the error is raised. Once the records are saved, failing to
+# update the counters (repaired by reconcile_stats) or to notify open streams
+# is only logged.
+def save_uploads(user_id, username, uploads, time_created):
+    images = []
+    for upload in uploads:
+        image = {
+            '_id': ObjectId(),
+            'user_id': user_id,
+            'filename': upload['filename'],
+            'title': upload['title'],
+            'description': upload['description'],
+            'created_at': time_created,
+            'audio_filename': upload.get('audio_filename'),
+            'sentiment': upload.get('sentiment'),
+            'sentiment_tags': sentiment_tags(upload.get('sentiment'))
+        }
+        # Content-addressed uploads: display name, content hash and size of the blob
+        for field in ('original_filename', 'content_hash', 'size', 'thumbnail_status', 'voice_note'):
+            if upload.get(field) is not None:
+                image[field] = upload[field]
+        images.append(image)
+
+    errors = _failed_indexes(beehive_image_collection.insert_many, images)
+
+    saved = [i for i in range(len(images)) if i not in errors]
+    notifications = []
+    try:
+        first_seq = reserve_seqs(len(saved)) if saved else 0
+        notifications = [
+            {
+                "_id": ObjectId(),
+                "seq": first_seq + n,
+                "type": "image_upload",
+                "user_id": user_id,
+                "username": username,
+                "image_filename": images[i]['filename'],
+                "title": images[i]['title'],
+                "timestamp": time_created
+            }
+            for n, i in enumerate(saved)
+        ]
+        notification_errors = _failed_indexes(beehive_notification_collection.insert_many, notifications)
+    except Exception:
+        beehive_image_collection.delete_many({'_id': {'$in': [images[i]['_id'] for i in saved]}})
+        if notifications:
+            beehive_notification_collection.delete_many({'_id': {'$in': [n['_id'] for n in notifications]}})
+        raise
+    if notification_errors:
+        rolled_back = {saved[n]: message for n, message in notification_errors.items()}
+        beehive_image_collection.delete_many({'_id': {'$in': [images[i]['_id'] for i in rolled_back]}})
+        errors.update(rolled_back)
+
+    try:
+        publish_notifications([n for i, n in enumerate(notifications) if i not in notification_errors])
+    except Exception as e:
+        logging.error(f"Publishing upload notifications failed: {str(e)}")
+    try:
+        record_images_added([image for i, image in enumerate(images) if i not in errors])
+    except Exception as e:
+        logging.error(f"Counting uploads failed, left to reconcile_stats: {str(e)}")
+    if len(errors) < len(images):
+        invalidate(uploads_scope(user_id), DASHBOARD_SCOPE)
+    return [
+        {'error': errors[i]} if i in errors else {'image_id': images[i]['_id']}
+        for i in range(len(images))
+    ]
+
+# Update the thumbnail status of a PDF upload (pending, processing, ready, failed)
+def set_thumbnail_status(image_id, status):
+    image = beehive_image_collection.find_one_and_update(
+        {'_id': image_id},
+        {'$set': {'thumbnail_status': status}},
+        projection={'user_id': 1}
+    )
+    if image is not None:
+        invalidate(uploads_scope(image.get('user_id')))
+
+# Record the content hash and downscaled variants of an image
+def set_image_derivatives(image_id, content_hash, variants):
+    image = beehive_image_collection.find_one_and_update(
+        {'_id': image_id},
+        {'$set': {'content_hash': content_hash, 'variants': variants}},
+        projection={'user_id': 1}
+    )
+    if image is not None:
+        invalidate(uploads_scope(image.get('user_id')))
+
+# Record the transcoded voice note on every image using the recording at audio_filename
+def set_voice_note(audio_filename, voice_note):
+    beehive_image_collection.update_many(
+        {'audio_filename': audio_filename},
+        {'$set': {'voice_note': voice_note}}
+    )
+    # A recording is shared by the images of one upload batch, so this is one user
+    user_ids = beehive_image_collection.distinct('user_id', {'audio_filename': audio_filename})
+    invalidate(*(uploads_scope(user_id) for user_id in user_ids))
 
-# Count all images from MongoDB
+# Count all images (from the running counters)
 def total_images():
-    return beehive_image_collection.count_documents({})
+    return get_totals()['images']
 
-# Count all images from MongoDB uploaded today
+# Count all images uploaded today (from the running counters)
 def todays_images():
-    last_24_hours = datetime.now() - timedelta(hours=24)
-    recent_images_count = beehive_image_collection.count_documents({
-    "created_at": {"$gte": last_24_hours}
-    })
-    return recent_images_count
+    return get_day(datetime.now())['images']
 
 def getallusers():
     users = beehive_user_collection.find()
@@ -59,41 +194,117 @@ def get_currentuser_from_session():
     user = beehive_user_collection.find_one({'_id': user_id})
     return user
 
-# Get all images from MongoDB
-def get_images_by_user(user_id):
-    images = beehive_image_collection.find({'user_id': user_id})
-    return [{
+def format_image(image):
+    return {
         'id': str(image['_id']), 
         'filename': image['filename'], 
+        'original_filename': image.get('original_filename', image['filename']),
         'title': image['title'], 
         'description': image['description'], 
         'audio_filename': image.get('audio_filename', ""), 
         'sentiment': image.get('sentiment', ""),
+        'thumbnail_status': image.get('thumbnail_status', ""),
+        'variants': image.get('variants', {}),
+        'voice_note': image.get('voice_note'),
         'created_at': image['created_at']['$date'] if isinstance(image.get('created_at'), dict) else image.get('created_at')
-    } for image in images]
-
-# Get images by sentiments list from MongoDB ( Route to be used with the dreams prototype for analysis page)
-# def get_images_by_sentiments(username, sentiment_list, match_all):
-#     if match_all:
-#         # Match all tags (AND logic)
-#         query = {
-#             "username": username,
-#             "$and": [{"sentiment": {"$regex": tag, "$options": "i"}} for tag in sentiment_list]
-#         }
-#     else:
-#         # Match any tag (OR logic)
-#         query = {
-#             "username": username,
-#             "$or": [{"sentiment": {"$regex": tag, "$options": "i"}} for tag in sentiment_list]
-#         }
-
-#     images = beehive_image_collection.find(query)
-#     return [{'id': str(image['_id']), 
-#              'filename': image['filename'], 
-#              'title': image['title'], 
-#              'description': image['description'], 
-#              'audio_filename': image.get('audio_filename', ""), 
-#              'sentiment': image.get('sentiment', "")} for image in images]
+    }
+
+# Get one page of a user's images from MongoDB, newest first.
+# Returns (images, next_cursor); pass next_cursor back to get the following page.
+def get_images_by_user(user_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    images, next_cursor = paginate(
+        beehive_image_collection,
+        {'user_id': user_id},
+        'created_at',
+        limit,
+        cursor=cursor,
+        projection=IMAGE_LIST_PROJECTION
+    )
+    return [format_image(image) for image in images], next_cursor
+
+# Longest accepted search text, in characters
+MAX_SEARCH_TEXT = 200
+
+def parse_search_args(args):
+    """Search options from query parameters: q, sentiments (comma-separated), match (any/all), limit, cursor."""
+    text = (args.get('q') or '').strip()
+    if len(text) > MAX_SEARCH_TEXT:
+        raise ValueError(f'q must be at most {MAX_SEARCH_TEXT} characters')
+    match = (args.get('match') or 'any').lower()
+    if match not in ('any', 'all'):
+        raise ValueError("match must be 'any' or 'all'")
+    return {
+        'text': text or None,
+        'tags': sentiment_tags(args.get('sentiments') or ''),
+        'match_all': match == 'all',
+        'limit': parse_limit(args.get('limit')),
+        'cursor': args.get('cursor')
+    }
+
+def _search_scope(text=None, user_id=None):
+    query = {}
+    if user_id:
+        query['user_id'] = user_id
+    if text:
+        # Words are ORed; "quoted phrases" must all appear (text index on title and description)
+        query['$text'] = {'$search': text}
+    return query
+
+# Search uploads by words in title/description and by sentiment tags, newest
+# first, one page at a time. `tags` match any (default) or all of them.
+# Returns (images, next_cursor).
+def search_images(text=None, tags=(), match_all=False, user_id=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    query = _search_scope(text, user_id)
+    if tags:
+        query['sentiment_tags'] = {'$all' if match_all else '$in': list(tags)}
+    images, next_cursor = paginate(
+        beehive_image_collection,
+        query,
+        'created_at',
+        limit,
+        cursor=cursor,
+        projection=IMAGE_LIST_PROJECTION,
+        max_time_ms=SEARCH_MAX_TIME_MS
+    )
+    return [format_image(image) for image in images], next_cursor
+
+# Number of matching uploads per sentiment of static/sentiments.json, for the
+# same words and user but regardless of the selected tags, so every facet shows
+# what selecting it would add. Memoized per (text, user) because paging through
+# results does not change them. None if counting exceeds SEARCH_MAX_TIME_MS.
+def sentiment_facets(text=None, user_id=None):
+    key = (text or '', user_id or '')
+    with _facet_cache_lock:
+        if key in _facet_cache:
+            return _facet_cache[key]
+    try:
+        counts = {
+            bucket['_id']: bucket['count']
+            for bucket in beehive_image_collection.aggregate([
+                {'$match': {**_search_scope(text, user_id), 'sentiment_tags.0': {'$exists': True}}},
+                {'$project': {'sentiment_tags': 1}},
+                {'$unwind': '$sentiment_tags'},
+                {'$group': {'_id': '$sentiment_tags', 'count': {'$sum': 1}}}
+            ], maxTimeMS=SEARCH_MAX_TIME_MS)
+        }
+        facets = [{'sentiment': sentiment, 'count': counts.get(sentiment.lower(), 0)} for sentiment in SENTIMENTS]
+    except ExecutionTimeout:
+        # Too many matches to count in time; results are still served without counts
+        facets = None
+    with _facet_cache_lock:
+        _facet_cache[key] = facets
+    return facets
+
+# Fill in `sentiment_tags` for images saved before search existed, in one
+# server-side update
+def backfill_sentiment_tags():
+    parts = {'$split': [{'$ifNull': ['$sentiment', '']}, ',']}
+    tags = {'$map': {'input': parts, 'as': 'tag', 'in': {'$toLower': {'$trim': {'input': '$$tag'}}}}}
+    result = beehive_image_collection.update_many(
+        {'sentiment_tags': {'$exists': False}, 'sentiment': {'$type': 'string'}},
+        [{'$set': {'sentiment_tags': {'$setUnion': [{'$filter': {'input': tags, 'as': 'tag', 'cond': {'$ne': ['$$tag', '']}}}]}}}]
+    )
+    return result.modified_count
 
 # Update image in MongoDB
 def update_image(image_id, title, description, sentiment=None):
@@ -105,15 +316,34 @@ def update_image(image_id, title, description, sentiment=None):
     # Only include sentiment in the update if it is provided by the user
     if sentiment is not None:
         update_data['sentiment'] = sentiment
+        update_data['sentiment_tags'] = sentiment_tags(sentiment)
         
-    beehive_image_collection.update_one(
+    previous = beehive_image_collection.find_one_and_update(
         {'_id': image_id}, 
-        {'$set': update_data}
+        {'$set': update_data},
+        projection={'user_id': 1, 'sentiment': 1, 'created_at': 1},
+        return_document=ReturnDocument.BEFORE
     )
+    if previous is not None:
+        invalidate(uploads_scope(previous.get('user_id')), DASHBOARD_SCOPE)
+    if previous is not None and sentiment is not None and previous.get('sentiment') != sentiment:
+        record_sentiment_changed(previous, sentiment)
+        invalidate_rollup(previous.get('created_at'))
 
 # Delete image from MongoDB
 def delete_image(image_id):
-    beehive_image_collection.delete_one({'_id': image_id})
+    deleted = beehive_image_collection.find_one_and_delete(
+        {'_id': image_id},
+        projection={'user_id': 1, 'audio_filename': 1, 'sentiment': 1, 'created_at': 1}
+    )
+    if deleted is not None:
+        record_image_removed(deleted)
+        invalidate_rollup(deleted.get('created_at'))
+        invalidate(uploads_scope(deleted.get('user_id')), DASHBOARD_SCOPE)
+
+# Whether any image still has the content `content_hash`
+def content_hash_in_use(content_hash):
+    return beehive_image_collection.find_one({'content_hash': content_hash}, {'_id': 1}) is not None
 
 # Get image by ID from MongoDB
 def get_image_by_id(image_id):
@@ -122,51 +352,42 @@ def get_image_by_id(image_id):
 
 # Get upload statistics for admin dashboard
 def get_upload_stats():
-    """Get statistics for admin dashboard including total users, images, and voice notes."""
+    """Get statistics for admin dashboard including total images and voice notes.
+
+    Reads the running counters maintained on save/delete, so the cost does not
+    depend on the number of uploads.
+    """
     try:
-        # Count total images
-        total_images = beehive_image_collection.count_documents({})
-        
-        # Count voice notes (images with audio_filename)
-        total_voice_notes = beehive_image_collection.count_documents({
-            "audio_filename": {"$exists": True, "$ne": None}
-        })
+        totals = get_totals()
+        total_images = totals['images']
+        total_voice_notes = totals['voice_notes']
         
         return {
             'totalImages': total_images,
             'totalVoiceNotes': total_voice_notes,
-            'totalMedia': total_images + total_voice_notes
+            'totalMedia': total_images + total_voice_notes,
+            'todayImages': todays_images()
         }
     except Exception as e:
         print(f"Error getting upload stats: {str(e)}")
         return {
             'totalImages': 0,
             'totalVoiceNotes': 0,
-            'totalMedia': 0
+            'totalMedia': 0,
+            'todayImages': 0
         }
 
 # Get recent uploads for admin dashboard
 def get_recent_uploads(limit=10):
-    """Get recent uploads with user information from Clerk for admin dashboard."""
+    """Get recent uploads with user information for admin dashboard."""
     try:
         #  Get recent uploads sorted by creation date
         recent_uploads = list(beehive_image_collection.find().sort('created_at', -1).limit(limit))
         if not recent_uploads:
             return []
         
-        user_ids = list({str(upload.get('user_id')) for upload in recent_uploads if upload.get('user_id')})
-
-        clerk_api_key = os.getenv('CLERK_SECRET_KEY')
-        headers = {'Authorization': f'Bearer {clerk_api_key}'}
-
-        response = requests.get(
-            'http://127.0.0.1:5000/api/admin/users',
-            headers=headers,
-            params={'query': ','.join(user_ids), 'limit': len(user_ids)}
-        )
-        users_data = response.json().get('users', []) if response.ok else []
-        # map of user_id to user info
-        user_map = {user['id']: user for user in users_data}
+        # Resolve names in-process with one batched lookup
+        user_map = resolve_users(str(upload.get('user_id')) for upload in recent_uploads if upload.get('user_id'))
 
         # uploads list with user info
         uploads_list = []
@@ -190,19 +411,11 @@ def get_recent_uploads(limit=10):
         print(f"Error getting recent uploads: {str(e)}")
         return []
 
-def save_notification(user_id, username, filename, title, time_created,sentiment):
-            # Insert notification for admin
-                notification = {
-                    "type": "image_upload",
-                    "user_id": user_id,
-                    "username": username,
-                    "image_filename": filename,
-                    "title": title,
-                    "timestamp": time_created,
-                    "seen": False
-                }
-                beehive_notification_collection.insert_one(notification)    
-
 def get_all_users():
     users = beehive_user_collection.find({}, {'_id': 1, 'username': 1})
     return list(users)    
+
+
+if __name__ == '__main__':
+    # Tag images saved before search existed: python -m database.userdatahandler
+    print(f"Tagged {backfill_sentiment_tags()} images")
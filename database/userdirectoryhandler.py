@@ -0,0 +1,168 @@
+"""Local mirror of the Clerk user list.
+
+The admin user pages search, filter by role and paginate against the
+``clerk_users`` collection instead of calling Clerk on every request. The
+mirror is kept up to date by Clerk webhooks (``upsert_user``/``delete_user``)
+and by a full sync whenever it is older than ``USER_DIRECTORY_TTL`` seconds.
+The first request waits for the initial sync; later refreshes run in a
+background thread while requests are served from the existing copy.
+"""
+
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from cachetools import TTLCache
+from pymongo import UpdateOne
+
+from database import databaseConfig
+from utils.clerk_backend import get_clerk_backend, iter_all_users, transform_user
+from utils.response_cache import USERS_SCOPE, invalidate
+
+beehive_clerk_user_collection = databaseConfig.get_beehive_clerk_user_collection()
+beehive_sync_state_collection = databaseConfig.get_beehive_sync_state_collection()
+
+USER_DIRECTORY_TTL = timedelta(seconds=int(os.getenv('USER_DIRECTORY_TTL', 300)))
+
+SYNC_STATE_ID = 'clerk_users'
+
+_sync_lock = threading.Lock()
+
+# Recently resolved users by id (None for ids with no user), for decorating
+# lists of uploads without a query per row
+_resolved_users = TTLCache(maxsize=4096, ttl=int(os.getenv('USER_RESOLVE_CACHE_TTL', 60)))
+_resolved_users_lock = threading.Lock()
+
+
+def user_document(user, synced_at):
+    """Build the stored document from a Clerk user object."""
+    document = transform_user(user)
+    document['_id'] = document['id']
+    # Lowercased text the search box matches against
+    document['search'] = f"{document['name']} {document['email'] or ''}".lower()
+    document['synced_at'] = synced_at
+    return document
+
+def format_directory_user(document):
+    return {
+        'id': document['id'],
+        'name': document['name'],
+        'email': document['email'],
+        'role': document['role'],
+        'lastActive': document.get('lastActive'),
+        'image': document.get('image'),
+        'clerkId': document['clerkId']
+    }
+
+# Insert or update one user (Clerk user.created / user.updated webhooks)
+def upsert_user(user):
+    document = user_document(user, datetime.now())
+    beehive_clerk_user_collection.replace_one({'_id': document['_id']}, document, upsert=True)
+
+    with _resolved_users_lock:
+        _resolved_users.pop(document['_id'], None)
+    invalidate(USERS_SCOPE)
+
+# Remove one user (Clerk user.deleted webhook)
+def delete_user(user_id):
+    beehive_clerk_user_collection.delete_one({'_id': user_id})
+    with _resolved_users_lock:
+        _resolved_users.pop(user_id, None)
+    invalidate(USERS_SCOPE)
+
+# Replace the mirror with the current Clerk user list
+def sync_users(backend=None):
+    backend = backend or get_clerk_backend()
+    synced_at = datetime.now()
+    batch = []
+    count = 0
+    for user in iter_all_users(backend):
+        document = user_document(user, synced_at)
+        batch.append(UpdateOne({'_id': document['_id']}, {'$set': document}, upsert=True))
+        if len(batch) >= 500:
+            beehive_clerk_user_collection.bulk_write(batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        beehive_clerk_user_collection.bulk_write(batch, ordered=False)
+        count += len(batch)
+
+    # Users not seen in this sync were deleted in Clerk
+    beehive_clerk_user_collection.delete_many({'synced_at': {'$lt': synced_at}})
+    beehive_sync_state_collection.update_one(
+        {'_id': SYNC_STATE_ID},
+        {'$set': {'synced_at': synced_at, 'count': count}},
+        upsert=True
+    )
+    invalidate(USERS_SCOPE)
+    return count
+
+def last_synced_at():
+    state = beehive_sync_state_collection.find_one({'_id': SYNC_STATE_ID})
+    return state['synced_at'] if state else None
+
+def _sync_in_background():
+    try:
+        sync_users()
+    except Exception as e:
+        logging.error(f"User directory sync failed: {str(e)}")
+    finally:
+        _sync_lock.release()
+
+# Make sure the mirror exists and schedule a refresh when it is stale
+def ensure_fresh():
+    synced_at = last_synced_at()
+    if synced_at is None:
+        # Nothing to serve yet: sync now (other requests wait for this one)
+        with _sync_lock:
+            if last_synced_at() is None:
+                sync_users()
+        return
+    if datetime.now() - synced_at > USER_DIRECTORY_TTL and _sync_lock.acquire(blocking=False):
+        threading.Thread(target=_sync_in_background, name='user-directory-sync', daemon=True).start()
+
+# Search the mirror. `query` matches name or email (case insensitive),
+# `role` filters before paginating so pages are always full.
+# Returns (users, total_count).
+def search_users(query='', role=None, limit=10, offset=0):
+    ensure_fresh()
+    filters = {}
+    if query:
+        filters['search'] = {'$regex': re.escape(query.lower())}
+    if role:
+        filters['role'] = role
+    total = beehive_clerk_user_collection.count_documents(filters)
+    documents = (
+        beehive_clerk_user_collection.find(filters)
+        .sort([('createdAt', -1), ('_id', 1)])
+        .skip(offset)
+        .limit(limit)
+    )
+    return [format_directory_user(d) for d in documents], total
+
+# Look up users by id: memoized ids are answered from memory, the rest with a
+# single query. Returns {id: user or None}.
+def resolve_users(user_ids):
+    user_ids = set(user_ids)
+    resolved = {}
+    with _resolved_users_lock:
+        for user_id in user_ids:
+            if user_id in _resolved_users:
+                resolved[user_id] = _resolved_users[user_id]
+    missing = user_ids - set(resolved)
+    if missing:
+        ensure_fresh()
+        found = {
+            d['_id']: format_directory_user(d)
+            for d in beehive_clerk_user_collection.find({'_id': {'$in': list(missing)}})
+        }
+        with _resolved_users_lock:
+            for user_id in missing:
+                resolved[user_id] = _resolved_users[user_id] = found.get(user_id)
+    return resolved
+
+# Look up one user by id
+def resolve_user(user_id):
+    return resolve_users([user_id]).get(user_id)
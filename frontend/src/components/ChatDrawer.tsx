@@ -17,9 +17,9 @@ interface ChatUser {
 const ChatDrawer: React.FC<ChatDrawerProps> = ({ userId, userRole, targetUserId, onClose }) => {
   const clerk = useClerk();
   const [messages, setMessages] = useState<any[]>([]);
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
-  const [pollInterval, setPollInterval] = useState<number | null>(null);
   const [adminTargetId, setAdminTargetId] = useState(targetUserId || '');
   const [userList, setUserList] = useState<ChatUser[]>([]);
   const [selectedUser, setSelectedUser] = useState<ChatUser | null>(null);
@@ -56,31 +56,107 @@ const ChatDrawer: React.FC<ChatDrawerProps> = ({ userId, userRole, targetUserId,
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages]);
 
-  // Poll for messages
+  // Add messages that are not shown yet (the stream may echo our own messages)
+  const appendMessages = (incoming: any[]) => {
+    setMessages((prev) => {
+      const seen = new Set(prev.map((m) => m._id));
+      return [...prev, ...incoming.filter((m) => !seen.has(m._id))];
+    });
+  };
+
+  // Load the history once, then receive new messages over Server-Sent Events
   useEffect(() => {
     const id = userRole === 'admin' ? adminTargetId : userId;
-    if (!userId || (userRole === 'admin' && !adminTargetId)) return;
-    fetchMessages();
-    if (pollInterval) clearInterval(pollInterval);
-    const interval = window.setInterval(fetchMessages, 5000);
-    setPollInterval(interval);
-    return () => clearInterval(interval);
+    if (!userId || !id) return;
+
+    let source: EventSource | null = null;
+    let retryTimer: number | undefined;
+    let closed = false;
+    let lastCursor: string | null = null;
+
+    const connect = async () => {
+      // EventSource cannot send the session token; open the stream with a single-use ticket
+      const token = await clerk.session?.getToken();
+      const ticketResponse = await fetch('http://127.0.0.1:5000/api/stream_tickets', {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' },
+        body: JSON.stringify({ path: '/api/chat/stream' }),
+      }).catch(() => null);
+      if (closed) return;
+      if (!ticketResponse?.ok) {
+        retryTimer = window.setTimeout(connect, 3000);
+        return;
+      }
+      const { ticket } = await ticketResponse.json();
+      const params = new URLSearchParams({ user_id: id, ticket });
+      if (lastCursor) params.set('since', lastCursor);
+      source = new EventSource(`http://127.0.0.1:5000/api/chat/stream?${params}`);
+      source.addEventListener('message', (event) => {
+        const message = JSON.parse((event as MessageEvent).data);
+        lastCursor = message.cursor;
+        appendMessages([message]);
+      });
+      source.onerror = () => {
+        // The server ends streams periodically; reconnect and catch up from lastCursor
+        source?.close();
+        if (!closed) retryTimer = window.setTimeout(connect, 3000);
+      };
+    };
+
+    const start = async () => {
+      setMessages([]);
+      const history = await fetchMessages(id);
+      if (history.length > 0) lastCursor = history[history.length - 1].cursor;
+      connect();
+    };
+    start();
+
+    return () => {
+      closed = true;
+      source?.close();
+      window.clearTimeout(retryTimer);
+    };
     // eslint-disable-next-line
   }, [userId, userRole, adminTargetId]);
 
-  const fetchMessages = async () => {
+  const fetchMessages = async (id: string) => {
     try {
-      const id = userRole === 'admin' ? adminTargetId : userId;
-      if (!id) return;
       const token = await clerk.session?.getToken();
       const res = await fetch(`http://127.0.0.1:5000/api/chat/messages?user_id=${id}`, {
         headers: {
           'Authorization': `Bearer ${token}`,
         },
       });
+      if (!res.ok) return [];
+      const data = await res.json();
+      const history = data.messages || [];
+      setMessages(history);
+      setOlderCursor(data.has_more ? data.before_cursor : null);
+      return history;
+    } catch {
+      return [];
+    }
+  };
+
+  // Load the window of messages before the oldest one shown
+  const fetchOlderMessages = async () => {
+    const id = userRole === 'admin' ? adminTargetId : userId;
+    if (!id || !olderCursor) return;
+    try {
+      const token = await clerk.session?.getToken();
+      const params = new URLSearchParams({ user_id: id, before: olderCursor });
+      const res = await fetch(`http://127.0.0.1:5000/api/chat/messages?${params}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`,
+        },
+      });
       if (!res.ok) return;
       const data = await res.json();
-      setMessages(data.messages || []);
+      setMessages((prev) => {
+        const seen = new Set(prev.map((m) => m._id));
+        return [...(data.messages || []).filter((m: any) => !seen.has(m._id)), ...prev];
+      });
+      setOlderCursor(data.has_more ? data.before_cursor : null);
     } catch {}
   };
 
@@ -105,8 +181,9 @@ const ChatDrawer: React.FC<ChatDrawerProps> = ({ userId, userRole, targetUserId,
         body: JSON.stringify(payload),
       });
       if (res.ok) {
+        const data = await res.json();
         setInput('');
-        fetchMessages();
+        appendMessages([data.data]);
       }
     } finally {
       setLoading(false);
@@ -157,6 +234,13 @@ const ChatDrawer: React.FC<ChatDrawerProps> = ({ userId, userRole, targetUserId,
             <button onClick={onClose} className="text-yellow-500 hover:text-yellow-700 text-2xl sm:text-2xl font-bold px-2 py-1 sm:px-0 sm:py-0">&times;</button>
           </div>
           <div className="flex-1 overflow-y-auto p-3 sm:p-6 space-y-2 sm:space-y-3 custom-scrollbar bg-white">
+            {olderCursor && (
+              <div className="text-center">
+                <button onClick={fetchOlderMessages} className="text-xs sm:text-sm text-yellow-700 hover:underline">
+                  Load earlier messages
+                </button>
+              </div>
+            )}
             {messages.length === 0 ? (
               <div className="text-gray-400 text-center text-sm sm:text-base">No messages yet.</div>
             ) : (
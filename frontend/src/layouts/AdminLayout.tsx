@@ -5,6 +5,8 @@ import { useTheme } from '../context/ThemeContext';
 import { useState, useEffect, useRef } from 'react';
 import ChatDrawer from '../components/ChatDrawer';
 
+const NOTIFICATION_PAGE_SIZE = 20;
+
 const AdminLayout = () => {
   const { theme, toggleTheme } = useTheme();
   const location = useLocation();
@@ -24,6 +26,7 @@ const AdminLayout = () => {
   // Notification state
   const [notifications, setNotifications] = useState<any[]>([]);
   const [unseenCount, setUnseenCount] = useState(0);
+  const [notificationCursor, setNotificationCursor] = useState<string | null>(null);
   const [dropdownOpen, setDropdownOpen] = useState(false);
   const dropdownRef = useRef<HTMLDivElement>(null);
   const [chatOpen, setChatOpen] = useState(false);
@@ -32,42 +35,93 @@ const AdminLayout = () => {
   // Sidebar state
   const [sidebarOpen, setSidebarOpen] = useState(false);
 
-  // Poll for unseen notifications
+  // Load the unread count, then receive new notifications over Server-Sent Events
   useEffect(() => {
     if (!isAdmin) return;
-    const interval = setInterval(fetchUnseenNotifications, 10000);
-    fetchUnseenNotifications();
-    return () => clearInterval(interval);
+
+    let source: EventSource | null = null;
+    let retryTimer: number | undefined;
+    let closed = false;
+    let lastSeq: number | null = null;
+
+    const connect = async () => {
+      // EventSource cannot send the session token; open the stream with a single-use ticket
+      const token = await clerk.session?.getToken();
+      const ticketResponse = await fetch('http://127.0.0.1:5000/api/stream_tickets', {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' },
+        body: JSON.stringify({ path: '/api/admin/notifications/stream' }),
+      }).catch(() => null);
+      if (closed) return;
+      if (!ticketResponse?.ok) {
+        retryTimer = window.setTimeout(connect, 3000);
+        return;
+      }
+      const { ticket } = await ticketResponse.json();
+      const params = new URLSearchParams({ ticket });
+      if (lastSeq !== null) params.set('since', String(lastSeq));
+      source = new EventSource(`http://127.0.0.1:5000/api/admin/notifications/stream?${params}`);
+      source.addEventListener('notification', (event) => {
+        const notification = JSON.parse((event as MessageEvent).data);
+        lastSeq = notification.seq;
+        setUnseenCount((count) => count + 1);
+        setNotifications((previous) =>
+          previous.some((n) => n.seq === notification.seq) ? previous : [notification, ...previous]
+        );
+      });
+      source.onerror = () => {
+        // The server ends streams periodically; reconnect and catch up from lastSeq
+        source?.close();
+        if (!closed) retryTimer = window.setTimeout(connect, 3000);
+      };
+    };
+
+    fetchUnseenNotifications().then((data) => {
+      // Resume from the newest notification counted, so none arrive unseen in between
+      if (data?.latest_seq) lastSeq = data.latest_seq;
+      connect();
+    });
+
+    return () => {
+      closed = true;
+      source?.close();
+      window.clearTimeout(retryTimer);
+    };
+    // eslint-disable-next-line
   }, [isAdmin]);
 
-  // Fetch unseen notifications (for polling and badge)
+  // Fetch the unread count (for the badge)
   const fetchUnseenNotifications = async () => {
     try {
       const token = await clerk.session?.getToken();
-      const response = await fetch('http://127.0.0.1:5000/api/admin/notifications', {
+      const response = await fetch('http://127.0.0.1:5000/api/admin/notifications/unread_count', {
         method: 'GET',
         headers: {
           'Authorization': `Bearer ${token}`,
         },
         credentials: 'include',
       });
-      if (!response.ok) return;
+      if (!response.ok) return null;
       const data = await response.json();
-      if (data.notifications && data.notifications.length > 0) {
-        setUnseenCount(data.notifications.length);
-      } else {
-        setUnseenCount(0);
-      }
+      setUnseenCount(data.unread_count || 0);
+      return data;
     } catch (e) {
       // Ignore notification errors
+      return null;
     }
   };
 
-  // Fetch and mark notifications as seen when dropdown opens
-  const fetchAndMarkNotifications = async () => {
+  // Fetch a page of the feed; the first page also marks everything as seen
+  const fetchAndMarkNotifications = async (cursor?: string) => {
     try {
       const token = await clerk.session?.getToken();
-      const response = await fetch('http://127.0.0.1:5000/api/admin/notifications?mark_seen=true', {
+      const params = new URLSearchParams({ limit: String(NOTIFICATION_PAGE_SIZE) });
+      if (cursor) {
+        params.set('cursor', cursor);
+      } else {
+        params.set('mark_seen', 'true');
+      }
+      const response = await fetch(`http://127.0.0.1:5000/api/admin/notifications?${params}`, {
         method: 'GET',
         headers: {
           'Authorization': `Bearer ${token}`,
@@ -77,8 +131,9 @@ const AdminLayout = () => {
       if (!response.ok) return;
       const data = await response.json();
       if (data.notifications) {
-        setNotifications(data.notifications);
-        setUnseenCount(0);
+        setNotifications((previous) => (cursor ? [...previous, ...data.notifications] : data.notifications));
+        setNotificationCursor(data.next_cursor);
+        setUnseenCount(data.unread_count || 0);
       }
     } catch (e) {
       // Ignore notification errors
@@ -196,17 +251,25 @@ const AdminLayout = () => {
                       <div className="p-4 max-h-80 overflow-y-auto">
                         <h3 className="text-sm font-semibold mb-2 text-gray-700 dark:text-gray-200">Notifications</h3>
                         {notifications.length === 0 ? (
-                          <div className="text-gray-500 text-sm">No new notifications</div>
+                          <div className="text-gray-500 text-sm">No notifications</div>
                         ) : (
                           <ul>
                             {notifications.map((notif, idx) => (
-                              <li key={notif._id || idx} className="mb-2 last:mb-0 text-sm text-gray-800 dark:text-gray-100">
+                              <li key={notif._id || idx} className={`mb-2 last:mb-0 text-sm text-gray-800 dark:text-gray-100 ${notif.seen ? 'opacity-70' : ''}`}>
                                 <span className="font-medium">Image uploaded by {notif.username || 'a user'}</span>: {notif.title}
                                 <div className="text-xs text-gray-500">{notif.timestamp ? new Date(notif.timestamp).toLocaleString() : ''}</div>
                               </li>
                             ))}
                           </ul>
                         )}
+                        {notificationCursor && (
+                          <button
+                            onClick={() => fetchAndMarkNotifications(notificationCursor)}
+                            className="mt-2 text-xs font-medium text-blue-600 hover:underline dark:text-blue-400"
+                          >
+                            Load older
+                          </button>
+                        )}
                       </div>
                     </div>
                   )}
@@ -15,6 +15,20 @@ import {
 import toast from 'react-hot-toast';
 import { motion, useScroll, useTransform, AnimatePresence } from 'framer-motion';
 
+// Transcoded voice note, filled in by the job worker after upload
+interface VoiceNote {
+  status: 'pending' | 'ready' | 'failed';
+  key?: string;
+  duration?: number;
+  peaks?: number[];
+}
+
+// Play the compressed transcode once it exists, the original recording until then
+const voiceNoteSrc = (upload: { audio_filename?: string; voice_note?: VoiceNote | null }) =>
+  `http://127.0.0.1:5000/media/${
+    upload.voice_note?.status === 'ready' && upload.voice_note.key ? upload.voice_note.key : upload.audio_filename
+  }`;
+
 interface Upload {
   id: string;
   filename: string;
@@ -22,9 +36,13 @@ interface Upload {
   description: string;
   created_at: string;
   audio_filename?: string;
+  voice_note?: VoiceNote | null;
   sentiment?: string;
+  variants?: Record<string, Record<string, string>>;
 }
 
+const PAGE_SIZE = 50;
+
 interface EditModalProps {
   image: Upload;
   onClose: () => void;
@@ -109,6 +127,8 @@ const Gallery = () => {
   const { user } = useUser();
   const [images, setImages] = useState<Upload[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [editingImage, setEditingImage] = useState<Upload | null>(null);
   const [selectedFile, setSelectedFile] = useState<string | null>(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
@@ -120,50 +140,55 @@ const Gallery = () => {
   const [currentRollingIndex, setCurrentRollingIndex] = useState(0);
   const rollingContainerRef = useRef<HTMLDivElement>(null);
 
-  useEffect(() => {
-    const fetchUploads = async () => {
-      if (!user?.id) return;
-      
-      try {
+  const fetchUploads = async (cursor?: string) => {
+    if (!user?.id) return;
+
+    try {
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
         setLoading(true);
-        
-        // Get the authentication token from Clerk
-        const token = await window.Clerk.session?.getToken();
-        
-        const response = await fetch(`http://127.0.0.1:5000/api/user/user_uploads/${user.id}`, {
-          method: 'GET',
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`,
-          },
-          credentials: 'include',
-          mode: 'cors'
-        });
-        
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
-        if (data.error) {
-          throw new Error(data.error);
-        }
-        
-        const sortedImages: Upload[] = data.images.sort((a: Upload, b: Upload) =>
-          new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
-        );
-
-        setImages(sortedImages);
-        console.log(sortedImages);
-      } catch (error) {
-        console.error('Error fetching uploads:', error);
-          toast.error('Failed to fetch uploads');
-      } finally {
-        setLoading(false);
       }
-    };
 
+      // Get the authentication token from Clerk
+      const token = await window.Clerk.session?.getToken();
+
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+      if (cursor) params.set('cursor', cursor);
+      const response = await fetch(`http://127.0.0.1:5000/api/user/user_uploads/${user.id}?${params}`, {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`,
+        },
+        credentials: 'include',
+        mode: 'cors'
+      });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const data = await response.json();
+      if (data.error) {
+        throw new Error(data.error);
+      }
+
+      // Pages arrive newest first
+      setImages((prev) => (cursor ? [...prev, ...data.images] : data.images));
+      setNextCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error('Error fetching uploads:', error);
+      toast.error('Failed to fetch uploads');
+    } finally {
+      setLoading(false);
+      setLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
     fetchUploads();
+    // eslint-disable-next-line
   }, [user?.id]);
 
   const handleEdit = (image: Upload) => {
@@ -246,7 +271,7 @@ const Gallery = () => {
   };
 
   const handleDownload = (filename: string) => {
-    const url = `http://127.0.0.1:5000/static/uploads/${filename}`;
+    const url = `http://127.0.0.1:5000/media/${filename}`;
     window.open(url, '_blank');
     toast.success('File opened in new window!');
   };
@@ -272,7 +297,7 @@ const Gallery = () => {
   const renderFilePreview = () => {
     if (!selectedFile) return null;
 
-    const fileUrl = `http://127.0.0.1:5000/static/uploads/${selectedFile}`;
+    const fileUrl = `http://127.0.0.1:5000/media/${selectedFile}`;
     const isPDF = selectedFile.toLowerCase().endsWith('.pdf');
 
     if (isPDF) {
@@ -294,13 +319,17 @@ const Gallery = () => {
     );
   };
 
-  const getThumbnailUrl = (filename: string) => {
-    if (filename.toLowerCase().endsWith('.pdf')) {
+  const getThumbnailUrl = (image: Upload, size: 'small' | 'medium' = 'small') => {
+    if (image.filename.toLowerCase().endsWith('.pdf')) {
       // For PDFs, use the thumbnail
-      return `http://127.0.0.1:5000/static/uploads/thumbnails/${filename.replace('.pdf', '.jpg')}`;
+      return `http://127.0.0.1:5000/thumbnails/${image.filename}`;
+    }
+    // For images, prefer the downscaled variant; the backend renders it on first request
+    const variant = image.variants?.[size]?.webp;
+    if (variant) {
+      return `http://127.0.0.1:5000/media/${variant}`;
     }
-    // For images, use the original file
-    return `http://127.0.0.1:5000/static/uploads/${filename}`;
+    return `http://127.0.0.1:5000/derivatives/${image.id}/${size}`;
   };
 
   const getSentimentColor = (sentiment?: string) => {
@@ -402,7 +431,7 @@ const Gallery = () => {
               <div className="relative w-full h-full max-w-5xl mx-auto">
                 <div className="relative w-full h-full rounded-2xl overflow-hidden shadow-2xl">
                   <img
-                    src={getThumbnailUrl(images[currentRollingIndex].filename)}
+                    src={getThumbnailUrl(images[currentRollingIndex], 'medium')}
                     alt={images[currentRollingIndex].title}
                     className="w-full h-full object-contain bg-gray-100 dark:bg-gray-800"
                   />
@@ -631,7 +660,7 @@ const Gallery = () => {
                   transition={{ duration: 0.2 }}
                 >
                   <img
-                    src={getThumbnailUrl(image.filename)}
+                    src={getThumbnailUrl(image)}
                     alt={image.title}
                     className={`w-full h-full object-cover transition-transform duration-200`}
                   />
@@ -727,7 +756,7 @@ const Gallery = () => {
                       {currentAudio === image.audio_filename && (
                         <motion.audio
                           ref={audioRef}
-                          src={`http://127.0.0.1:5000/audio/${image.audio_filename}`}
+                          src={voiceNoteSrc(image)}
                           controls
                           className="h-6"
                           onEnded={() => setCurrentAudio(null)}
@@ -744,6 +773,18 @@ const Gallery = () => {
           </div>
         )}
 
+        {!loading && nextCursor && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={() => fetchUploads(nextCursor)}
+              disabled={loadingMore}
+              className="px-6 py-2 rounded-full bg-yellow-400 hover:bg-yellow-500 text-black font-bold shadow-md transition disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
+
         {editingImage && (
           <EditModal
             image={editingImage}
@@ -98,8 +98,11 @@ const Upload = () => {
       };
 
       mediaRecorder.onstop = () => {
-        const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/wav' });
-        const audioFile = new File([audioBlob], 'voice-note.wav', { type: 'audio/wav' });
+        // MediaRecorder produces WebM/Ogg (or MP4) audio depending on the browser
+        const mimeType = (mediaRecorder.mimeType || 'audio/webm').split(';')[0];
+        const extension = mimeType.includes('ogg') ? 'ogg' : mimeType.includes('mp4') ? 'm4a' : 'webm';
+        const audioBlob = new Blob(audioChunksRef.current, { type: mimeType });
+        const audioFile = new File([audioBlob], `voice-note.${extension}`, { type: mimeType });
         setSelectedVoiceNote(audioFile);
         stream.getTracks().forEach((track) => track.stop());
       };
@@ -170,21 +173,9 @@ const Upload = () => {
       formData.append('description', description);
       formData.append('sentiment', sentiment === 'custom' ? customSentiment : sentiment);
       
-      // Add audio data if available
+      // Add the voice note as a file part; the server transcodes it in the background
       if (selectedVoiceNote) {
-        const audioReader = new FileReader();
-        audioReader.readAsDataURL(selectedVoiceNote);
-        await new Promise((resolve, reject) => {
-          audioReader.onloadend = async () => {
-            try {
-              formData.append('audioData', audioReader.result as string);
-              resolve(null);
-            } catch (error) {
-              reject(error);
-            }
-          };
-          audioReader.onerror = reject;
-        });
+        formData.append('audio', selectedVoiceNote);
       }
       // Make the upload request
       const token = await clerk.session?.getToken();
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
 import {
   CalendarIcon,
   ChartBarIcon,
@@ -7,47 +7,33 @@ import {
   ArrowDownIcon,
 } from '@heroicons/react/24/outline';
 
-// Mock data - replace with actual data from backend
-const mockAnalytics = {
-  uploadStats: {
-    total: 675,
-    increase: 12.5,
-    timeframe: 'This month',
-    breakdown: {
-      images: 450,
-      voiceNotes: 225,
-    },
-  },
-  userStats: {
-    total: 150,
-    increase: 8.3,
-    timeframe: 'This month',
-    activeUsers: 120,
-  },
-  sentimentAnalysis: {
-    positive: 45,
-    neutral: 35,
-    negative: 20,
-  },
-  recentTrends: [
-    {
-      date: '2024-01',
-      uploads: 150,
-      users: 45,
-    },
-    {
-      date: '2024-02',
-      uploads: 180,
-      users: 52,
-    },
-    {
-      date: '2024-03',
-      uploads: 210,
-      users: 58,
-    },
-    // Add more trend data as needed
-  ],
-};
+// Types for the analytics data (see GET /api/admin/analytics)
+interface PeriodStats {
+  uploads: number;
+  images: number;
+  voiceNotes: number;
+  activeUsers: number;
+}
+
+interface DailyStats extends PeriodStats {
+  date: string;
+}
+
+interface WeeklyStats extends PeriodStats {
+  week: string;
+  start: string;
+}
+
+interface AnalyticsData {
+  range: { start: string; end: string; days: number };
+  totals: PeriodStats;
+  daily: DailyStats[];
+  weekly: WeeklyStats[];
+  sentiments: { sentiment: string; count: number }[];
+  users: { userId: string; name: string; uploads: number }[];
+}
+
+const RANGES = [7, 30, 90, 365];
 
 const StatCard = ({
   title,
@@ -58,7 +44,7 @@ const StatCard = ({
 }: {
   title: string;
   value: number;
-  change: number;
+  change?: number;
   timeframe: string;
   icon: React.ElementType;
 }) => (
@@ -75,18 +61,22 @@ const StatCard = ({
       </div>
     </div>
     <div className="mt-4 flex items-center">
-      {change > 0 ? (
-        <ArrowUpIcon className="h-4 w-4 text-green-500 mr-1" />
-      ) : (
-        <ArrowDownIcon className="h-4 w-4 text-red-500 mr-1" />
+      {change !== undefined && (
+        <>
+          {change > 0 ? (
+            <ArrowUpIcon className="h-4 w-4 text-green-500 mr-1" />
+          ) : (
+            <ArrowDownIcon className="h-4 w-4 text-red-500 mr-1" />
+          )}
+          <span
+            className={`text-sm font-medium ${
+              change > 0 ? 'text-green-500' : 'text-red-500'
+            }`}
+          >
+            {Math.abs(change).toFixed(1)}%
+          </span>
+        </>
       )}
-      <span
-        className={`text-sm font-medium ${
-          change > 0 ? 'text-green-500' : 'text-red-500'
-        }`}
-      >
-        {Math.abs(change)}%
-      </span>
       <span className="text-sm text-gray-600 dark:text-gray-400 ml-2">
         {timeframe}
       </span>
@@ -94,35 +84,128 @@ const StatCard = ({
   </div>
 );
 
+// Percentage change between the last two weeks of the series
+const weeklyChange = (weekly: WeeklyStats[], key: keyof PeriodStats) => {
+  if (weekly.length < 2) return undefined;
+  const previous = weekly[weekly.length - 2][key];
+  const current = weekly[weekly.length - 1][key];
+  if (previous === 0) return undefined;
+  return ((current - previous) / previous) * 100;
+};
+
 const Analytics = () => {
-  const [analytics] = useState(mockAnalytics);
+  const [days, setDays] = useState(30);
+  const [analytics, setAnalytics] = useState<AnalyticsData | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    fetchAnalytics(days);
+  }, [days]);
+
+  const fetchAnalytics = async (rangeDays: number) => {
+    try {
+      setLoading(true);
+      setError(null);
+
+      const token = await window.Clerk.session?.getToken();
+      const response = await fetch(`http://127.0.0.1:5000/api/admin/analytics?days=${rangeDays}`, {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`,
+        },
+        credentials: 'include',
+      });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      setAnalytics(await response.json());
+    } catch (err) {
+      console.error('Error fetching analytics:', err);
+      setError(err instanceof Error ? err.message : 'Failed to fetch analytics');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  if (loading && !analytics) {
+    return (
+      <div className="py-8">
+        <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
+          <div className="flex items-center justify-center h-64">
+            <div className="animate-spin rounded-full h-12 w-12 border-b-2 border-blue-500"></div>
+          </div>
+        </div>
+      </div>
+    );
+  }
+
+  if (error || !analytics) {
+    return (
+      <div className="py-8">
+        <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
+          <div className="bg-red-50 border border-red-200 rounded-md p-4">
+            <h3 className="text-sm font-medium text-red-800">Error loading analytics</h3>
+            <p className="mt-2 text-sm text-red-700">{error}</p>
+            <button
+              onClick={() => fetchAnalytics(days)}
+              className="mt-4 bg-red-100 text-red-800 px-3 py-2 rounded-md text-sm font-medium hover:bg-red-200"
+            >
+              Try again
+            </button>
+          </div>
+        </div>
+      </div>
+    );
+  }
+
+  const { totals, weekly } = analytics;
+  const timeframe = `Last ${analytics.range.days} days`;
+  const taggedSentiments = analytics.sentiments.filter((s) => s.count > 0);
+  const sentimentTotal = taggedSentiments.reduce((sum, s) => sum + s.count, 0);
 
   return (
     <div className="py-8">
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
-        <h1 className="text-3xl font-bold mb-8">Analytics Dashboard</h1>
+        <div className="flex items-center justify-between mb-8">
+          <h1 className="text-3xl font-bold">Analytics Dashboard</h1>
+          <select
+            value={days}
+            onChange={(e) => setDays(Number(e.target.value))}
+            className="rounded-md border border-gray-300 dark:border-gray-600 bg-white dark:bg-gray-800 px-3 py-2 text-sm"
+          >
+            {RANGES.map((range) => (
+              <option key={range} value={range}>
+                Last {range} days
+              </option>
+            ))}
+          </select>
+        </div>
 
         {/* Stats Grid */}
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 mb-8">
           <StatCard
             title="Total Uploads"
-            value={analytics.uploadStats.total}
-            change={analytics.uploadStats.increase}
-            timeframe={analytics.uploadStats.timeframe}
+            value={totals.uploads}
+            change={weeklyChange(weekly, 'uploads')}
+            timeframe={timeframe}
             icon={ChartBarIcon}
           />
           <StatCard
-            title="Total Users"
-            value={analytics.userStats.total}
-            change={analytics.userStats.increase}
-            timeframe={analytics.userStats.timeframe}
+            title="Voice Notes"
+            value={totals.voiceNotes}
+            change={weeklyChange(weekly, 'voiceNotes')}
+            timeframe={timeframe}
             icon={ChartPieIcon}
           />
           <StatCard
             title="Active Users"
-            value={analytics.userStats.activeUsers}
-            change={5.2} // Mock change percentage
-            timeframe="This week"
+            value={totals.activeUsers}
+            change={weeklyChange(weekly, 'activeUsers')}
+            timeframe={timeframe}
             icon={CalendarIcon}
           />
         </div>
@@ -135,38 +218,22 @@ const Analytics = () => {
             <div className="relative pt-4">
               <div className="flex items-center justify-between mb-2">
                 <span className="text-sm font-medium">Images</span>
-                <span className="text-sm font-medium">
-                  {analytics.uploadStats.breakdown.images}
-                </span>
+                <span className="text-sm font-medium">{totals.images}</span>
               </div>
               <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
                 <div
                   className="bg-yellow-400 h-2.5 rounded-full transition-all duration-300 ease-in-out"
-                  style={{
-                    width: `${
-                      (analytics.uploadStats.breakdown.images /
-                        analytics.uploadStats.total) *
-                      100
-                    }%`,
-                  }}
+                  style={{ width: `${totals.uploads ? (totals.images / totals.uploads) * 100 : 0}%` }}
                 ></div>
               </div>
               <div className="flex items-center justify-between mt-4 mb-2">
-                <span className="text-sm font-medium">Voice Notes</span>
-                <span className="text-sm font-medium">
-                  {analytics.uploadStats.breakdown.voiceNotes}
-                </span>
+                <span className="text-sm font-medium">With Voice Note</span>
+                <span className="text-sm font-medium">{totals.voiceNotes}</span>
               </div>
               <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
                 <div
                   className="bg-purple-500 h-2.5 rounded-full transition-all duration-300 ease-in-out"
-                  style={{
-                    width: `${
-                      (analytics.uploadStats.breakdown.voiceNotes /
-                        analytics.uploadStats.total) *
-                      100
-                    }%`,
-                  }}
+                  style={{ width: `${totals.uploads ? (totals.voiceNotes / totals.uploads) * 100 : 0}%` }}
                 ></div>
               </div>
             </div>
@@ -175,47 +242,43 @@ const Analytics = () => {
           {/* Sentiment Analysis */}
           <div className="bg-white dark:bg-gray-800 rounded-lg shadow-md p-6 transition-colors duration-200">
             <h2 className="text-xl font-semibold mb-4">Sentiment Analysis</h2>
-            <div className="relative pt-4">
-              <div className="flex items-center justify-between mb-2">
-                <span className="text-sm font-medium">Positive</span>
-                <span className="text-sm font-medium">
-                  {analytics.sentimentAnalysis.positive}%
-                </span>
-              </div>
-              <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
-                <div
-                  className="bg-green-500 h-2.5 rounded-full transition-all duration-300 ease-in-out"
-                  style={{ width: `${analytics.sentimentAnalysis.positive}%` }}
-                ></div>
-              </div>
-              <div className="flex items-center justify-between mt-4 mb-2">
-                <span className="text-sm font-medium">Neutral</span>
-                <span className="text-sm font-medium">
-                  {analytics.sentimentAnalysis.neutral}%
-                </span>
-              </div>
-              <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
-                <div
-                  className="bg-gray-500 h-2.5 rounded-full transition-all duration-300 ease-in-out"
-                  style={{ width: `${analytics.sentimentAnalysis.neutral}%` }}
-                ></div>
-              </div>
-              <div className="flex items-center justify-between mt-4 mb-2">
-                <span className="text-sm font-medium">Negative</span>
-                <span className="text-sm font-medium">
-                  {analytics.sentimentAnalysis.negative}%
-                </span>
-              </div>
-              <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
-                <div
-                  className="bg-red-500 h-2.5 rounded-full transition-all duration-300 ease-in-out"
-                  style={{ width: `${analytics.sentimentAnalysis.negative}%` }}
-                ></div>
-              </div>
+            <div className="relative pt-4 max-h-72 overflow-y-auto">
+              {taggedSentiments.length === 0 && (
+                <p className="text-sm text-gray-600 dark:text-gray-400">No sentiments in this period.</p>
+              )}
+              {taggedSentiments.map(({ sentiment, count }) => (
+                <div key={sentiment} className="mb-4">
+                  <div className="flex items-center justify-between mb-2">
+                    <span className="text-sm font-medium">{sentiment}</span>
+                    <span className="text-sm font-medium">
+                      {((count / sentimentTotal) * 100).toFixed(0)}%
+                    </span>
+                  </div>
+                  <div className="w-full bg-gray-200 dark:bg-gray-700 rounded-full h-2.5">
+                    <div
+                      className="bg-green-500 h-2.5 rounded-full transition-all duration-300 ease-in-out"
+                      style={{ width: `${(count / sentimentTotal) * 100}%` }}
+                    ></div>
+                  </div>
+                </div>
+              ))}
             </div>
           </div>
         </div>
 
+        {/* Top Uploaders */}
+        <div className="bg-white dark:bg-gray-800 rounded-lg shadow-md p-6 mb-8 transition-colors duration-200">
+          <h2 className="text-xl font-semibold mb-4">Top Uploaders</h2>
+          <ul className="divide-y divide-gray-200 dark:divide-gray-700">
+            {analytics.users.map((user) => (
+              <li key={user.userId} className="flex items-center justify-between py-3">
+                <span>{user.name}</span>
+                <span className="text-sm text-gray-600 dark:text-gray-400">{user.uploads} uploads</span>
+              </li>
+            ))}
+          </ul>
+        </div>
+
         {/* Recent Trends */}
         <div className="bg-white dark:bg-gray-800 rounded-lg shadow-md p-6 transition-colors duration-200">
           <h2 className="text-xl font-semibold mb-4">Recent Trends</h2>
@@ -223,28 +286,25 @@ const Analytics = () => {
             <table className="min-w-full">
               <thead>
                 <tr className="border-b border-gray-200 dark:border-gray-700">
-                  <th className="text-left py-3 px-4 font-medium text-gray-600 dark:text-gray-400">Period</th>
+                  <th className="text-left py-3 px-4 font-medium text-gray-600 dark:text-gray-400">Week</th>
                   <th className="text-left py-3 px-4 font-medium text-gray-600 dark:text-gray-400">Total Uploads</th>
                   <th className="text-left py-3 px-4 font-medium text-gray-600 dark:text-gray-400">Active Users</th>
                   <th className="text-left py-3 px-4 font-medium text-gray-600 dark:text-gray-400">Growth</th>
                 </tr>
               </thead>
               <tbody>
-                {analytics.recentTrends.map((trend, index) => {
-                  const prevUploads =
-                    index > 0
-                      ? analytics.recentTrends[index - 1].uploads
-                      : trend.uploads;
-                  const growth = ((trend.uploads - prevUploads) / prevUploads) * 100;
+                {weekly.map((trend, index) => {
+                  const prevUploads = index > 0 ? weekly[index - 1].uploads : trend.uploads;
+                  const growth = prevUploads ? ((trend.uploads - prevUploads) / prevUploads) * 100 : 0;
 
                   return (
-                    <tr 
-                      key={trend.date}
+                    <tr
+                      key={trend.week}
                       className="border-b border-gray-200 dark:border-gray-700 hover:bg-gray-50 dark:hover:bg-gray-700 transition-colors duration-200"
                     >
-                      <td className="py-3 px-4">{trend.date}</td>
+                      <td className="py-3 px-4">{trend.week}</td>
                       <td className="py-3 px-4">{trend.uploads}</td>
-                      <td className="py-3 px-4">{trend.users}</td>
+                      <td className="py-3 px-4">{trend.activeUsers}</td>
                       <td className="py-3 px-4">
                         <div className="flex items-center">
                           {growth > 0 ? (
@@ -252,11 +312,7 @@ const Analytics = () => {
                           ) : (
                             <ArrowDownIcon className="h-4 w-4 text-red-500 mr-1" />
                           )}
-                          <span
-                            className={`${
-                              growth > 0 ? 'text-green-500' : 'text-red-500'
-                            }`}
-                          >
+                          <span className={`${growth > 0 ? 'text-green-500' : 'text-red-500'}`}>
                             {Math.abs(growth).toFixed(1)}%
                           </span>
                         </div>
@@ -273,4 +329,4 @@ const Analytics = () => {
   );
 };
 
-export default Analytics; 
\ No newline at end of file
+export default Analytics;
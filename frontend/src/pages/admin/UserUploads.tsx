@@ -5,6 +5,20 @@ import { motion } from 'framer-motion';
 import { ArrowLeftIcon, XMarkIcon, ArrowDownTrayIcon } from '@heroicons/react/24/outline';
 import { toast } from 'react-hot-toast';
 
+// Transcoded voice note, filled in by the job worker after upload
+interface VoiceNote {
+  status: 'pending' | 'ready' | 'failed';
+  key?: string;
+  duration?: number;
+  peaks?: number[];
+}
+
+// Play the compressed transcode once it exists, the original recording until then
+const voiceNoteSrc = (upload: { audio_filename?: string; voice_note?: VoiceNote | null }) =>
+  `http://127.0.0.1:5000/media/${
+    upload.voice_note?.status === 'ready' && upload.voice_note.key ? upload.voice_note.key : upload.audio_filename
+  }`;
+
 interface Upload {
   id: string;
   filename: string;
@@ -12,9 +26,12 @@ interface Upload {
   description: string;
   created_at: string;
   audio_filename?: string;
+  voice_note?: VoiceNote | null;
   sentiment?: string;
 }
 
+const PAGE_SIZE = 50;
+
 const UserUploads = () => {
   const { userId } = useParams();
   const navigate = useNavigate();
@@ -22,51 +39,61 @@ const UserUploads = () => {
   const [uploads, setUploads] = useState<Upload[]>([]);
   const [userName, setUserName] = useState('User');
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [selectedFile, setSelectedFile] = useState<string | null>(null);
   const [currentAudio, setCurrentAudio] = useState<string | null>(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const audioRef = useRef<HTMLAudioElement | null>(null);
 
-  useEffect(() => {
-    const fetchUploads = async () => {
-      try {
+  const fetchUploads = async (cursor?: string) => {
+    try {
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
         setLoading(true);
-        
-        // Get the authentication token from Clerk
-        const token = await clerk.session?.getToken();
-        
-        const response = await fetch(`http://127.0.0.1:5000/api/admin/user_uploads/${userId}`, {
-          method: 'GET',
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`,
-          },
-          credentials: 'include',
-          mode: 'cors'
-        });
-        
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
-        console.log(data);
-        if (data.error) {
-          throw new Error(data.error);
-        }
-        
-        const sortedImages: Upload[] = data.images.sort((a: Upload, b: Upload) =>
-          new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
-        );
-        setUploads(sortedImages);
-      } catch (error) {
-        console.error('Error fetching uploads:', error);
-        toast.error('Failed to fetch uploads');
-      } finally {
-        setLoading(false);
       }
-    };
+
+      // Get the authentication token from Clerk
+      const token = await clerk.session?.getToken();
+
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+      if (cursor) params.set('cursor', cursor);
+      const response = await fetch(`http://127.0.0.1:5000/api/admin/user_uploads/${userId}?${params}`, {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`,
+        },
+        credentials: 'include',
+        mode: 'cors'
+      });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const data = await response.json();
+      if (data.error) {
+        throw new Error(data.error);
+      }
+
+      // Pages arrive newest first
+      setUploads((prev) => (cursor ? [...prev, ...data.images] : data.images));
+      setNextCursor(data.next_cursor || null);
+      if (data.user?.name) setUserName(data.user.name);
+    } catch (error) {
+      console.error('Error fetching uploads:', error);
+      toast.error('Failed to fetch uploads');
+    } finally {
+      setLoading(false);
+      setLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
     fetchUploads();
+    // eslint-disable-next-line
   }, [userId]);
 
   const handleFileClick = (filename: string) => {
@@ -104,7 +131,7 @@ const UserUploads = () => {
   const renderFilePreview = () => {
     if (!selectedFile) return null;
 
-    const fileUrl = `http://127.0.0.1:5000/static/uploads/${selectedFile}`;
+    const fileUrl = `http://127.0.0.1:5000/media/${selectedFile}`;
 
     if (isPDF(selectedFile)) {
       return (
@@ -126,7 +153,7 @@ const UserUploads = () => {
   };
 
   const handleDownload = (filename: string, type: 'file' | 'audio') => {
-    const url = `http://127.0.0.1:5000/static/uploads/${filename}`;
+    const url = `http://127.0.0.1:5000/media/${filename}`;
     window.open(url, '_blank');
     toast.success(`${type === 'file' ? 'File' : 'Audio'} opened in new window!`);
   };
@@ -229,7 +256,7 @@ const UserUploads = () => {
                                   ref={audioRef}
                                   controls
                                   className="w-full [&::-webkit-media-controls-panel]:bg-gray-100 dark:[&::-webkit-media-controls-panel]:bg-gray-800 [&::-webkit-media-controls-current-time-display]:text-gray-700 dark:[&::-webkit-media-controls-current-time-display]:text-gray-300 [&::-webkit-media-controls-time-remaining-display]:text-gray-700 dark:[&::-webkit-media-controls-time-remaining-display]:text-gray-300 [&::-webkit-media-controls-timeline]:bg-gray-300 dark:[&::-webkit-media-controls-timeline]:bg-gray-600 [&::-webkit-media-controls-volume-slider]:bg-gray-300 dark:[&::-webkit-media-controls-volume-slider]:bg-gray-600"
-                                  src={`http://127.0.0.1:5000/static/uploads/${upload.audio_filename}`}
+                                  src={voiceNoteSrc(upload)}
                                   onEnded={() => setCurrentAudio(null)}
                                 >
                                   Your browser does not support the audio element.
@@ -271,6 +298,17 @@ const UserUploads = () => {
               </table>
             )}
           </div>
+          {!loading && nextCursor && (
+            <div className="flex justify-center p-4">
+              <button
+                onClick={() => fetchUploads(nextCursor)}
+                disabled={loadingMore}
+                className="px-4 py-2 rounded-md text-sm font-medium bg-yellow-100 text-yellow-700 hover:bg-yellow-200 dark:bg-yellow-900 dark:text-yellow-100 dark:hover:bg-yellow-800 transition-colors duration-200 disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
 
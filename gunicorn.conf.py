@@ -0,0 +1,78 @@
+"""Gunicorn settings for serving Beehive in production.
+
+Usage:
+    gunicorn app:app
+
+Gunicorn reads this file from the working directory. Every setting can be
+overridden from the environment:
+
+    GUNICORN_BIND             address to bind (default 0.0.0.0:5000)
+    WEB_CONCURRENCY           worker processes (default 2 x CPUs + 1)
+    GUNICORN_WORKER_CLASS     gevent (default) or gthread
+    GUNICORN_WORKER_CONNECTIONS  concurrent requests per gevent worker (default 1000)
+    GUNICORN_THREADS          threads per gthread worker (default 4)
+    GUNICORN_PRELOAD          import the app once in the master (default true; false for gevent)
+    GUNICORN_TIMEOUT          seconds before a silent worker is killed (default 60)
+    GUNICORN_GRACEFUL_TIMEOUT seconds a worker gets to finish requests on restart (default 30)
+    GUNICORN_MAX_REQUESTS     recycle a worker after this many requests (default 1000, 0 disables)
+    GUNICORN_MAX_REQUESTS_JITTER  random extra requests so workers do not recycle together (default 100)
+
+Workers are gevent by default: chat and notification event streams stay open
+for minutes, and on gthread each one holds a thread, so a few open streams
+would use up every request slot (workers x threads). A gevent worker serves
+each request in a greenlet, as serve_async.py does.
+
+Send SIGHUP to the master to reload workers gracefully. Background jobs are
+not run by the web workers; start ``python worker.py`` alongside.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# gevent workers must monkey-patch before pymongo and threading are imported,
+# which a preloaded app in the master would already have done
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false' if worker_class == 'gevent' else 'true').lower() == 'true'
+
+# Chat event streams stay open for up to five minutes (utils/sse.py) and send
+# a heartbeat every 15 seconds, which keeps gthread/gevent workers alive
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+accesslog = '-'
+errorlog = '-'
+# The default format with the path only (%(U)s instead of the request line
+# %(r)s), so query strings such as stream tickets are not logged
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+
+if preload_app:
+    # The app is imported in the master; leave the startup that opens MongoDB
+    # connections (index creation, change stream relay) to each worker
+    os.environ['BEEHIVE_DEFER_SERVICES'] = 'true'
+
+
+def when_ready(server):
+    # The in-process broker only reaches event streams in the worker that
+    # handled the write
+    if workers > 1 and os.getenv('PUBSUB_BACKEND', 'memory').lower() != 'mongo':
+        server.log.warning(
+            f"PUBSUB_BACKEND=memory with {workers} workers: chat messages and notifications "
+            "only reach streams in the worker that saved them. Set PUBSUB_BACKEND=mongo "
+            "(needs a replica set) or WEB_CONCURRENCY=1."
+        )
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import start_services
+        start_services()
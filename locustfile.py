@@ -7,7 +7,8 @@ class AdminUser(HttpUser):
 
 
     def on_start(self):
-        self.token = os.getenv("CLERK_SECRET_KEY")  
+        # A valid Clerk session token; the API verifies its signature
+        self.token = os.getenv("CLERK_SESSION_TOKEN")
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
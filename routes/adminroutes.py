@@ -1,71 +1,96 @@
 from flask import Blueprint, request, jsonify
+import json
 import os
-import requests
+from database import databaseConfig
 from database.admindatahandler import is_admin
-from database.userdatahandler import get_images_by_user, get_recent_uploads, get_upload_stats
+from database.analyticsdatahandler import DEFAULT_ANALYTICS_DAYS, MAX_ANALYTICS_DAYS, get_analytics
+from database.notificationdatahandler import (
+    NOTIFICATIONS_CHANNEL,
+    get_feed,
+    get_feed_since,
+    get_seen_seq,
+    latest_seq,
+    mark_seen,
+    parse_feed_cursor,
+    unread_count,
+)
+from database.userdirectoryhandler import delete_user, resolve_user, search_users, upsert_user
+from database.userdatahandler import (
+    get_images_by_user,
+    get_recent_uploads,
+    get_upload_stats,
+    parse_search_args,
+    search_images,
+    sentiment_facets,
+)
 from utils.clerk_auth import require_auth
+from utils.pagination import MAX_PAGE_SIZE, parse_limit
+from utils.pubsub import get_broker
+from utils.response_cache import DASHBOARD_SCOPE, USERS_SCOPE, cached_response, uploads_scope
+from utils.sse import event_stream, sse_response
+from utils.clerk_backend import verify_webhook
 
 # Create admin blueprint
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
-# Get all images uploaded by a user (admin access)
+# Get images uploaded by a user, one page at a time (admin access)
 @admin_bp.route('/user_uploads/<user_id>')
 @require_auth
+@cached_response(lambda user_id: [uploads_scope(user_id), USERS_SCOPE])
 def admin_user_images_show(user_id):
     try:
-        images = get_images_by_user(user_id)
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            images, next_cursor = get_images_by_user(user_id, limit, request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         return jsonify({
-            'images': images
+            'images': images,
+            'next_cursor': next_cursor,
+            'user': resolve_user(user_id)
         })
     except Exception as e:
         return jsonify({
             'error': str(e)
         }), 500
 
-# Get all users
+# Search all uploads (or one user's with ?user_id=) by words and sentiments
+@admin_bp.route('/search')
+@require_auth
+def admin_search_images():
+    user_id = request.args.get('user_id') or None
+    try:
+        try:
+            options = parse_search_args(request.args)
+            images, next_cursor = search_images(user_id=user_id, **options)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'images': images,
+            'next_cursor': next_cursor,
+            'facets': sentiment_facets(options['text'], user_id)
+        })
+    except Exception as e:
+        return jsonify({
+            'error': str(e)
+        }), 500
+
+# Get all users (served from the local mirror of Clerk users)
 @admin_bp.route('/users', methods=['GET'])
 @require_auth
+@cached_response(lambda: [USERS_SCOPE])
 def get_users():
     try:
         # Get query parameters
         query = request.args.get('query', '')
         limit = int(request.args.get('limit', 10))
         offset = int(request.args.get('offset', 0))
-        
-        # Get users from Clerk using REST API
-        clerk_api_key = os.getenv('CLERK_SECRET_KEY')
-        headers = {'Authorization': f'Bearer {clerk_api_key}'}
-        params = {
-            'limit': limit,
-            'offset': offset,
-            'query': query if query else None
-        }
-        response = requests.get('https://api.clerk.com/v1/users', headers=headers, params=params)
-        
-        if not response.ok:
-            raise Exception(f"Clerk API error: {response.text}")
-            
-        users_data = response.json()
-        
-        # Transform user data
-        transformed_users = []
-        users_list = users_data  
-        for user in users_list:
-            email = user['email_addresses'][0]['email_address'] if user['email_addresses'] else None
-            transformed_users.append({
-                'id': user['id'],
-                'name': f"{user['first_name']} {user['last_name']}".strip(),
-                'email': email,
-                'role': user['unsafe_metadata'].get('role', 'user'),
-                'lastActive': user['last_active_at'],
-                'image': user['image_url'],
-                'clerkId': user['id']
-            })
-            print(transformed_users)
-        
+
+        users, total_count = search_users(query, limit=limit, offset=offset)
+
         return jsonify({
-            'users': transformed_users,
-            'totalCount': len(users_list)  
+            'users': users,
+            'totalCount': total_count
         })
         
     except Exception as e:
@@ -75,59 +100,49 @@ def get_users():
 # Get only users (not admins)
 @admin_bp.route('/users/only-users', methods=['GET'])
 @require_auth
+@cached_response(lambda: [USERS_SCOPE])
 def get_only_users():
     try:
         # Get query parameters
         query = request.args.get('query', '')
         limit = int(request.args.get('limit', 10))
         offset = int(request.args.get('offset', 0))
-        
-        # Get users from Clerk using REST API
-        clerk_api_key = os.getenv('CLERK_SECRET_KEY')
-        headers = {'Authorization': f'Bearer {clerk_api_key}'}
-        params = {
-            'limit': limit,
-            'offset': offset,
-            'query': query if query else None
-        }
-        response = requests.get('https://api.clerk.com/v1/users', headers=headers, params=params)
-        
-        if not response.ok:
-            raise Exception(f"Clerk API error: {response.text}")
-            
-        users_data = response.json()
-        
-        # Transform user data, filter only users with role 'user'
-        transformed_users = []
-        users_list = users_data  
-        for user in users_list:
-            role = user['unsafe_metadata'].get('role', 'user')
-            if role != 'user':
-                continue
-            email = user['email_addresses'][0]['email_address'] if user['email_addresses'] else None
-            transformed_users.append({
-                'id': user['id'],
-                'name': f"{user['first_name']} {user['last_name']}".strip(),
-                'email': email,
-                'role': role,
-                'lastActive': user['last_active_at'],
-                'image': user['image_url'],
-                'clerkId': user['id']
-            })
-            # print(transformed_users)
-        
+
+        # Filtering by role happens before pagination, so pages are always full
+        users, total_count = search_users(query, role='user', limit=limit, offset=offset)
+
         return jsonify({
-            'users': transformed_users,
-            'totalCount': len(transformed_users)  
+            'users': users,
+            'totalCount': total_count
         })
         
     except Exception as e:
         print(f"Error fetching only users: {str(e)}")
         return jsonify({'error': 'Failed to fetch only users'}), 500
 
+# Clerk webhook: keep the local user mirror in sync between full refreshes
+@admin_bp.route('/clerk/webhook', methods=['POST'])
+def clerk_webhook():
+    body = request.get_data()
+    if not verify_webhook(os.getenv('CLERK_WEBHOOK_SECRET'), request.headers, body):
+        return jsonify({'error': 'Invalid webhook signature'}), 401
+    try:
+        event = json.loads(body)
+        event_type = event.get('type')
+        data = event.get('data', {})
+        if event_type in ('user.created', 'user.updated'):
+            upsert_user(data)
+        elif event_type == 'user.deleted':
+            delete_user(data.get('id'))
+        return jsonify({'message': 'ok'}), 200
+    except Exception as e:
+        print(f"Error handling Clerk webhook: {str(e)}")
+        return jsonify({'error': 'Failed to handle webhook'}), 500
+
 # Get dashboard statistics and recent activity
 @admin_bp.route('/dashboard', methods=['GET'])
 @require_auth
+@cached_response(lambda: [DASHBOARD_SCOPE, USERS_SCOPE])
 def get_dashboard_data():
     try:
         # Get query parameters for recent activity
@@ -147,3 +162,106 @@ def get_dashboard_data():
     except Exception as e:
         print(f"Error fetching dashboard data: {str(e)}")
         return jsonify({'error': 'Failed to fetch dashboard data'}), 500
+
+# Uploads over time, per sentiment and per user for the Analytics page
+@admin_bp.route('/analytics', methods=['GET'])
+@require_auth
+def get_analytics_data():
+    try:
+        days = int(request.args.get('days', DEFAULT_ANALYTICS_DAYS))
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+    if not 1 <= days <= MAX_ANALYTICS_DAYS:
+        return jsonify({'error': f'days must be between 1 and {MAX_ANALYTICS_DAYS}'}), 400
+
+    try:
+        return jsonify(get_analytics(days))
+    except Exception as e:
+        print(f"Error fetching analytics: {str(e)}")
+        return jsonify({'error': 'Failed to fetch analytics'}), 500
+
+# One page of the notification feed, newest first. With mark_seen=true on the
+# first page, everything up to the newest notification is marked as seen.
+@admin_bp.route('/notifications', methods=['GET'])
+@require_auth
+def get_notifications():
+    admin_id = request.current_user['id']
+    cursor = request.args.get('cursor')
+    mark = request.args.get('mark_seen', 'false').lower() == 'true'
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        seen_seq = get_seen_seq(admin_id)
+        notifications, next_cursor = get_feed(limit, cursor, seen_seq)
+        if mark and not cursor and notifications:
+            seen_seq = mark_seen(admin_id, notifications[0]['seq'])
+        return jsonify({
+            'notifications': notifications,
+            'next_cursor': next_cursor,
+            'unread_count': unread_count(admin_id, seen_seq)
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Number of notifications newer than the admin's watermark, for the badge
+@admin_bp.route('/notifications/unread_count', methods=['GET'])
+@require_auth
+def get_unread_notification_count():
+    try:
+        admin_id = request.current_user['id']
+        # latest_seq lets a client open the stream without missing what arrives in between
+        return jsonify({'unread_count': unread_count(admin_id), 'latest_seq': latest_seq()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Mark notifications up to `seq` (default: all) as seen
+@admin_bp.route('/notifications/seen', methods=['POST'])
+@require_auth
+def mark_notifications_seen():
+    admin_id = request.current_user['id']
+    data = request.get_json(silent=True) or {}
+    try:
+        seq = int(data['seq']) if data.get('seq') is not None else latest_seq()
+    except (TypeError, ValueError):
+        return jsonify({'error': 'seq must be an integer'}), 400
+    try:
+        seen_seq = mark_seen(admin_id, seq)
+        return jsonify({'seen_seq': seen_seq, 'unread_count': unread_count(admin_id, seen_seq)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Server-Sent Events stream of new notifications. On reconnect the browser
+# sends Last-Event-ID (the seq of the last notification it got) and what it
+# missed is replayed first. A client too slow to drain its queue has its
+# stream ended and catches up the same way.
+@admin_bp.route('/notifications/stream', methods=['GET'])
+@require_auth
+def stream_notifications():
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = parse_feed_cursor(since) if since else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Subscribe before reading the backlog so nothing falls in between
+    subscription = get_broker().subscribe(NOTIFICATIONS_CHANNEL)
+    backlog = []
+    if since is not None:
+        backlog = get_feed_since(since, MAX_PAGE_SIZE)
+    return sse_response(event_stream(
+        subscription,
+        backlog,
+        event='notification',
+        event_id=lambda notification: notification['seq']
+    ))
+
+# MongoDB connection pool settings and counters of the serving process
+@admin_bp.route('/db/pool', methods=['GET'])
+@require_auth
+def get_db_pool_metrics():
+    return jsonify({
+        'pid': os.getpid(),
+        'options': databaseConfig.client_options(),
+        'metrics': databaseConfig.pool_metrics.snapshot()
+    })
@@ -0,0 +1,45 @@
+"""Serve Beehive on gevent's cooperative WSGI server.
+
+Usage:
+    python serve_async.py
+
+Every request runs in a greenlet instead of an OS thread. ``monkey.patch_all``
+makes the blocking calls the handlers already use (pymongo, ``requests`` to
+Clerk, sockets, ``queue``/``threading`` in the pub/sub broker) yield to other
+greenlets while they wait, so one process can hold hundreds of slow requests
+(chat event streams, dashboard and user listing queries) at once without
+rewriting the handlers as coroutines.
+
+    ASYNC_HOST              interface to bind (default 0.0.0.0)
+    PORT                    port to bind (default 5000)
+    ASYNC_MAX_CONNECTIONS   concurrent requests served before new ones wait (default 1000)
+
+Background jobs are not run here; start ``python worker.py`` alongside.
+"""
+
+# Must run before anything imports socket, ssl, threading or pymongo
+from gevent import monkey
+
+monkey.patch_all()
+
+import logging  # noqa: E402
+import os  # noqa: E402
+
+from gevent.pool import Pool  # noqa: E402
+from gevent.pywsgi import WSGIServer  # noqa: E402
+
+from app import app  # noqa: E402
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    host = os.getenv('ASYNC_HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', 5000))
+    pool = Pool(int(os.getenv('ASYNC_MAX_CONNECTIONS', 1000)))
+    server = WSGIServer((host, port), app, spawn=pool)
+    logging.info(f"Serving Beehive on http://{host}:{port} (gevent, up to {pool.size} concurrent requests)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from database import analyticsdatahandler
+
+
+def _rollup(day, uploads, voice_notes, sentiments, per_user, images=None):
+    return {
+        "_id": day, "uploads": uploads, "images": uploads if images is None else images,
+        "voice_notes": voice_notes, "sentiments": sentiments,
+        "per_user": [{"user_id": u, "uploads": n} for u, n in per_user], "computed_at": datetime(2025, 2, 1),
+    }
+
+
+def test_week_key_uses_iso_weeks():
+    assert analyticsdatahandler.week_key("2025-01-31") == "2025-W05"
+    assert analyticsdatahandler.week_key("2024-12-30") == "2025-W01"
+
+
+def test_summarize_rolls_days_into_weeks_sentiments_and_users(monkeypatch):
+    monkeypatch.setattr(analyticsdatahandler, "SENTIMENTS", ["Joyful", "Calm"])
+    monkeypatch.setattr(analyticsdatahandler, "resolve_users",
+                        lambda ids: {user_id: {"name": user_id.upper()} for user_id in ids})
+    rollups = [
+        _rollup("2025-01-26", 2, 1, {"joyful": 1, "weird": 1}, [("a", 2)], images=1),
+        _rollup("2025-01-27", 3, 0, {"joyful": 2}, [("a", 1), ("b", 2)]),
+    ]
+
+    summary = analyticsdatahandler.summarize(rollups)
+
+    assert summary["totals"] == {"uploads": 5, "images": 4, "voiceNotes": 1, "activeUsers": 2}
+    assert [w["week"] for w in summary["weekly"]] == ["2025-W04", "2025-W05"]
+    assert summary["weekly"][1]["activeUsers"] == 2
+    assert summary["sentiments"] == [
+        {"sentiment": "Joyful", "count": 3},
+        {"sentiment": "Calm", "count": 0},
+        {"sentiment": "Other", "count": 1},
+    ]
+    assert summary["users"] == [
+        {"userId": "a", "name": "A", "uploads": 3},
+        {"userId": "b", "name": "B", "uploads": 2},
+    ]
+
+
+class _FakeCollection:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.writes = []
+
+    def aggregate(self, pipeline):
+        return iter(self.rows)
+
+    def bulk_write(self, requests, ordered=True):
+        self.writes.extend(requests)
+
+
+def test_build_rollups_counts_sentiments_per_tag(monkeypatch):
+    day = {"day": "2025-01-27", "user_id": "a"}
+    rows = [
+        {"_id": {**day, "sentiment_tags": ["hopeful", "joyful"]}, "uploads": 2, "images": 2, "voice_notes": 1},
+        # Saved before sentiment_tags existed: the raw sentiment is normalized the same way
+        {"_id": {**day, "sentiment_tags": "Joyful, Odd"}, "uploads": 1, "images": 0, "voice_notes": 0},
+    ]
+    monkeypatch.setattr(analyticsdatahandler, "beehive_image_collection", _FakeCollection(rows))
+    monkeypatch.setattr(analyticsdatahandler, "beehive_daily_rollup_collection", _FakeCollection())
+
+    rollups = analyticsdatahandler.build_rollups(datetime(2025, 1, 27), datetime(2025, 1, 28))
+
+    rollup = rollups["2025-01-27"]
+    assert rollup["sentiments"] == {"hopeful": 2, "joyful": 3, "odd": 1}
+    assert (rollup["uploads"], rollup["images"], rollup["voice_notes"]) == (3, 2, 1)
@@ -0,0 +1,44 @@
+import array
+import base64
+
+import pytest
+
+from utils.audio import AudioError, audio_extension, compute_peaks, data_url_reader, transcoded_key
+
+
+def test_audio_extension_prefers_mimetype():
+    assert audio_extension("voice-note.wav", "audio/webm;codecs=opus") == "webm"
+    assert audio_extension("note.MP3") == "mp3"
+    assert audio_extension("note.exe", "application/octet-stream") is None
+
+
+def test_data_url_reader_decodes_in_chunks():
+    payload = bytes(range(256)) * 10
+    reader, ext = data_url_reader("data:audio/ogg;base64," + base64.b64encode(payload).decode())
+
+    chunks = list(iter(lambda: reader.read(100), b""))
+    assert b"".join(chunks) == payload
+    assert max(len(chunk) for chunk in chunks) <= 100
+    assert ext == "ogg"
+
+
+def test_data_url_reader_rejects_other_input():
+    with pytest.raises(AudioError):
+        data_url_reader("not a data url")
+
+
+def test_compute_peaks_across_unaligned_chunks():
+    # One second of silence followed by one second at half volume, 8 kHz
+    pcm = array.array("h", [0] * 8000 + [16384, -16384] * 4000).tobytes()
+    duration, peaks = compute_peaks([pcm[:12345], pcm[12345:]], count=4)
+
+    assert duration == 2.0
+    assert peaks == [0.0, 0.0, 0.5, 0.5]
+
+
+def test_compute_peaks_of_empty_audio():
+    assert compute_peaks([]) == (0.0, [])
+
+
+def test_transcoded_key_is_content_addressed():
+    assert transcoded_key("ab" * 32) == f"derivatives/ab/{'ab' * 32}_voice.ogg"
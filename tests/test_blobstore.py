@@ -0,0 +1,108 @@
+import hashlib
+import io
+import os
+import threading
+
+from utils import blobstore
+from utils.storage import LocalStorage
+
+
+def _fake_references(monkeypatch):
+    """In-memory stand-in for database/blobdatahandler.py."""
+    refs = {}
+    deleting = set()
+    changed = threading.Condition()
+
+    def add(path, size, count=1):
+        with changed:
+            changed.wait_for(lambda: path not in deleting, timeout=5)
+            before = refs.get(path)
+            refs[path] = (before or 0) + count
+            return before is None or before <= 0
+
+    def release(path, count=1):
+        with changed:
+            refs[path] -= count
+            if refs[path] > 0:
+                return False
+            deleting.add(path)
+            return True
+
+    def forget(path):
+        with changed:
+            deleting.discard(path)
+            if refs.get(path, 0) <= 0:
+                refs.pop(path, None)
+            changed.notify_all()
+
+    monkeypatch.setattr(blobstore, "add_blob_references", add)
+    monkeypatch.setattr(blobstore, "release_blob_references", release)
+    monkeypatch.setattr(blobstore, "forget_blob", forget)
+    return refs
+
+
+def test_blob_path_is_sharded():
+    digest = "ab" + "cd" + "0" * 60
+    assert blobstore.blob_path(digest, "PNG") == f"blobs/ab/cd/{digest}.png"
+
+
+def test_identical_uploads_share_one_blob(tmp_path, monkeypatch):
+    refs = _fake_references(monkeypatch)
+    data = b"same bytes"
+
+    storage = LocalStorage(str(tmp_path))
+    first = blobstore.store_stream(io.BytesIO(data), storage, "png")
+    second = blobstore.store_stream(io.BytesIO(data), storage, "png")
+
+    assert first["path"] == second["path"]
+    assert first["content_hash"] == hashlib.sha256(data).hexdigest()
+    assert refs[first["path"]] == 2
+    assert os.listdir(tmp_path / LocalStorage.TMP_DIR) == []
+
+    blob_file = tmp_path / first["path"]
+    assert blobstore.release(storage, first["path"]) is False
+    assert blob_file.exists()
+    assert blobstore.release(storage, first["path"]) is True
+    assert not blob_file.exists()
+
+
+def test_store_file_moves_file_into_place(tmp_path, monkeypatch):
+    _fake_references(monkeypatch)
+    storage = LocalStorage(str(tmp_path))
+    tmp = storage.temp_path()
+    with open(tmp, "wb") as f:
+        f.write(b"pdf bytes")
+
+    blob = blobstore.store_file(tmp, storage, "pdf")
+
+    assert not os.path.exists(tmp)
+    assert (tmp_path / blob["path"]).read_bytes() == b"pdf bytes"
+    assert blob["size"] == 9
+
+
+def test_upload_during_delete_writes_the_blob_again(tmp_path, monkeypatch):
+    refs = _fake_references(monkeypatch)
+    data = b"same bytes"
+    uploads = []
+
+    class UploadDuringDelete(LocalStorage):
+        def delete(self, key):
+            # Same content uploaded while the last reference is being deleted
+            upload = threading.Thread(
+                target=lambda: uploads.append(blobstore.store_stream(io.BytesIO(data), self, "png"))
+            )
+            upload.start()
+            upload.join(0.1)
+            assert upload.is_alive(), "upload did not wait for the delete"
+            super().delete(key)
+            self.upload = upload
+
+    storage = UploadDuringDelete(str(tmp_path))
+    blob = blobstore.store_stream(io.BytesIO(data), storage, "png")
+
+    assert blobstore.release(storage, blob["path"]) is True
+    storage.upload.join()
+
+    assert uploads[0]["path"] == blob["path"]
+    assert refs[blob["path"]] == 1
+    assert (tmp_path / blob["path"]).read_bytes() == data
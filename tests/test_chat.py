@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from database.chatdatahandler import (
+    admin_conversation_id,
+    conversation_id_for,
+    format_message,
+    parse_position,
+)
+
+
+def test_conversation_id_is_direction_independent():
+    to_admin = conversation_id_for("user_1", "user", "admin", "admin")
+    from_admin = conversation_id_for("admin_7", "admin", "user_1", "user")
+
+    assert to_admin == from_admin == admin_conversation_id("user_1")
+    assert admin_conversation_id("user_1") != admin_conversation_id("user_2")
+
+
+def test_format_message_cursor_roundtrips():
+    message = {"_id": ObjectId(), "timestamp": datetime(2025, 5, 1, 12, 0, 0, 123000), "content": "hi"}
+
+    formatted = format_message(message)
+
+    assert formatted["timestamp"] == "2025-05-01T12:00:00.123000"
+    assert parse_position(formatted["cursor"]) == (message["timestamp"], message["_id"])
+
+
+def test_parse_position_accepts_iso_timestamps():
+    assert parse_position("2025-05-01T12:00:00") == (datetime(2025, 5, 1, 12, 0, 0), None)
+    assert parse_position("") is None
+    with pytest.raises(ValueError):
+        parse_position("nonsense")
@@ -0,0 +1,99 @@
+import errno
+import fcntl
+import io
+import os
+
+import pytest
+
+from utils.chunked_upload import (
+    ChunkInProgress,
+    ChunkOffsetMismatch,
+    UploadError,
+    UploadTooLarge,
+    append_chunk,
+    create_session,
+    finalize_session,
+    get_session,
+    sweep_sessions,
+)
+
+
+def test_resumable_upload_roundtrip(tmp_path):
+    folder = str(tmp_path / "partial")
+    session = create_session(folder, "user_1", "doc.pdf", 6)
+    upload_id = session["upload_id"]
+
+    assert append_chunk(folder, upload_id, io.BytesIO(b"abc"), 0) == 3
+    # Resuming from a stale offset is rejected with the offset we actually have
+    with pytest.raises(ChunkOffsetMismatch) as excinfo:
+        append_chunk(folder, upload_id, io.BytesIO(b"def"), 0)
+    assert excinfo.value.expected == 3
+
+    assert get_session(folder, upload_id)["offset"] == 3
+    with pytest.raises(UploadError):
+        finalize_session(folder, upload_id, str(tmp_path / "doc.pdf"))
+
+    assert append_chunk(folder, upload_id, io.BytesIO(b"def"), 3) == 6
+    finalize_session(folder, upload_id, str(tmp_path / "doc.pdf"))
+
+    assert (tmp_path / "doc.pdf").read_bytes() == b"abcdef"
+    assert get_session(folder, upload_id) is None
+
+
+def test_finalize_session_moves_across_filesystems(tmp_path, monkeypatch):
+    folder = str(tmp_path / "partial")
+    session = create_session(folder, "user_1", "doc.pdf", 3)
+    append_chunk(folder, session["upload_id"], io.BytesIO(b"abc"), 0)
+
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "rename", cross_device)
+    monkeypatch.setattr(os, "replace", cross_device)
+    finalize_session(folder, session["upload_id"], str(tmp_path / "doc.pdf"))
+
+    assert (tmp_path / "doc.pdf").read_bytes() == b"abc"
+    assert get_session(folder, session["upload_id"]) is None
+
+
+def test_append_chunk_rejects_overflow(tmp_path):
+    folder = str(tmp_path)
+    session = create_session(folder, "user_1", "doc.pdf", 4)
+
+    with pytest.raises(UploadTooLarge):
+        append_chunk(folder, session["upload_id"], io.BytesIO(b"abcdef"), 0)
+    assert get_session(folder, session["upload_id"])["offset"] == 0
+
+
+def test_session_rejects_path_traversal(tmp_path):
+    with pytest.raises(UploadError):
+        get_session(str(tmp_path), "../../etc/passwd")
+
+
+def test_concurrent_chunks_of_one_session_are_rejected(tmp_path):
+    folder = str(tmp_path)
+    session = create_session(folder, "user_1", "doc.pdf", 6)
+    upload_id = session["upload_id"]
+
+    # Another request is writing the chunk at offset 0
+    with open(tmp_path / f"{upload_id}.part", "ab") as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX)
+        with pytest.raises(ChunkInProgress):
+            append_chunk(folder, upload_id, io.BytesIO(b"abc"), 0)
+
+    assert append_chunk(folder, upload_id, io.BytesIO(b"abc"), 0) == 3
+    with pytest.raises(ChunkOffsetMismatch):
+        append_chunk(folder, upload_id, io.BytesIO(b"abc"), 0)
+
+
+def test_sweep_removes_abandoned_sessions(tmp_path):
+    folder = str(tmp_path)
+    old = create_session(folder, "user_1", "old.pdf", 4)["upload_id"]
+    fresh = create_session(folder, "user_1", "new.pdf", 4)["upload_id"]
+    for name in (f"{old}.json", f"{old}.part"):
+        os.utime(tmp_path / name, (0, 0))
+
+    assert sweep_sessions(folder, max_age=3600) == 1
+
+    assert get_session(folder, old) is None
+    assert sorted(os.listdir(tmp_path)) == sorted([f"{fresh}.json", f"{fresh}.part"])
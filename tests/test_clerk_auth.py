@@ -0,0 +1,135 @@
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from utils import clerk_auth
+from utils.jwks import JWKSCache, JWKSError, load_jwks_file
+
+
+def _make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return private_key, jwk
+
+
+def _sign(private_key, kid, **claims):
+    payload = {"sub": "user_123", "exp": int(time.time()) + 60, **claims}
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture
+def signing_key(tmp_path, monkeypatch):
+    private_key, jwk = _make_key("key-1")
+    jwks_file = tmp_path / "jwks.json"
+    jwks_file.write_text(json.dumps({"keys": [jwk]}))
+    monkeypatch.setattr(clerk_auth, "jwks_cache", JWKSCache(lambda: load_jwks_file(str(jwks_file))))
+    clerk_auth.verified_tokens.clear()
+    return private_key
+
+
+def test_verify_token_accepts_valid_signature(signing_key):
+    claims = clerk_auth.verify_token(_sign(signing_key, "key-1"))
+    assert claims["sub"] == "user_123"
+
+
+def test_verify_token_rejects_forged_signature(signing_key):
+    other_key, _ = _make_key("key-1")
+    with pytest.raises(clerk_auth.AuthError):
+        clerk_auth.verify_token(_sign(other_key, "key-1"))
+
+
+def test_verify_token_rejects_expired_token(signing_key):
+    token = _sign(signing_key, "key-1", exp=int(time.time()) - 60)
+    with pytest.raises(clerk_auth.AuthError, match="expired"):
+        clerk_auth.verify_token(token)
+
+
+def test_verified_tokens_are_cached(signing_key, monkeypatch):
+    token = _sign(signing_key, "key-1")
+    clerk_auth.verify_token(token)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("signature checked twice")
+
+    monkeypatch.setattr(clerk_auth.jwt, "decode", fail)
+    assert clerk_auth.verify_token(token)["sub"] == "user_123"
+
+
+def test_jwks_cache_refreshes_on_unknown_kid():
+    _, old_jwk = _make_key("old")
+    _, new_jwk = _make_key("new")
+    served = [{"keys": [old_jwk]}]
+    cache = JWKSCache(lambda: served[0], min_refresh_interval=0)
+
+    assert cache.get_signing_key("old")
+    served[0] = {"keys": [new_jwk]}
+    assert cache.get_signing_key("new")
+    with pytest.raises(JWKSError):
+        cache.get_signing_key("missing")
+
+
+@pytest.fixture
+def stream_app(monkeypatch):
+    from flask import Flask, jsonify, request
+
+    tickets = {"good": {"user_id": "user_123", "path": "/stream"}}
+
+    def redeem(ticket, path):
+        if tickets.get(ticket, {}).get("path") != path:
+            return None
+        return tickets.pop(ticket)["user_id"]
+
+    monkeypatch.setattr(clerk_auth, "redeem_stream_ticket", redeem)
+    app = Flask(__name__)
+
+    @app.route("/stream")
+    @clerk_auth.require_auth
+    def stream():
+        return jsonify(request.current_user)
+
+    return app.test_client()
+
+
+def test_stream_ticket_opens_event_stream_once(stream_app):
+    headers = {"Accept": "text/event-stream"}
+    response = stream_app.get("/stream?ticket=good", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["id"] == "user_123"
+
+    assert stream_app.get("/stream?ticket=good", headers=headers).status_code == 401
+
+
+def test_session_token_in_query_is_not_accepted(stream_app, signing_key):
+    token = _sign(signing_key, "key-1")
+    response = stream_app.get(f"/stream?token={token}", headers={"Accept": "text/event-stream"})
+    assert response.status_code == 401
+
+
+def test_jwks_cache_keeps_keys_when_refresh_fails():
+    _, jwk = _make_key("k")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            raise JWKSError("Could not fetch JWKS: 503")
+        return {"keys": [jwk]}
+
+    cache = JWKSCache(fetch, ttl=0, retry_backoff=60)
+    assert cache.get_signing_key("k")
+
+    # Expired: the cached key is served while the refresh fails in the background
+    assert cache.get_signing_key("k")
+    cache._refresh_thread.join()
+    assert len(calls) == 2
+
+    # The failure backs off further refreshes, and the stale key keeps working
+    assert cache.get_signing_key("k")
+    assert len(calls) == 2
+    with pytest.raises(JWKSError):
+        cache.get_signing_key("unknown")
+    assert len(calls) == 2
@@ -0,0 +1,55 @@
+import base64
+import hashlib
+import hmac
+import time
+
+from utils.clerk_backend import FakeClerkBackend, iter_all_users, transform_user, verify_webhook
+
+
+def _clerk_user(n, role="user"):
+    return {
+        "id": f"user_{n}",
+        "first_name": "User",
+        "last_name": str(n),
+        "email_addresses": [{"email_address": f"user{n}@example.com"}],
+        "unsafe_metadata": {"role": role},
+        "last_active_at": None,
+        "image_url": None,
+        "created_at": n,
+    }
+
+
+def test_transform_user():
+    user = transform_user(_clerk_user(1, role="admin"))
+    assert user["name"] == "User 1"
+    assert user["email"] == "user1@example.com"
+    assert user["role"] == "admin"
+    assert user["clerkId"] == "user_1"
+
+
+def test_iter_all_users_walks_every_page():
+    backend = FakeClerkBackend(users=[_clerk_user(n) for n in range(7)])
+    users = list(iter_all_users(backend, page_size=3))
+    assert [u["id"] for u in users] == [f"user_{n}" for n in range(6, -1, -1)]
+
+
+def _sign(secret, msg_id, timestamp, body):
+    key = base64.b64decode(secret[len("whsec_"):])
+    digest = hmac.new(key, f"{msg_id}.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    return "v1," + base64.b64encode(digest).decode()
+
+
+def test_verify_webhook():
+    secret = "whsec_" + base64.b64encode(b"super-secret").decode()
+    body = b'{"type": "user.created"}'
+    timestamp = str(int(time.time()))
+    headers = {
+        "svix-id": "msg_1",
+        "svix-timestamp": timestamp,
+        "svix-signature": _sign(secret, "msg_1", timestamp, body),
+    }
+
+    assert verify_webhook(secret, headers, body)
+    assert not verify_webhook(secret, headers, b'{"type": "user.deleted"}')
+    stale = dict(headers, **{"svix-timestamp": str(int(time.time()) - 3600)})
+    assert not verify_webhook(secret, stale, body)
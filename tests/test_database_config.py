@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from database import databaseConfig
+
+
+def test_client_options_from_environment():
+    options = databaseConfig.client_options({
+        "MONGODB_MAX_POOL_SIZE": "20",
+        "MONGODB_READ_PREFERENCE": "secondaryPreferred",
+        "MONGODB_WRITE_CONCERN": "majority",
+        "MONGODB_SOCKET_TIMEOUT_MS": "",
+    })
+
+    assert options["maxPoolSize"] == 20
+    assert options["minPoolSize"] == databaseConfig.DEFAULT_CLIENT_OPTIONS["minPoolSize"]
+    assert options["readPreference"] == "secondaryPreferred"
+    assert options["w"] == "majority"
+    assert "socketTimeoutMS" not in options
+
+
+def test_numeric_write_concern():
+    assert databaseConfig.client_options({"MONGODB_WRITE_CONCERN": "1"})["w"] == 1
+
+
+def test_pool_metrics_track_checkouts():
+    metrics = databaseConfig.PoolMetrics()
+    metrics.connection_created(None)
+    metrics.connection_checked_out(SimpleNamespace(duration=0.004))
+    metrics.connection_checked_out(SimpleNamespace(duration=0.002))
+    metrics.connection_checked_in(None)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["connections_created"] == 1
+    assert snapshot["checkouts"] == 2
+    assert snapshot["checked_out"] == 1
+    assert snapshot["checkout_wait_ms_max"] == 4
+    assert snapshot["checkout_wait_ms_avg"] == 3
+
+
+def test_lazy_collection_resolves_per_use(monkeypatch):
+    databases = iter([{"images": "first"}, {"images": "second"}])
+    monkeypatch.setattr(databaseConfig, "get_database", lambda: next(databases))
+    collection = databaseConfig.get_beehive_image_collection()
+
+    assert collection.resolve() == "first"
+    assert collection.resolve() == "second"
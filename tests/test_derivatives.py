@@ -0,0 +1,64 @@
+import os
+
+from bson import ObjectId
+from PIL import Image
+
+from utils.derivatives import VARIANTS, generate_derivatives, supports_derivatives
+from utils.storage import LocalStorage
+
+
+def test_supports_derivatives():
+    assert supports_derivatives("photo.JPG")
+    assert not supports_derivatives("scan.pdf")
+
+
+def test_generate_derivatives_is_content_addressed(tmp_path):
+    source = tmp_path / "photo.png"
+    Image.new("RGB", (2000, 1000), "yellow").save(source)
+
+    storage = LocalStorage(str(tmp_path))
+    content_hash, variants = generate_derivatives(str(source), storage)
+
+    assert set(variants) == set(VARIANTS)
+    small = variants["small"]["webp"]
+    assert small.startswith(f"derivatives/{content_hash[:2]}/{content_hash}")
+    with Image.open(tmp_path / small) as img:
+        assert max(img.size) == VARIANTS["small"]
+
+    # Identical content maps to the same cached files, which are not re-rendered
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(source.read_bytes())
+    mtime = os.path.getmtime(tmp_path / small)
+    assert generate_derivatives(str(copy), storage) == (content_hash, variants)
+    assert os.path.getmtime(tmp_path / small) == mtime
+
+
+def test_variants_apply_exif_orientation(tmp_path):
+    # Landscape pixels tagged "rotate 90° clockwise", as phone cameras store portrait photos
+    source = tmp_path / "portrait.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new("RGB", (400, 200), "blue").save(source, exif=exif)
+
+    _, variants = generate_derivatives(str(source), LocalStorage(str(tmp_path)))
+
+    with Image.open(tmp_path / variants["small"]["webp"]) as img:
+        assert img.size == (160, 320)
+
+
+def test_serve_derivative_handles_missing_files_and_stale_variants(client, monkeypatch):
+    import app as app_module
+
+    image = {"_id": ObjectId(), "filename": "blobs/ab/cd/abcd.png", "variants": {"small": {"webp": "derivatives/small.webp"}}}
+    monkeypatch.setattr(app_module, "get_image_by_id", lambda image_id: image)
+
+    # Rendered before the "medium" variant existed: the original is served instead
+    response = client.get(f"/derivatives/{image['_id']}/medium")
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith(image["filename"])
+
+    def missing_source(image, storage):
+        raise FileNotFoundError(image["filename"])
+
+    monkeypatch.setattr(app_module, "ensure_derivatives", missing_source)
+    assert client.get(f"/derivatives/{image['_id']}/small").status_code == 404
@@ -0,0 +1,32 @@
+from database.indexes import HOT_QUERIES, INDEXES, winning_plan_summary
+
+
+def test_index_names_are_unique_per_collection():
+    for collection, indexes in INDEXES.items():
+        names = [index.document["name"] for index in indexes]
+        assert len(names) == len(set(names)), collection
+
+
+def test_hot_queries_target_declared_collections():
+    for query in HOT_QUERIES:
+        assert query["collection"] in INDEXES
+
+
+def test_winning_plan_summary():
+    plan = {
+        "stage": "FETCH",
+        "inputStage": {"stage": "IXSCAN", "indexName": "seen_timestamp"},
+    }
+    assert winning_plan_summary(plan) == ["FETCH", "IXSCAN seen_timestamp"]
+
+    or_plan = {
+        "stage": "SUBPLAN",
+        "inputStage": {
+            "stage": "OR",
+            "inputStages": [
+                {"stage": "IXSCAN", "indexName": "a"},
+                {"stage": "COLLSCAN"},
+            ],
+        },
+    }
+    assert winning_plan_summary(or_plan) == ["SUBPLAN", "OR", "IXSCAN a", "COLLSCAN"]
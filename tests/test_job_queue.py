@@ -0,0 +1,47 @@
+from utils import job_queue
+
+
+def _job(job_type, attempts=1, max_attempts=3):
+    return {"_id": "job1", "type": job_type, "payload": {"n": 1},
+            "attempts": attempts, "max_attempts": max_attempts}
+
+
+def test_run_next_job_empty_queue(monkeypatch):
+    monkeypatch.setattr(job_queue, "claim_next_job", lambda worker_id: None)
+    assert job_queue.run_next_job("w1") is False
+
+
+def test_run_next_job_completes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(job_queue, "claim_next_job", lambda worker_id: _job("test_ok"))
+    monkeypatch.setattr(job_queue, "complete_job", lambda job_id: calls.append(("done", job_id)))
+    job_queue.register_handler("test_ok")(lambda payload: calls.append(("ran", payload)))
+
+    assert job_queue.run_next_job("w1") is True
+    assert calls == [("ran", {"n": 1}), ("done", "job1")]
+
+
+def test_run_next_job_calls_on_failure_when_retries_exhausted(monkeypatch):
+    failures = []
+    monkeypatch.setattr(job_queue, "claim_next_job", lambda worker_id: _job("test_fail", 3, 3))
+    monkeypatch.setattr(job_queue, "fail_job", lambda job, error: "failed")
+
+    def handler(payload):
+        raise RuntimeError("boom")
+
+    job_queue.register_handler("test_fail", on_failure=lambda p, e: failures.append(str(e)))(handler)
+
+    assert job_queue.run_next_job("w1") is True
+    assert failures == ["boom"]
+
+
+def test_fail_abandoned_runs_failure_callback(monkeypatch):
+    failures = []
+    abandoned = dict(_job("test_abandoned", 3, 3), last_error="Worker stopped responding while running the job")
+    monkeypatch.setattr(job_queue, "fail_abandoned_jobs", lambda: [abandoned])
+    job_queue.register_handler("test_abandoned", on_failure=lambda p, e: failures.append((p, str(e))))(
+        lambda payload: None)
+
+    job_queue.fail_abandoned()
+
+    assert failures == [({"n": 1}, "Worker stopped responding while running the job")]
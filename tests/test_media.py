@@ -0,0 +1,82 @@
+import pytest
+from flask import Flask
+
+from utils.media import send_media
+from utils.storage import IMMUTABLE_CACHE_CONTROL, LocalStorage, content_digest
+
+DIGEST = "ab" * 32
+BLOB_KEY = f"blobs/ab/ab/{DIGEST}.wav"
+
+
+@pytest.fixture
+def media_client(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    (tmp_path / "blobs" / "ab" / "ab").mkdir(parents=True)
+    (tmp_path / "blobs" / "ab" / "ab" / f"{DIGEST}.wav").write_bytes(b"0123456789")
+    (tmp_path / "legacy.wav").write_bytes(b"old audio")
+
+    app = Flask(__name__)
+
+    @app.route("/media/<path:key>")
+    def media(key):
+        return send_media(storage, key, offload=app.config.get("OFFLOAD", "none"))
+
+    return app
+
+
+def test_content_digest_only_for_content_addressed_keys():
+    assert content_digest(BLOB_KEY) == DIGEST
+    assert content_digest(f"derivatives/ab/{DIGEST}_small.webp") == f"{DIGEST}_small"
+    assert content_digest("legacy.wav") is None
+    assert content_digest("blobs/not-a-hash.wav") is None
+
+
+def test_content_addressed_media_is_immutable_with_strong_etag(media_client):
+    response = media_client.test_client().get(f"/media/{BLOB_KEY}")
+
+    assert response.status_code == 200
+    assert response.data == b"0123456789"
+    assert response.headers["ETag"] == f'"{DIGEST}"'
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def test_if_none_match_returns_304(media_client):
+    response = media_client.test_client().get(f"/media/{BLOB_KEY}", headers={"If-None-Match": f'"{DIGEST}"'})
+
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_range_request_returns_partial_content(media_client):
+    response = media_client.test_client().get(f"/media/{BLOB_KEY}", headers={"Range": "bytes=2-5"})
+
+    assert response.status_code == 206
+    assert response.data == b"2345"
+    assert response.headers["Content-Range"] == "bytes 2-5/10"
+
+
+def test_legacy_media_is_revalidated(media_client):
+    client = media_client.test_client()
+    response = client.get("/media/legacy.wav")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert client.get("/media/legacy.wav", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_missing_and_escaping_keys_are_404(media_client):
+    client = media_client.test_client()
+    assert client.get("/media/blobs/missing.wav").status_code == 404
+    assert client.get("/media/../secret").status_code == 404
+
+
+def test_x_accel_redirect_offload_sends_no_body(media_client):
+    media_client.config["OFFLOAD"] = "x-accel-redirect"
+    response = media_client.test_client().get(f"/media/{BLOB_KEY}")
+
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["X-Accel-Redirect"] == f"/internal-media/{BLOB_KEY}"
+    assert response.headers["Content-Type"].startswith("audio/")
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
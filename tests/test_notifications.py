@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from database import notificationdatahandler
+from database.notificationdatahandler import NOTIFICATIONS_CHANNEL, format_notification, parse_feed_cursor
+from utils.pubsub import get_broker
+
+
+def test_format_notification_derives_seen_from_watermark():
+    notification = {"_id": ObjectId(), "seq": 7, "title": "t", "timestamp": datetime(2025, 1, 31, 12)}
+
+    assert format_notification(notification, seen_seq=7)["seen"] is True
+    formatted = format_notification(notification, seen_seq=6)
+    assert formatted["seen"] is False
+    assert formatted["timestamp"] == "2025-01-31T12:00:00"
+    assert formatted["_id"] == str(notification["_id"])
+
+
+def test_parse_feed_cursor():
+    assert parse_feed_cursor("42") == 42
+    with pytest.raises(ValueError):
+        parse_feed_cursor("abc")
+
+
+def test_unread_count_is_latest_minus_watermark(monkeypatch):
+    monkeypatch.setattr(notificationdatahandler, "latest_seq", lambda: 50)
+
+    assert notificationdatahandler.unread_count("admin", seen_seq=45) == 5
+    assert notificationdatahandler.unread_count("admin", seen_seq=60) == 0
+
+
+def test_publish_notifications_reaches_stream_subscribers(monkeypatch):
+    class Collection:
+        name = "notifications"
+
+    monkeypatch.setattr(notificationdatahandler, "beehive_notification_collection", Collection())
+    notification = {"_id": ObjectId(), "seq": 8, "title": "t", "timestamp": datetime(2025, 1, 31)}
+
+    with get_broker().subscribe(NOTIFICATIONS_CHANNEL) as subscription:
+        notificationdatahandler.publish_notifications([notification])
+        event = subscription.get(timeout=1)
+
+    assert event["seq"] == 8
+    assert event["seen"] is False
+
+
+def test_backfill_numbers_legacy_notifications_below_the_feed(monkeypatch):
+    class Cursor(list):
+        def sort(self, key, direction):
+            return Cursor(sorted(self, key=lambda n: n[key], reverse=direction < 0))
+
+    class Collection:
+        def __init__(self, notifications):
+            self.notifications = {n["_id"]: n for n in notifications}
+
+        def find(self, query, projection=None):
+            return Cursor(n for n in self.notifications.values() if "seq" not in n)
+
+        def find_one(self, query, projection=None, sort=None):
+            numbered = sorted((n for n in self.notifications.values() if "seq" in n), key=lambda n: n["seq"])
+            return numbered[0] if numbered else None
+
+        def bulk_write(self, requests, ordered=True):
+            for request in requests:
+                self.notifications[request._filter["_id"]].update(request._doc["$set"])
+
+    collection = Collection([
+        {"_id": "new1", "seq": 5, "timestamp": datetime(2025, 2, 1)},
+        {"_id": "new2", "seq": 6, "timestamp": datetime(2025, 2, 2)},
+        {"_id": "old2", "timestamp": datetime(2025, 1, 2)},
+        {"_id": "old1", "timestamp": datetime(2025, 1, 1)},
+    ])
+    monkeypatch.setattr(notificationdatahandler, "beehive_notification_collection", collection)
+
+    assert notificationdatahandler.backfill_seqs() == 2
+
+    seqs = {_id: n["seq"] for _id, n in collection.notifications.items()}
+    assert seqs == {"old1": 3, "old2": 4, "new1": 5, "new2": 6}
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from utils.pagination import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    parse_limit,
+)
+
+
+def test_cursor_roundtrip():
+    timestamp = datetime(2025, 1, 2, 3, 4, 5, 678000)
+    object_id = ObjectId()
+
+    assert decode_cursor(encode_cursor(timestamp, object_id)) == (timestamp, object_id)
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    timestamp = datetime(2025, 1, 1)
+    object_id = ObjectId()
+
+    query = keyset_filter("created_at", encode_cursor(timestamp, object_id))
+
+    assert query == {
+        "$or": [
+            {"created_at": {"$lt": timestamp}},
+            {"created_at": timestamp, "_id": {"$lt": object_id}},
+        ]
+    }
+
+
+def test_parse_limit():
+    assert parse_limit(None, default=10) == 10
+    assert parse_limit("5") == 5
+    assert parse_limit("0") == 1
+    assert parse_limit("100000") == MAX_PAGE_SIZE
+    with pytest.raises(ValueError):
+        parse_limit("ten")
@@ -0,0 +1,49 @@
+from utils.pubsub import Broker
+from utils.sse import event_stream, format_sse
+
+
+def test_publish_reaches_only_channel_subscribers():
+    broker = Broker()
+    a = broker.subscribe("chat:a")
+    b = broker.subscribe("chat:b")
+
+    assert broker.publish("chat:a", {"n": 1}) == 1
+    assert a.get(timeout=0) == {"n": 1}
+    assert b.get(timeout=0) is None
+
+
+def test_unsubscribe_removes_channel():
+    broker = Broker()
+    with broker.subscribe("chat:a"):
+        assert broker.subscriber_count("chat:a") == 1
+    assert broker.subscriber_count("chat:a") == 0
+    assert broker.publish("chat:a", {}) == 0
+
+
+def test_slow_subscriber_overflows_without_blocking():
+    broker = Broker()
+    subscription = broker.subscribe("chat:a", maxsize=2)
+    for n in range(5):
+        broker.publish("chat:a", n)
+
+    assert subscription.overflowed
+    assert subscription.get(timeout=0) == 0
+
+
+def test_format_sse():
+    assert format_sse({"a": 1}, event="message", event_id="42") == (
+        'id: 42\nevent: message\ndata: {"a": 1}\n\n'
+    )
+
+
+def test_event_stream_replays_backlog_and_closes():
+    broker = Broker()
+    subscription = broker.subscribe("chat:a")
+    broker.publish("chat:a", {"n": 2})
+
+    frames = list(event_stream(subscription, backlog=[{"n": 1}], heartbeat=0, max_duration=0.05))
+
+    assert frames[0].startswith("retry:")
+    assert 'data: {"n": 1}' in frames[1]
+    assert 'data: {"n": 2}' in frames[2]
+    assert broker.subscriber_count("chat:a") == 0
@@ -0,0 +1,105 @@
+import pytest
+from flask import Flask, jsonify
+
+from utils import response_cache
+from utils.response_cache import LocalGenerations, MemoryCache, cached_response, invalidate, uploads_scope
+
+
+@pytest.fixture
+def cached_app(monkeypatch):
+    monkeypatch.setattr(response_cache, "_cache", MemoryCache(max_entries=16, ttl=60))
+    app = Flask(__name__)
+    app.calls = 0
+
+    @app.route("/uploads/<user_id>")
+    @cached_response(lambda user_id: [uploads_scope(user_id)])
+    def uploads(user_id):
+        app.calls += 1
+        return jsonify({"user_id": user_id, "calls": app.calls})
+
+    @app.route("/broken")
+    @cached_response(lambda: ["broken"])
+    def broken():
+        app.calls += 1
+        return jsonify({"error": "boom"}), 500
+
+    return app
+
+
+def test_repeated_requests_are_served_from_cache(cached_app):
+    client = cached_app.test_client()
+    first = client.get("/uploads/u1")
+    second = client.get("/uploads/u1")
+
+    assert first.status_code == second.status_code == 200
+    assert first.get_json() == second.get_json() == {"user_id": "u1", "calls": 1}
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_query_string_and_user_are_part_of_the_key(cached_app):
+    client = cached_app.test_client()
+    client.get("/uploads/u1")
+    client.get("/uploads/u1?limit=5")
+    client.get("/uploads/u2")
+
+    assert cached_app.calls == 3
+
+
+def test_matching_etag_returns_304(cached_app):
+    client = cached_app.test_client()
+    etag = client.get("/uploads/u1").headers["ETag"]
+    response = client.get("/uploads/u1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_invalidate_only_drops_the_scope(cached_app):
+    client = cached_app.test_client()
+    client.get("/uploads/u1")
+    client.get("/uploads/u2")
+
+    invalidate(uploads_scope("u1"))
+
+    assert client.get("/uploads/u1").get_json()["calls"] == 3
+    assert client.get("/uploads/u2").get_json()["calls"] == 2
+
+
+def test_errors_are_not_cached(cached_app):
+    client = cached_app.test_client()
+    client.get("/broken")
+    response = client.get("/broken")
+
+    assert response.status_code == 500
+    assert cached_app.calls == 2
+
+
+def test_cache_from_env_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        response_cache.cache_from_env({"RESPONSE_CACHE_BACKEND": "memcached"})
+
+
+def test_shared_generations_invalidate_every_process(cached_app, monkeypatch):
+    shared = LocalGenerations()
+    worker = MemoryCache(max_entries=16, ttl=60, generations=shared)
+    monkeypatch.setattr(response_cache, "_cache", worker)
+    client = cached_app.test_client()
+    client.get("/uploads/u1")
+
+    # A write in another process (e.g. the job worker) bumps the shared generation
+    MemoryCache(generations=shared).bump(uploads_scope("u1"))
+
+    assert client.get("/uploads/u1").get_json()["calls"] == 2
+
+
+def test_local_generations_are_bounded():
+    generations = LocalGenerations(max_scopes=2, ttl=60)
+    before = generations.get(["a"])
+
+    for scope in ["a", "b", "c"]:
+        generations.bump(scope)
+
+    assert len(generations._values) == 2
+    # "a" was forgotten early, but does not go back to its first generation
+    assert generations.get(["a"]) != before
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from database import userdatahandler
+
+
+class FakeCollection:
+    def __init__(self, fail_indexes=()):
+        self.fail_indexes = set(fail_indexes)
+        self.docs = []
+        self.deleted = []
+
+    def insert_many(self, documents, ordered=True):
+        errors = []
+        for i, document in enumerate(documents):
+            if i in self.fail_indexes:
+                errors.append({"index": i, "errmsg": "duplicate key"})
+            else:
+                self.docs.append(document)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def delete_many(self, query):
+        self.deleted.extend(query["_id"]["$in"])
+
+
+def _fail(*args, **kwargs):
+    raise RuntimeError("connection reset")
+
+
+def _uploads(n):
+    return [{"filename": f"f{i}.png", "title": "t", "description": "d"} for i in range(n)]
+
+
+def _patch(monkeypatch, images, notifications, published=None):
+    added = []
+    published = [] if published is None else published
+    monkeypatch.setattr(userdatahandler, "beehive_image_collection", images)
+    monkeypatch.setattr(userdatahandler, "beehive_notification_collection", notifications)
+    monkeypatch.setattr(userdatahandler, "record_images_added", added.extend)
+    monkeypatch.setattr(userdatahandler, "reserve_seqs", lambda count: 41)
+    monkeypatch.setattr(userdatahandler, "publish_notifications", published.extend)
+    monkeypatch.setattr(userdatahandler, "invalidate", lambda *scopes: None)
+    return added
+
+
+def test_save_uploads_reports_failed_image_inserts(monkeypatch):
+    images, notifications = FakeCollection(fail_indexes={1}), FakeCollection()
+    added = _patch(monkeypatch, images, notifications)
+
+    results = userdatahandler.save_uploads("u1", "User", _uploads(3), datetime(2025, 1, 31))
+
+    assert [("error" in r) for r in results] == [False, True, False]
+    assert [n["image_filename"] for n in notifications.docs] == ["f0.png", "f2.png"]
+    assert [n["seq"] for n in notifications.docs] == [41, 42]
+    assert [image["filename"] for image in added] == ["f0.png", "f2.png"]
+
+
+def test_save_uploads_rolls_back_images_without_notification(monkeypatch):
+    images, notifications = FakeCollection(), FakeCollection(fail_indexes={0})
+    published = []
+    added = _patch(monkeypatch, images, notifications, published)
+
+    results = userdatahandler.save_uploads("u1", "User", _uploads(2), datetime(2025, 1, 31))
+
+    assert "error" in results[0] and "image_id" in results[1]
+    assert images.deleted == [images.docs[0]["_id"]]
+    assert [image["filename"] for image in added] == ["f1.png"]
+    assert [n["image_filename"] for n in published] == ["f1.png"]
+
+
+def test_save_uploads_removes_the_batch_when_numbering_fails(monkeypatch):
+    images, notifications = FakeCollection(), FakeCollection()
+    _patch(monkeypatch, images, notifications)
+    monkeypatch.setattr(userdatahandler, "reserve_seqs", _fail)
+
+    with pytest.raises(RuntimeError):
+        userdatahandler.save_uploads("u1", "User", _uploads(2), datetime(2025, 1, 31))
+
+    assert images.deleted == [image["_id"] for image in images.docs]
+
+
+def test_save_uploads_keeps_records_when_counting_fails(monkeypatch):
+    images, notifications = FakeCollection(), FakeCollection()
+    _patch(monkeypatch, images, notifications)
+    monkeypatch.setattr(userdatahandler, "record_images_added", _fail)
+    monkeypatch.setattr(userdatahandler, "publish_notifications", _fail)
+
+    results = userdatahandler.save_uploads("u1", "User", _uploads(2), datetime(2025, 1, 31))
+
+    assert all("image_id" in result for result in results)
+    assert images.deleted == [] and notifications.deleted == []
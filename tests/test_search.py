@@ -0,0 +1,79 @@
+import pytest
+from pymongo.errors import ExecutionTimeout
+
+from database import userdatahandler
+from database.userdatahandler import parse_search_args, sentiment_tags
+
+
+def test_sentiment_tags_are_split_and_lowercased():
+    assert sentiment_tags("Joyful") == ["joyful"]
+    assert sentiment_tags(" Hopeful, joyful,,Joyful ") == ["hopeful", "joyful"]
+    assert sentiment_tags(None) == []
+    assert sentiment_tags("") == []
+
+
+def test_parse_search_args():
+    options = parse_search_args({"q": " sunset ", "sentiments": "Joyful,Lost in Thought", "match": "ALL"})
+
+    assert options["text"] == "sunset"
+    assert options["tags"] == ["joyful", "lost in thought"]
+    assert options["match_all"] is True
+    assert options["cursor"] is None
+
+    assert parse_search_args({})["text"] is None
+    with pytest.raises(ValueError):
+        parse_search_args({"match": "some"})
+    with pytest.raises(ValueError):
+        parse_search_args({"q": "x" * 201})
+
+
+def test_search_images_builds_indexed_query(monkeypatch):
+    calls = []
+
+    def fake_paginate(collection, query, field, limit, cursor=None, projection=None, max_time_ms=None):
+        calls.append(query)
+        return [], None
+
+    monkeypatch.setattr(userdatahandler, "paginate", fake_paginate)
+
+    userdatahandler.search_images("sunset", ["joyful", "hopeful"], match_all=True, user_id="u1")
+    userdatahandler.search_images(tags=["joyful"])
+
+    assert calls[0] == {
+        "user_id": "u1",
+        "$text": {"$search": "sunset"},
+        "sentiment_tags": {"$all": ["joyful", "hopeful"]},
+    }
+    assert calls[1] == {"sentiment_tags": {"$in": ["joyful"]}}
+
+
+class FakeImages:
+    def __init__(self, buckets=None, error=None):
+        self.buckets = buckets or []
+        self.error = error
+        self.pipelines = []
+
+    def aggregate(self, pipeline, maxTimeMS=None):
+        self.pipelines.append(pipeline)
+        if self.error:
+            raise self.error
+        return iter(self.buckets)
+
+
+def test_sentiment_facets_cover_catalogue_and_are_cached(monkeypatch):
+    images = FakeImages([{"_id": "joyful", "count": 3}, {"_id": "custom tag", "count": 1}])
+    monkeypatch.setattr(userdatahandler, "beehive_image_collection", images)
+    monkeypatch.setattr(userdatahandler, "SENTIMENTS", ["Joyful", "Hopeful"])
+    userdatahandler._facet_cache.clear()
+
+    facets = userdatahandler.sentiment_facets("beach", "u1")
+    assert facets == [{"sentiment": "Joyful", "count": 3}, {"sentiment": "Hopeful", "count": 0}]
+    assert userdatahandler.sentiment_facets("beach", "u1") == facets
+    assert len(images.pipelines) == 1
+
+
+def test_sentiment_facets_give_up_on_timeout(monkeypatch):
+    monkeypatch.setattr(userdatahandler, "beehive_image_collection", FakeImages(error=ExecutionTimeout("slow")))
+    userdatahandler._facet_cache.clear()
+
+    assert userdatahandler.sentiment_facets() is None
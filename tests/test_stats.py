@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from database import statsdatahandler
+
+
+def _ids(updates):
+    return [u._filter["_id"] for u in updates]
+
+
+def test_counter_updates_buckets_by_day_and_sentiment():
+    image = {"created_at": datetime(2025, 1, 31, 10), "sentiment": "Joyful", "audio_filename": "a.wav"}
+    updates = statsdatahandler._counter_updates(image, 1)
+
+    assert _ids(updates) == ["totals", "day:2025-01-31", "day_sentiment:2025-01-31:Joyful"]
+    assert updates[0]._doc == {"$inc": {"images": 1, "voice_notes": 1}}
+
+
+def test_counter_updates_without_audio_or_sentiment():
+    image = {"created_at": datetime(2025, 1, 31, 10), "audio_filename": None}
+    updates = statsdatahandler._counter_updates(image, -1)
+
+    assert _ids(updates) == ["totals", "day:2025-01-31"]
+    assert updates[0]._doc == {"$inc": {"images": -1, "voice_notes": 0}}
+
+
+def test_sentiment_change_moves_between_buckets(monkeypatch):
+    writes = []
+    monkeypatch.setattr(statsdatahandler.beehive_stats_collection, "bulk_write",
+                        lambda updates, ordered: writes.append(updates))
+    image = {"created_at": datetime(2025, 1, 31, 10), "sentiment": "Calm"}
+
+    statsdatahandler.record_sentiment_changed(image, "Calm")
+    assert writes == []
+
+    statsdatahandler.record_sentiment_changed(image, "Joyful")
+    assert _ids(writes[0]) == ["day_sentiment:2025-01-31:Calm", "day_sentiment:2025-01-31:Joyful"]
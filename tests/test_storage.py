@@ -0,0 +1,95 @@
+import io
+
+import pytest
+
+from utils.storage import LocalStorage, S3Storage, StorageError, storage_from_env
+
+
+class FakeS3Client:
+    """In-memory stand-in for the few boto3 S3 client calls the backend uses."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self.objects[(bucket, key)] = (fileobj.read(), ExtraArgs)
+
+    def upload_file(self, path, bucket, key, ExtraArgs=None, Config=None):
+        with open(path, "rb") as f:
+            self.objects[(bucket, key)] = (f.read(), ExtraArgs)
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            error = Exception("Not Found")
+            error.response = {"Error": {"Code": "404"}}
+            raise error
+        return {"ContentLength": len(self.objects[(Bucket, Key)][0])}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)][0])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def download_file(self, bucket, key, path):
+        with open(path, "wb") as f:
+            f.write(self.objects[(bucket, key)][0])
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+def test_local_storage_round_trip(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+
+    assert storage.put_stream("blobs/ab/file.txt", io.BytesIO(b"hello")) == 5
+    assert storage.exists("blobs/ab/file.txt")
+    with storage.open("blobs/ab/file.txt") as f:
+        assert f.read() == b"hello"
+    assert storage.url("blobs/ab/file.txt") == "/media/blobs/ab/file.txt"
+
+    storage.delete("blobs/ab/file.txt")
+    storage.delete("blobs/ab/file.txt")
+    assert not storage.exists("blobs/ab/file.txt")
+
+
+def test_local_storage_rejects_keys_outside_root(tmp_path):
+    with pytest.raises(StorageError):
+        LocalStorage(str(tmp_path)).path("../secret")
+
+
+def test_s3_storage_against_fake_client(tmp_path):
+    client = FakeS3Client()
+    storage = S3Storage("media", prefix="beehive", client=client, presign_expires=60)
+
+    assert storage.put_stream("blobs/ab/a.png", io.BytesIO(b"png bytes")) == 9
+    assert client.objects[("media", "beehive/blobs/ab/a.png")][1]["ContentType"] == "image/png"
+    assert storage.exists("blobs/ab/a.png")
+    assert not storage.exists("blobs/ab/missing.png")
+    assert storage.size("blobs/ab/a.png") == 9
+    assert storage.open("blobs/ab/a.png").read() == b"png bytes"
+    assert storage.url("blobs/ab/a.png") == "https://s3.test/media/beehive/blobs/ab/a.png?expires=60"
+
+    with storage.local_copy("blobs/ab/a.png") as path:
+        with open(path, "rb") as f:
+            assert f.read() == b"png bytes"
+
+    local = tmp_path / "upload.part"
+    local.write_bytes(b"pdf")
+    storage.put_file("blobs/cd/b.pdf", str(local))
+    assert not local.exists()
+    assert storage.exists("blobs/cd/b.pdf")
+
+    storage.delete("blobs/ab/a.png")
+    assert not storage.exists("blobs/ab/a.png")
+
+
+def test_s3_storage_rejects_parent_keys():
+    with pytest.raises(StorageError):
+        S3Storage("media", client=FakeS3Client()).object_key("../x")
+
+
+def test_storage_from_env_defaults_to_local():
+    storage = storage_from_env({"UPLOAD_FOLDER": "/srv/uploads"})
+    assert isinstance(storage, LocalStorage)
+    assert storage.root == "/srv/uploads"
@@ -0,0 +1,7 @@
+from utils.thumbnails import thumbnail_filename, thumbnail_key
+
+
+def test_thumbnail_replaces_only_the_pdf_extension():
+    assert thumbnail_filename("report.pdf.v2.PDF") == "report.pdf.v2.jpg"
+    assert thumbnail_filename("blobs/ab/cd/abcd.pdf") == "ab/cd/abcd.jpg"
+    assert thumbnail_key("Scan.PDF") == "thumbnails/Scan.jpg"
@@ -0,0 +1,76 @@
+import io
+import threading
+import time
+
+import app as app_module
+
+
+class FakeFile:
+    def __init__(self, filename, data=b"data"):
+        self.filename = filename
+        self.stream = io.BytesIO(data)
+
+
+def test_files_are_stored_in_parallel_and_in_order(monkeypatch):
+    both_started = threading.Barrier(2, timeout=5)
+
+    def store_stream(stream, storage, ext, **kwargs):
+        name = stream.read().decode()
+        if name in ("a", "b"):
+            # Only passes if the first two files are stored at the same time
+            both_started.wait()
+        if name == "a":
+            time.sleep(0.05)
+        return {"path": f"blobs/{name}.{ext}", "content_hash": name, "size": 1}
+
+    monkeypatch.setattr(app_module, "store_stream", store_stream)
+    files = [FakeFile("a.png", b"a"), FakeFile("b.png", b"b"), FakeFile("c.pdf", b"c")]
+
+    stored = app_module.store_upload_files(files)
+
+    assert [blob["path"] for blob in stored] == ["blobs/a.png", "blobs/b.png", "blobs/c.pdf"]
+
+
+def test_a_failing_file_does_not_stop_the_batch(monkeypatch):
+    def store_stream(stream, storage, ext, **kwargs):
+        if stream.read() == b"bad":
+            raise OSError("disk full")
+        return {"path": "blobs/ok.png", "content_hash": "ok", "size": 1}
+
+    monkeypatch.setattr(app_module, "store_stream", store_stream)
+
+    stored = app_module.store_upload_files([FakeFile("bad.png", b"bad"), FakeFile("ok.png")])
+
+    assert "disk full" in stored[0]["error"]
+    assert stored[1]["path"] == "blobs/ok.png"
+
+
+def test_upload_returns_an_outcome_per_file(client, monkeypatch):
+    def store_stream(stream, storage, ext, **kwargs):
+        if stream.read() == b"bad":
+            raise OSError("disk full")
+        return {"path": "blobs/ok.png", "content_hash": "ok", "size": 2}
+
+    def record_uploads(user_id, username, uploads):
+        return [
+            {"filename": upload["filename"], "original_filename": upload["original_filename"], "image_id": "img1"}
+            for upload in uploads
+        ]
+
+    monkeypatch.setattr(app_module, "store_stream", store_stream)
+    monkeypatch.setattr(app_module, "record_uploads", record_uploads)
+
+    response = client.post("/api/user/upload/u1", data={
+        "title": "t",
+        "description": "d",
+        "files": [(io.BytesIO(b"bad"), "first.png"), (io.BytesIO(b"ok"), "second.png")],
+    }, content_type="multipart/form-data")
+
+    assert response.status_code == 207
+    results = response.get_json()["results"]
+    assert results[0]["index"] == 0
+    assert results[0]["original_filename"] == "first.png"
+    assert "disk full" in results[0]["error"]
+    assert results[1] == {
+        "index": 1, "filename": "blobs/ok.png", "original_filename": "second.png", "image_id": "img1"
+    }
@@ -0,0 +1,226 @@
+"""Voice note ingestion and transcoding.
+
+Voice notes arrive as an ``audio`` multipart part (whatever the browser's
+MediaRecorder produced: WebM/Ogg Opus, WAV, MP4 audio, ...). The upload
+request only streams the part into the blob store, once per upload batch,
+and every image of the batch points at it through ``audio_filename``.
+
+A ``voice_note`` job then does the expensive work with ffmpeg, off the
+request path:
+
+- transcodes the recording to mono Opus in an Ogg container, stored
+  content-addressed at ``derivatives/<aa>/<sha256>_voice.ogg``;
+- measures its duration and computes ``PEAK_COUNT`` waveform peaks (0-1) so
+  the player can draw a waveform without downloading the audio.
+
+The result is recorded as ``voice_note`` on every image using that
+recording: ``{'status': 'ready', 'key', 'duration', 'peaks'}``. Until then
+``status`` is ``pending`` and players use the original ``audio_filename``.
+
+ffmpeg must be on the PATH of the job worker (``FFMPEG_BINARY`` overrides it).
+"""
+
+import array
+import base64
+import os
+import subprocess
+import sys
+
+from database.userdatahandler import set_voice_note
+from utils.derivatives import DERIVATIVES_DIR, file_sha256
+from utils.job_queue import register_handler
+from utils.storage import content_digest, get_storage
+
+VOICE_NOTE_JOB = 'voice_note'
+
+# Extensions accepted for the audio part, by what recorders and browsers send
+AUDIO_EXTENSIONS = {'wav', 'webm', 'ogg', 'opus', 'mp3', 'm4a', 'mp4', 'aac'}
+
+AUDIO_MIME_EXTENSIONS = {
+    'audio/wav': 'wav',
+    'audio/x-wav': 'wav',
+    'audio/wave': 'wav',
+    'audio/webm': 'webm',
+    'audio/ogg': 'ogg',
+    'audio/opus': 'opus',
+    'audio/mpeg': 'mp3',
+    'audio/mp4': 'm4a',
+    'audio/x-m4a': 'm4a',
+    'audio/aac': 'aac',
+}
+
+# Voice notes are short; anything larger is not a voice note
+MAX_VOICE_NOTE_SIZE = int(os.getenv('MAX_VOICE_NOTE_SIZE', 25 * 1024 * 1024))
+
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFMPEG_TIMEOUT = 300
+
+TRANSCODED_EXT = 'ogg'
+OPUS_BITRATE = '32k'
+
+# Peaks are computed from 8 kHz mono 16-bit PCM
+PEAK_SAMPLE_RATE = 8000
+PEAK_COUNT = 100
+PCM_CHUNK_SIZE = 64 * 1024
+
+
+class AudioError(Exception):
+    """Raised for unsupported voice notes or failed transcodes."""
+    pass
+
+
+def audio_extension(filename, mimetype=None):
+    """Extension to store an audio part under, or None if it is not a supported format."""
+    if mimetype:
+        ext = AUDIO_MIME_EXTENSIONS.get(mimetype.split(';')[0].strip().lower())
+        if ext:
+            return ext
+    ext = filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+    return ext if ext in AUDIO_EXTENSIONS else None
+
+
+class Base64Reader:
+    """File-like reader decoding base64 text in chunks.
+
+    Used for the legacy ``audioData`` form field (a ``data:`` URL) so the
+    decoded bytes are streamed into the blob store instead of being held in
+    memory next to the text.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def read(self, size=-1):
+        if self.pos >= len(self.text):
+            return b''
+        if size is None or size < 0:
+            end = len(self.text)
+        else:
+            # Four characters of base64 make three bytes
+            end = min(len(self.text), self.pos + max(4, (size // 3) * 4))
+        chunk = self.text[self.pos:end]
+        self.pos = end
+        return base64.b64decode(chunk)
+
+
+def data_url_reader(data_url):
+    """Reader over the payload of a base64 ``data:`` URL; returns ``(reader, extension)``."""
+    header, _, payload = data_url.partition(',')
+    if not payload or not header.startswith('data:') or ';base64' not in header:
+        raise AudioError('Audio data must be a base64 data URL')
+    mimetype = header[len('data:'):].split(';')[0]
+    return Base64Reader(''.join(payload.split())), audio_extension('', mimetype) or 'wav'
+
+
+def transcoded_key(content_hash):
+    return f'{DERIVATIVES_DIR}/{content_hash[:2]}/{content_hash}_voice.{TRANSCODED_EXT}'
+
+
+def _run_ffmpeg(args, **kwargs):
+    try:
+        return subprocess.run(
+            [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-loglevel', 'error', *args],
+            check=True, timeout=FFMPEG_TIMEOUT, **kwargs
+        )
+    except FileNotFoundError:
+        raise AudioError(f"ffmpeg not found (looked for '{FFMPEG_BINARY}')")
+    except subprocess.CalledProcessError as e:
+        raise AudioError(f"ffmpeg failed: {(e.stderr or b'').decode(errors='replace').strip()}")
+
+
+def transcode(source_path, dest_path):
+    """Transcode any audio file ffmpeg can read to mono Opus in Ogg."""
+    _run_ffmpeg(
+        ['-y', '-i', source_path, '-vn', '-ac', '1', '-c:a', 'libopus',
+         '-b:a', OPUS_BITRATE, '-application', 'voip', '-f', 'ogg', dest_path],
+        capture_output=True
+    )
+
+
+def compute_peaks(pcm_chunks, count=PEAK_COUNT, sample_rate=PEAK_SAMPLE_RATE):
+    """Duration and ``count`` normalized peaks of signed 16-bit mono PCM.
+
+    ``pcm_chunks`` is an iterable of byte strings (chunk boundaries do not
+    need to fall on samples). Returns ``(duration_seconds, peaks)``.
+    """
+    # Peak of every window of 10 ms first, so the whole recording is never in memory
+    window = max(1, sample_rate // 100)
+    window_peaks = []
+    pending = array.array('h')
+    samples = 0
+    carry = b''
+    for chunk in pcm_chunks:
+        chunk = carry + chunk
+        usable = len(chunk) - len(chunk) % 2
+        carry = chunk[usable:]
+        values = array.array('h', chunk[:usable])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        samples += len(values)
+        pending.extend(values)
+        full = len(pending) - len(pending) % window
+        for start in range(0, full, window):
+            part = pending[start:start + window]
+            window_peaks.append(max(max(part), -min(part)))
+        del pending[:full]
+    if pending:
+        window_peaks.append(max(max(pending), -min(pending)))
+
+    duration = round(samples / sample_rate, 2)
+    if not window_peaks:
+        return duration, []
+
+    peaks = []
+    for i in range(count):
+        start = i * len(window_peaks) // count
+        end = max(start + 1, (i + 1) * len(window_peaks) // count)
+        peaks.append(round(max(window_peaks[start:end], default=0) / 32768, 3))
+    return duration, peaks
+
+
+def decode_pcm(source_path):
+    """Yield the audio of ``source_path`` as 8 kHz mono 16-bit little-endian PCM."""
+    process = subprocess.Popen(
+        [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-loglevel', 'error', '-i', source_path,
+         '-vn', '-ac', '1', '-ar', str(PEAK_SAMPLE_RATE), '-f', 's16le', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        for chunk in iter(lambda: process.stdout.read(PCM_CHUNK_SIZE), b''):
+            yield chunk
+    finally:
+        process.stdout.close()
+        if process.wait(timeout=FFMPEG_TIMEOUT) != 0:
+            raise AudioError(f'ffmpeg could not decode {source_path}')
+
+
+def process_voice_note(storage, audio_filename):
+    """Transcode a stored voice note (unless done already) and measure it."""
+    with storage.local_copy(audio_filename) as source_path:
+        content_hash = content_digest(audio_filename) or file_sha256(source_path)
+        key = transcoded_key(content_hash)
+        if not storage.exists(key):
+            tmp_path = storage.temp_path()
+            try:
+                transcode(source_path, tmp_path)
+                storage.put_file(key, tmp_path, 'audio/ogg')
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        duration, peaks = compute_peaks(decode_pcm(source_path))
+    return {'status': 'ready', 'key': key, 'duration': duration, 'peaks': peaks}
+
+
+def mark_voice_note_failed(payload, error):
+    set_voice_note(payload['audio_filename'], {'status': 'failed'})
+
+
+@register_handler(VOICE_NOTE_JOB, on_failure=mark_voice_note_failed)
+def handle_voice_note_job(payload):
+    """Job handler: transcode the voice note and record it on every image using it."""
+    storage = get_storage()
+    if not storage.exists(payload['audio_filename']):
+        # Every upload using it was deleted before we got to it
+        return
+    set_voice_note(payload['audio_filename'], process_voice_note(storage, payload['audio_filename']))
@@ -0,0 +1,90 @@
+"""Content-addressed storage for uploaded files.
+
+Uploads are stored under the SHA-256 of their content, sharded two levels
+deep so no directory (or key prefix) holds more than a few hundred entries:
+
+    blobs/ab/cd/abcd...ef.<ext>
+
+The hash is computed while the upload is streamed to a temporary file, so
+the content is read only once; the file is then handed to the storage
+backend (``utils/storage.py``). Identical uploads end up at the same key and
+are stored once; every image record pointing at a blob holds a reference
+(``database/blobdatahandler.py``) and the blob is deleted when the last one
+is released. Keys are what image records store in ``filename`` and
+``audio_filename``.
+"""
+
+import hashlib
+import os
+
+from database.blobdatahandler import add_blob_references, forget_blob, release_blob_references
+from utils.chunked_upload import copy_stream
+
+BLOBS_DIR = 'blobs'
+
+
+class HashingWriter:
+    """File wrapper that hashes everything written through it."""
+
+    def __init__(self, out):
+        self.out = out
+        self.digest = hashlib.sha256()
+
+    def write(self, chunk):
+        self.digest.update(chunk)
+        return self.out.write(chunk)
+
+
+def blob_path(content_hash, ext):
+    return '/'.join([BLOBS_DIR, content_hash[:2], content_hash[2:4], f'{content_hash}.{ext.lower()}'])
+
+
+def is_blob_path(filename):
+    return bool(filename) and filename.startswith(BLOBS_DIR + '/')
+
+
+def _place(storage, tmp, content_hash, ext, size, references):
+    """Hand a fully written temporary file to the storage, or drop it if the blob exists."""
+    key = blob_path(content_hash, ext)
+    # Take the references first so a concurrent release cannot remove the blob under us;
+    # if one was already removing it, this waits for it and writes the file again
+    if add_blob_references(key, size, references) or not storage.exists(key):
+        storage.put_file(key, tmp)
+    else:
+        os.remove(tmp)
+    return {'path': key, 'content_hash': content_hash, 'size': size}
+
+
+def store_stream(stream, storage, ext, references=1, max_bytes=None):
+    """Store a file-like stream; returns ``{'path', 'content_hash', 'size'}``."""
+    tmp = storage.temp_path()
+    try:
+        with open(tmp, 'wb') as out:
+            writer = HashingWriter(out)
+            size = copy_stream(stream, writer, max_bytes=max_bytes)
+        return _place(storage, tmp, writer.digest.hexdigest(), ext, size, references)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def store_file(path, storage, ext, references=1):
+    """Move a local file (e.g. a finished chunked upload) into the store."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    size = os.path.getsize(path)
+    return _place(storage, path, digest.hexdigest(), ext, size, references)
+
+
+def release(storage, key, count=1):
+    """Drop references to a blob; deletes it and returns True once none are left."""
+    if not release_blob_references(key, count):
+        return False
+    try:
+        storage.delete(key)
+    finally:
+        forget_blob(key)
+    return True
@@ -0,0 +1,210 @@
+"""Streaming and resumable upload helpers.
+
+Incoming files are copied to disk in fixed-size chunks so a request never
+holds a whole upload in memory. Data is written to a ``.part`` file first and
+only renamed into place once the last byte has landed, so callers can safely
+create database records after these helpers return.
+
+Resumable upload sessions that have not received data for
+``CHUNKED_UPLOAD_TTL`` seconds are removed by a periodic job, so abandoned
+uploads do not fill the disk.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+
+from utils.job_queue import register_handler, register_periodic
+
+# Size of each read from the request stream
+CHUNK_SIZE = 64 * 1024
+
+# Partial files of resumable uploads; keep this outside the public static folder
+SESSION_FOLDER = os.getenv('CHUNKED_UPLOAD_FOLDER', 'uploads_tmp')
+
+# Sessions without a write for this long are swept
+SESSION_TTL = int(os.getenv('CHUNKED_UPLOAD_TTL', 24 * 3600))
+
+SWEEP_SESSIONS_JOB = 'sweep_upload_sessions'
+SWEEP_INTERVAL = 3600
+
+_UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """Raised when an upload cannot be written or resumed."""
+    pass
+
+
+class UploadTooLarge(UploadError):
+    """Raised when an upload exceeds its declared or allowed size."""
+    pass
+
+
+class ChunkOffsetMismatch(UploadError):
+    """Raised when a chunk does not start where the previous one ended."""
+
+    def __init__(self, expected, received):
+        super().__init__(f"Expected chunk at offset {expected}, got {received}")
+        self.expected = expected
+        self.received = received
+
+
+class ChunkInProgress(UploadError):
+    """Raised when another chunk of the same session is still being written."""
+    pass
+
+
+def copy_stream(stream, out, chunk_size=CHUNK_SIZE, max_bytes=None):
+    """Copy ``stream`` into the open file ``out`` and return bytes written."""
+    written = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        written += len(chunk)
+        if max_bytes is not None and written > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        out.write(chunk)
+    return written
+
+
+# Resumable uploads
+#
+# Each session is a pair of files in the session folder: ``<id>.json`` holding
+# the metadata and ``<id>.part`` holding the bytes received so far. The current
+# offset is always the size of the ``.part`` file, so a client that lost its
+# connection can ask for it and resume from there.
+
+def _session_paths(folder, upload_id):
+    if not _UPLOAD_ID_PATTERN.match(upload_id or ''):
+        raise UploadError('Invalid upload ID')
+    base = os.path.join(folder, upload_id)
+    return base + '.json', base + '.part'
+
+
+def create_session(folder, user_id, filename, total_size):
+    """Start a resumable upload and return its session metadata."""
+    os.makedirs(folder, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    meta_path, part_path = _session_paths(folder, upload_id)
+    session = {
+        'upload_id': upload_id,
+        'user_id': user_id,
+        'filename': filename,
+        'size': total_size,
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(session, f)
+    open(part_path, 'wb').close()
+    session['offset'] = 0
+    return session
+
+
+def get_session(folder, upload_id):
+    """Return session metadata with its current offset, or None if unknown."""
+    meta_path, part_path = _session_paths(folder, upload_id)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        session = json.load(f)
+    session['offset'] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return session
+
+
+def append_chunk(folder, upload_id, stream, offset, chunk_size=CHUNK_SIZE):
+    """Append the bytes of ``stream`` to a session starting at ``offset``.
+
+    Returns the new offset. Raises ``ChunkOffsetMismatch`` if ``offset`` is not
+    the current end of the partial file, and ``UploadTooLarge`` if the chunk
+    would run past the size declared when the session was created.
+    """
+    session = get_session(folder, upload_id)
+    if session is None:
+        raise UploadError('Upload session not found')
+
+    _, part_path = _session_paths(folder, upload_id)
+    with open(part_path, 'ab') as out:
+        # One writer per session, so two requests for the same offset cannot
+        # both pass the check and append twice. Released when the file closes.
+        try:
+            fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ChunkInProgress('Another chunk of this upload is still being written')
+        current = os.fstat(out.fileno()).st_size
+        if offset != current:
+            raise ChunkOffsetMismatch(current, offset)
+
+        remaining = session['size'] - offset
+        try:
+            written = copy_stream(stream, out, chunk_size, max_bytes=remaining)
+        except UploadTooLarge:
+            out.truncate(offset)
+            raise
+    return offset + written
+
+
+def finalize_session(folder, upload_id, dest_path):
+    """Move a fully received upload to ``dest_path`` and drop the session."""
+    session = get_session(folder, upload_id)
+    if session is None:
+        raise UploadError('Upload session not found')
+    if session['offset'] != session['size']:
+        raise UploadError(
+            f"Upload incomplete: received {session['offset']} of {session['size']} bytes"
+        )
+    meta_path, part_path = _session_paths(folder, upload_id)
+    os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+    # A plain rename when both are on the same filesystem, a copy otherwise
+    shutil.move(part_path, dest_path)
+    os.remove(meta_path)
+    return session
+
+
+def discard_session(folder, upload_id):
+    """Remove all files belonging to a session."""
+    for path in _session_paths(folder, upload_id):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def sweep_sessions(folder, max_age=SESSION_TTL, now=None):
+    """Remove sessions that have not been written to for ``max_age`` seconds.
+
+    Also removes the leftover half of a session whose other file is gone.
+    Returns the number of sessions removed.
+    """
+    if not os.path.isdir(folder):
+        return 0
+    now = time.time() if now is None else now
+    last_write = {}
+    for name in os.listdir(folder):
+        upload_id, ext = os.path.splitext(name)
+        if ext not in ('.json', '.part') or not _UPLOAD_ID_PATTERN.match(upload_id):
+            continue
+        try:
+            modified = os.path.getmtime(os.path.join(folder, name))
+        except FileNotFoundError:
+            continue
+        last_write[upload_id] = max(last_write.get(upload_id, 0), modified)
+
+    stale = [upload_id for upload_id, modified in last_write.items() if now - modified > max_age]
+    for upload_id in stale:
+        discard_session(folder, upload_id)
+    return len(stale)
+
+
+@register_handler(SWEEP_SESSIONS_JOB)
+def handle_sweep_sessions_job(payload):
+    removed = sweep_sessions(SESSION_FOLDER)
+    if removed:
+        logging.info(f"Removed {removed} abandoned upload sessions")
+
+register_periodic(SWEEP_SESSIONS_JOB, SWEEP_INTERVAL)
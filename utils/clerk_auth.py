@@ -1,68 +1,128 @@
+import hashlib
+import logging
 import os
-import requests
-import base64
-import json
+import threading
+import time
 from functools import wraps
+
+import jwt
+from cachetools import TLRUCache
 from flask import request, jsonify
 
+from database.streamticketdatahandler import redeem_stream_ticket
+from utils.jwks import JWKSCache, JWKSError, jwks_fetcher_from_env
+
+# Clerk signs session tokens with RS256
+ALGORITHMS = ['RS256']
+
+# Seconds of clock skew tolerated on exp/nbf/iat
+CLOCK_SKEW = int(os.getenv('CLERK_CLOCK_SKEW', 5))
+
+# Origins allowed in the `azp` claim (comma separated); unchecked when empty
+AUTHORIZED_PARTIES = [
+    party.strip() for party in os.getenv('CLERK_AUTHORIZED_PARTIES', '').split(',') if party.strip()
+]
+
+jwks_cache = JWKSCache(
+    jwks_fetcher_from_env(),
+    ttl=int(os.getenv('JWKS_CACHE_TTL', 3600))
+)
+
+# Tokens that already passed verification, keyed by their SHA-256 and kept
+# until they expire, so repeated requests with the same token skip the
+# signature check.
+verified_tokens = TLRUCache(
+    maxsize=int(os.getenv('VERIFIED_TOKEN_CACHE_SIZE', 1024)),
+    ttu=lambda key, claims, now: claims['exp'],
+    timer=time.time
+)
+verified_tokens_lock = threading.Lock()
+
+
+class AuthError(Exception):
+    """Raised when a session token is missing, malformed or fails verification."""
+    pass
+
+
+def verify_token(token):
+    """Verify a Clerk session token and return its claims."""
+    token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    with verified_tokens_lock:
+        claims = verified_tokens.get(token_hash)
+    if claims is not None:
+        return claims
+
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError:
+        raise AuthError('Invalid token format')
+    if header.get('alg') not in ALGORITHMS:
+        raise AuthError('Unsupported token algorithm')
+
+    try:
+        signing_key = jwks_cache.get_signing_key(header.get('kid'))
+        claims = jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=ALGORITHMS,
+            leeway=CLOCK_SKEW,
+            options={'require': ['exp', 'sub']}
+        )
+    except jwt.ExpiredSignatureError:
+        raise AuthError('Token expired')
+    except (jwt.InvalidTokenError, JWKSError) as e:
+        raise AuthError(f'Invalid token: {str(e)}')
+
+    if AUTHORIZED_PARTIES and claims.get('azp') not in AUTHORIZED_PARTIES:
+        raise AuthError('Token issued for an unauthorized party')
+
+    with verified_tokens_lock:
+        verified_tokens[token_hash] = claims
+    return claims
+
+
 def require_auth(f):
-    """Simple decorator to check if user is authenticated"""
+    """Check that the request carries a valid Clerk session token"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         auth_header = request.headers.get('Authorization')
 
-        
+        # EventSource cannot set headers, so event streams are opened with a
+        # single-use ticket (see database/streamticketdatahandler.py)
+        ticket = request.args.get('ticket')
+        if not auth_header and ticket and request.headers.get('Accept') == 'text/event-stream':
+            user_id = redeem_stream_ticket(ticket, request.path)
+            if not user_id:
+                return jsonify({'error': 'Invalid or expired stream ticket'}), 401
+            request.current_user = {'id': user_id, 'userid': user_id}
+            return f(*args, **kwargs)
+
         if not auth_header:
             return jsonify({'error': 'Authorization header required'}), 401
-        
+
         # Remove 'Bearer ' prefix if present
         if auth_header.startswith('Bearer '):
             token = auth_header[7:]
         else:
             token = auth_header
-            
+
         try:
-            print("Token to decode:", token[:50] + "..." if len(token) > 50 else token)
-            
-            # Simple JWT decode without external library
-            parts = token.split('.')
-            if len(parts) != 3:
-                return jsonify({'error': 'Invalid token format'}), 401
-            
-            # Decode the payload (second part)
-            payload = parts[1]
-            # Add padding if needed
-            payload += '=' * (4 - len(payload) % 4)
-            
-            try:
-                decoded_bytes = base64.urlsafe_b64decode(payload)
-                decoded = json.loads(decoded_bytes.decode('utf-8'))
-                print("Decoded token:", decoded)
-                
-                # Extract user ID from the token
-                user_id = decoded.get('sub') or decoded.get('userid')
-                print("Extracted user_id:", user_id)
-                
-                if not user_id:
-                    print("No user ID found in token")
-                    return jsonify({'error': 'No user ID in token'}), 401
-                
-                # Token is valid, user is authenticated
-                request.current_user = {
-                    'id': user_id,
-                    'userid': user_id  # Your session claim
-                }
-                print("Authentication successful for user:", user_id)
-                
-                return f(*args, **kwargs)
-                
-            except Exception as decode_error:
-                print("Token decode error:", str(decode_error))
-                return jsonify({'error': 'Invalid token format'}), 401
-            
+            claims = verify_token(token)
+        except AuthError as e:
+            return jsonify({'error': str(e)}), 401
         except Exception as e:
-            print("General Exception:", str(e))
-            print("Exception type:", type(e).__name__)
+            logging.error(f"Authentication error: {type(e).__name__}: {str(e)}")
             return jsonify({'error': 'Authentication failed'}), 401
-    
-    return decorated_function
\ No newline at end of file
+
+        user_id = claims.get('sub') or claims.get('userid')
+        if not user_id:
+            return jsonify({'error': 'No user ID in token'}), 401
+
+        # Token is valid, user is authenticated
+        request.current_user = {
+            'id': user_id,
+            'userid': user_id  # Your session claim
+        }
+        return f(*args, **kwargs)
+
+    return decorated_function
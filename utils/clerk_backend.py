@@ -0,0 +1,122 @@
+"""Access to the Clerk user list.
+
+``HttpClerkBackend`` talks to Clerk's Backend API; ``FakeClerkBackend`` serves
+users from a JSON file (the same shape Clerk returns) so the admin pages and
+the user directory can be exercised offline. ``get_clerk_backend`` picks one
+from the environment:
+
+    CLERK_BACKEND=fake  CLERK_FAKE_USERS_FILE=path/to/users.json
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+import requests
+
+CLERK_API_URL = 'https://api.clerk.com/v1'
+
+# Clerk caps page size at 500
+CLERK_PAGE_SIZE = 500
+
+
+class ClerkAPIError(Exception):
+    """Raised when the Clerk API returns an error."""
+    pass
+
+
+def transform_user(user):
+    """Reduce a Clerk user object to the fields the admin UI uses."""
+    email = user['email_addresses'][0]['email_address'] if user.get('email_addresses') else None
+    return {
+        'id': user['id'],
+        'name': f"{user.get('first_name') or ''} {user.get('last_name') or ''}".strip(),
+        'email': email,
+        'role': (user.get('unsafe_metadata') or {}).get('role', 'user'),
+        'lastActive': user.get('last_active_at'),
+        'image': user.get('image_url'),
+        'clerkId': user['id'],
+        'createdAt': user.get('created_at')
+    }
+
+
+class HttpClerkBackend:
+    def __init__(self, secret_key, base_url=CLERK_API_URL, timeout=10):
+        self.secret_key = secret_key
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def list_users(self, limit=CLERK_PAGE_SIZE, offset=0):
+        response = requests.get(
+            f'{self.base_url}/users',
+            headers={'Authorization': f'Bearer {self.secret_key}'},
+            params={'limit': limit, 'offset': offset, 'order_by': '-created_at'},
+            timeout=self.timeout
+        )
+        if not response.ok:
+            raise ClerkAPIError(f"Clerk API error: {response.text}")
+        return response.json()
+
+
+class FakeClerkBackend:
+    """Serves Clerk-shaped users from a list or a JSON file."""
+
+    def __init__(self, users=None, users_file=None):
+        self.users = users
+        self.users_file = users_file
+
+    def list_users(self, limit=CLERK_PAGE_SIZE, offset=0):
+        users = self.users
+        if users is None:
+            with open(self.users_file) as f:
+                users = json.load(f)
+        users = sorted(users, key=lambda u: u.get('created_at') or 0, reverse=True)
+        return users[offset:offset + limit]
+
+
+def iter_all_users(backend, page_size=CLERK_PAGE_SIZE):
+    """Yield every user, walking Clerk's offset pagination."""
+    offset = 0
+    while True:
+        page = backend.list_users(limit=page_size, offset=offset)
+        yield from page
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+def get_clerk_backend():
+    if os.getenv('CLERK_BACKEND', 'http').lower() == 'fake':
+        return FakeClerkBackend(users_file=os.getenv('CLERK_FAKE_USERS_FILE'))
+    return HttpClerkBackend(os.getenv('CLERK_SECRET_KEY'))
+
+
+def verify_webhook(secret, headers, body, tolerance=300):
+    """Check the Svix signature Clerk puts on webhook requests.
+
+    ``secret`` is the endpoint's signing secret (``whsec_...``); ``body`` the raw
+    request body. Returns True if one of the signatures matches and the
+    timestamp is within ``tolerance`` seconds.
+    """
+    msg_id = headers.get('svix-id')
+    timestamp = headers.get('svix-timestamp')
+    signatures = headers.get('svix-signature', '')
+    if not (secret and msg_id and timestamp and signatures):
+        return False
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except ValueError:
+        return False
+
+    key = base64.b64decode(secret.split('_', 1)[1] if secret.startswith('whsec_') else secret)
+    signed = f"{msg_id}.{timestamp}.".encode('utf-8') + body
+    expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode('ascii')
+    for signature in signatures.split():
+        version, _, value = signature.partition(',')
+        if version == 'v1' and hmac.compare_digest(value, expected):
+            return True
+    return False
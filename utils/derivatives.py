@@ -0,0 +1,140 @@
+"""Downscaled image variants for listing pages.
+
+Every raster upload gets ``small`` and ``medium`` variants in WebP (and AVIF
+when Pillow was built with it) so galleries do not download full-resolution
+originals. Variants are stored in a content-addressed cache under
+``derivatives/<aa>/<sha256>_<variant>.<ext>`` in the storage backend:
+identical uploads share their variants, and a variant that already exists
+is never rendered again.
+
+Variants are normally produced by an ``image_derivatives`` job right after
+the upload; ``ensure_derivatives`` can also be called lazily on first
+request for uploads that predate the pipeline.
+"""
+
+import hashlib
+import os
+
+from bson import ObjectId
+from PIL import Image, ImageOps, features
+
+from database.userdatahandler import get_image_by_id, set_image_derivatives
+from utils.job_queue import register_handler
+from utils.storage import get_storage
+
+DERIVATIVES_JOB = 'image_derivatives'
+
+DERIVATIVES_DIR = 'derivatives'
+
+# Longest edge in pixels for each variant
+VARIANTS = {
+    'small': 320,
+    'medium': 960,
+}
+
+# Pillow format name and encoder options per output extension
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+try:
+    if features.check('avif'):
+        FORMATS['avif'] = ('AVIF', {'quality': 60})
+except Exception:
+    # Older Pillow releases do not know about the AVIF feature at all
+    pass
+
+# Extensions Pillow can decode without extra plugins
+SOURCE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def supports_derivatives(filename):
+    return filename.rsplit('.', 1)[-1].lower() in SOURCE_EXTENSIONS
+
+
+def file_sha256(path):
+    """Hash a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def derivative_path(content_hash, variant, ext):
+    """Storage key of a variant."""
+    return f"{DERIVATIVES_DIR}/{content_hash[:2]}/{content_hash}_{variant}.{ext}"
+
+
+def remove_derivatives(storage, content_hash):
+    """Delete every variant rendered for ``content_hash``."""
+    for variant in VARIANTS:
+        for ext in FORMATS:
+            storage.delete(derivative_path(content_hash, variant, ext))
+
+
+def render_variant(source, max_edge, dest_path, pil_format, options):
+    """Downscale ``source`` to fit ``max_edge`` and write it to the local file ``dest_path``."""
+    # Phone photos are stored sideways with an EXIF orientation tag that the
+    # variant does not keep, so rotate the pixels instead (returns a copy)
+    image = ImageOps.exif_transpose(source)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    image.save(dest_path, pil_format, **options)
+
+
+def generate_derivatives(source_path, storage, content_hash=None):
+    """Render any missing variants of the local file ``source_path``.
+
+    Returns ``(content_hash, variants)`` where ``variants`` maps
+    ``variant -> {ext: storage key}``.
+    """
+    content_hash = content_hash or file_sha256(source_path)
+    variants = {}
+    source = None
+    try:
+        for variant, max_edge in VARIANTS.items():
+            variants[variant] = {}
+            for ext, (pil_format, options) in FORMATS.items():
+                key = derivative_path(content_hash, variant, ext)
+                if not storage.exists(key):
+                    if source is None:
+                        source = Image.open(source_path)
+                        source.load()
+                    tmp_path = storage.temp_path()
+                    try:
+                        render_variant(source, max_edge, tmp_path, pil_format, options)
+                        storage.put_file(key, tmp_path, f'image/{ext}')
+                    finally:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                variants[variant][ext] = key
+    finally:
+        if source is not None:
+            source.close()
+    return content_hash, variants
+
+
+def ensure_derivatives(image, storage):
+    """Return the variants of an image document, generating them if missing."""
+    if image.get('variants'):
+        return image['variants']
+    if not supports_derivatives(image['filename']):
+        return {}
+    with storage.local_copy(image['filename']) as source_path:
+        content_hash, variants = generate_derivatives(source_path, storage, image.get('content_hash'))
+    set_image_derivatives(image['_id'], content_hash, variants)
+    return variants
+
+
+@register_handler(DERIVATIVES_JOB)
+def handle_derivatives_job(payload):
+    """Job handler: render variants and record them on the image document."""
+    image = get_image_by_id(ObjectId(payload['image_id']))
+    if image is None:
+        # The upload was deleted before we got to it
+        return
+    ensure_derivatives(image, get_storage())
@@ -0,0 +1,119 @@
+"""Background job runner.
+
+Jobs are stored in the MongoDB ``jobs`` collection (see
+``database/jobdatahandler.py``) so they survive restarts and can be picked up
+by any worker. Handlers are registered per job type with ``register_handler``
+and run either in a separate process (``python worker.py``) or in a daemon
+thread next to the development server. Recurring jobs are registered with
+``register_periodic`` and queued by whichever worker finds them due.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+
+from datetime import timedelta
+
+from database.jobdatahandler import (
+    claim_next_job,
+    complete_job,
+    fail_abandoned_jobs,
+    fail_job,
+    schedule_periodic_job,
+)
+
+HANDLERS = {}
+
+# job type -> interval between runs
+PERIODIC_JOBS = {}
+
+
+def register_handler(job_type, on_failure=None):
+    """Register the decorated function as the handler for ``job_type`` jobs.
+
+    ``on_failure(payload, error)`` is called once a job has used up all of its
+    retries.
+    """
+    def decorator(func):
+        HANDLERS[job_type] = (func, on_failure)
+        return func
+    return decorator
+
+
+def register_periodic(job_type, interval):
+    """Run ``job_type`` jobs every ``interval`` seconds."""
+    PERIODIC_JOBS[job_type] = timedelta(seconds=interval)
+
+
+def schedule_periodic_jobs():
+    for job_type, interval in PERIODIC_JOBS.items():
+        schedule_periodic_job(job_type, interval)
+
+
+def fail_abandoned():
+    """Fail jobs whose worker died on their last attempt and run their failure callbacks."""
+    for job in fail_abandoned_jobs():
+        logging.error(f"Job {job['_id']} ({job['type']}) failed: {job['last_error']}")
+        _, on_failure = HANDLERS.get(job['type'], (None, None))
+        if on_failure is not None:
+            try:
+                on_failure(job['payload'], RuntimeError(job['last_error']))
+            except Exception as e:
+                logging.error(f"Failure callback of job {job['_id']} failed: {str(e)}")
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def run_next_job(worker_id=None):
+    """Claim and run a single job. Returns False when the queue is empty."""
+    job = claim_next_job(worker_id or default_worker_id())
+    if job is None:
+        return False
+
+    handler, on_failure = HANDLERS.get(job['type'], (None, None))
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job type '{job['type']}'")
+        handler(job['payload'])
+    except Exception as e:
+        status = fail_job(job, e)
+        logging.error(f"Job {job['_id']} ({job['type']}) failed, now {status}: {str(e)}")
+        if status == 'failed' and on_failure is not None:
+            on_failure(job['payload'], e)
+    else:
+        complete_job(job['_id'])
+    return True
+
+
+def run_worker(poll_interval=1.0, stop_event=None):
+    """Process jobs until ``stop_event`` is set, sleeping while the queue is empty."""
+    worker_id = default_worker_id()
+    while stop_event is None or not stop_event.is_set():
+        try:
+            if run_next_job(worker_id):
+                continue
+            fail_abandoned()
+            schedule_periodic_jobs()
+        except Exception as e:
+            logging.error(f"Job worker error: {str(e)}")
+        if stop_event is not None:
+            stop_event.wait(poll_interval)
+        else:
+            time.sleep(poll_interval)
+
+
+def start_background_worker(poll_interval=1.0):
+    """Run the worker loop in a daemon thread and return its stop event."""
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_worker,
+        kwargs={'poll_interval': poll_interval, 'stop_event': stop_event},
+        name='beehive-job-worker',
+        daemon=True
+    )
+    thread.start()
+    return stop_event
@@ -0,0 +1,156 @@
+"""Cached JSON Web Key Set used to verify Clerk session tokens.
+
+Keys are fetched from Clerk once and kept in memory for ``JWKS_CACHE_TTL``
+seconds, then refreshed in the background; if Clerk cannot be reached the
+cached keys stay in use. A token signed with a key id we have not seen
+triggers an early refresh (Clerk rotated its keys), rate-limited so a flood
+of bogus tokens cannot turn into a flood of requests to Clerk.
+
+The key source is chosen from the environment:
+    CLERK_JWKS_FILE  path to a local JWKS document (tests, offline development)
+    CLERK_JWKS_URL   JWKS endpoint, e.g. https://<your-app>.clerk.accounts.dev/.well-known/jwks.json
+    otherwise        Clerk's Backend API (https://api.clerk.com/v1/jwks) with CLERK_SECRET_KEY
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+import jwt
+import requests
+
+CLERK_API_JWKS_URL = 'https://api.clerk.com/v1/jwks'
+
+
+class JWKSError(Exception):
+    """Raised when signing keys cannot be loaded or a key id is unknown."""
+    pass
+
+
+class JWKSCache:
+    """Thread-safe cache of signing keys by key id.
+
+    Once the TTL has passed, keys are refreshed in a background thread while
+    requests keep using the cached ones. A failed fetch (timeout, 5xx) keeps
+    the current keys and is retried with exponential backoff, so a short
+    Clerk outage does not log everyone out. Only a key id we do not know
+    makes a request wait for a fetch.
+    """
+
+    def __init__(self, fetch, ttl=3600, min_refresh_interval=30, retry_backoff=5, max_retry_backoff=300):
+        self._fetch = fetch
+        self._ttl = ttl
+        self._min_refresh_interval = min_refresh_interval
+        self._retry_backoff = retry_backoff
+        self._max_retry_backoff = max_retry_backoff
+        self._keys = {}
+        self._fetched_at = None
+        self._attempted_at = None
+        self._failures = 0
+        self._refresh_thread = None
+        # _lock guards the fields above; _refresh_lock allows one fetch at a time
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _may_fetch(self, now, min_interval=0):
+        """Whether a fetch may be attempted now (called with ``_lock`` held)."""
+        if self._attempted_at is None:
+            return True
+        wait = min_interval
+        if self._failures:
+            wait = max(wait, min(self._retry_backoff * 2 ** (self._failures - 1), self._max_retry_backoff))
+        return now - self._attempted_at >= wait
+
+    def _refresh(self):
+        """Fetch the key set; on failure the current keys are kept."""
+        with self._lock:
+            self._attempted_at = time.monotonic()
+        try:
+            jwks = self._fetch()
+            keys = {}
+            for jwk in jwks.get('keys', []):
+                if jwk.get('use', 'sig') != 'sig' or 'kid' not in jwk:
+                    continue
+                keys[jwk['kid']] = jwt.PyJWK.from_dict(jwk)
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+            raise JWKSError(f"Could not refresh signing keys: {str(e)}")
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            self._failures = 0
+
+    def _refresh_in_background(self):
+        try:
+            with self._refresh_lock:
+                self._refresh()
+        except JWKSError as e:
+            logging.warning(f"{str(e)}; still using the cached keys")
+
+    def get_signing_key(self, kid):
+        """Return the ``PyJWK`` for ``kid``, refreshing the key set if needed."""
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is not None:
+                now = time.monotonic()
+                expired = now - self._fetched_at > self._ttl
+                refreshing = self._refresh_thread is not None and self._refresh_thread.is_alive()
+                if expired and not refreshing and self._may_fetch(now):
+                    self._refresh_thread = threading.Thread(
+                        target=self._refresh_in_background, name='jwks-refresh', daemon=True
+                    )
+                    self._refresh_thread.start()
+                return key
+
+        # Unknown key id: Clerk rotated its keys, or nothing is loaded yet.
+        # Requests arriving meanwhile wait for the same fetch.
+        with self._refresh_lock:
+            with self._lock:
+                key = self._keys.get(kid)
+                if key is not None:
+                    return key
+                min_interval = self._min_refresh_interval if self._fetched_at is not None else 0
+                may_fetch = self._may_fetch(time.monotonic(), min_interval)
+            if may_fetch:
+                self._refresh()
+        with self._lock:
+            key = self._keys.get(kid)
+        if key is None:
+            raise JWKSError(f"Unknown signing key '{kid}'")
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = None
+            self._attempted_at = None
+            self._failures = 0
+
+
+def load_jwks_file(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def fetch_jwks_url(url, secret_key=None, timeout=5):
+    headers = {'Authorization': f'Bearer {secret_key}'} if secret_key else {}
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if not response.ok:
+        raise JWKSError(f"Could not fetch JWKS from {url}: {response.status_code}")
+    return response.json()
+
+
+def jwks_fetcher_from_env():
+    """Build the key set fetch function from the environment (see module docstring)."""
+    jwks_file = os.getenv('CLERK_JWKS_FILE')
+    if jwks_file:
+        return lambda: load_jwks_file(jwks_file)
+
+    jwks_url = os.getenv('CLERK_JWKS_URL')
+    if jwks_url:
+        return lambda: fetch_jwks_url(jwks_url)
+
+    return lambda: fetch_jwks_url(CLERK_API_JWKS_URL, os.getenv('CLERK_SECRET_KEY'))
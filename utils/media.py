@@ -0,0 +1,105 @@
+"""Serving stored media.
+
+``send_media`` is the single place where uploads, voice notes, variants and
+thumbnails are turned into HTTP responses:
+
+- Range requests (``206 Partial Content``) so audio players and PDF viewers
+  can seek without downloading the whole file.
+- Strong ETags and ``304 Not Modified`` on ``If-None-Match``. Content-addressed
+  keys use their SHA-256 as the ETag; other (legacy) files get one derived
+  from size and modification time.
+- ``Cache-Control: immutable`` for content-addressed keys, whose bytes never
+  change; other files are revalidated on every use.
+- Optional offload to the front web server, so Python workers never stream
+  file bytes themselves:
+
+      MEDIA_OFFLOAD         none (default), x-accel-redirect (nginx) or x-sendfile (Apache/lighttpd)
+      MEDIA_OFFLOAD_PREFIX  internal nginx location mapped to UPLOAD_FOLDER (default /internal-media/)
+
+  With ``x-accel-redirect`` nginx needs a matching internal location, e.g.::
+
+      location /internal-media/ {
+          internal;
+          alias /app/static/uploads/;
+      }
+
+  The app still answers ``If-None-Match`` itself; the web server sends the
+  body and handles ranges.
+
+With the S3 backend the response is a redirect to a presigned URL; S3 itself
+handles ranges and ETags, and content-addressed objects are uploaded with the
+immutable ``Cache-Control`` (see utils/storage.py).
+"""
+
+import os
+
+from flask import Response, abort, redirect, request, send_from_directory
+
+from utils.storage import IMMUTABLE_CACHE_CONTROL, StorageError, content_digest, content_type_for
+
+OFFLOAD_ACCEL = 'x-accel-redirect'
+OFFLOAD_SENDFILE = 'x-sendfile'
+OFFLOAD_MODES = {'none', OFFLOAD_ACCEL, OFFLOAD_SENDFILE}
+
+DEFAULT_OFFLOAD_PREFIX = '/internal-media/'
+
+# Files that may be replaced in place are revalidated with their ETag
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+def offload_mode(environ=os.environ):
+    mode = environ.get('MEDIA_OFFLOAD', 'none').lower()
+    if mode not in OFFLOAD_MODES:
+        raise ValueError(f"Unknown MEDIA_OFFLOAD '{mode}', expected one of {', '.join(sorted(OFFLOAD_MODES))}")
+    return mode
+
+
+def cache_control_for(key):
+    return IMMUTABLE_CACHE_CONTROL if content_digest(key) else REVALIDATE_CACHE_CONTROL
+
+
+def legacy_etag(path):
+    stat = os.stat(path)
+    return f'{stat.st_size:x}-{int(stat.st_mtime * 1000):x}'
+
+
+def _offload(path, key, etag, mode, prefix):
+    """An empty response telling the web server which file to send."""
+    response = Response(mimetype=content_type_for(key))
+    if mode == OFFLOAD_ACCEL:
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + key
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+    response.set_etag(etag)
+    # Answers If-None-Match with a 304; the body itself is left to the web server
+    return response.make_conditional(request)
+
+
+def send_media(storage, key, offload=None, offload_prefix=None):
+    """Respond with the stored file ``key`` (404 if it does not exist)."""
+    try:
+        local_path = storage.local_path(key)
+    except StorageError:
+        abort(404)
+
+    if local_path is None:
+        # Remote backend: the browser downloads straight from the bucket. The
+        # redirect can be reused for part of the presigned URL's lifetime.
+        response = redirect(storage.url(key))
+        response.headers['Cache-Control'] = f'private, max-age={storage.presign_expires // 2}'
+        return response
+
+    if not os.path.isfile(local_path):
+        abort(404)
+
+    etag = content_digest(key) or legacy_etag(local_path)
+    mode = offload or offload_mode()
+    if mode != 'none':
+        response = _offload(local_path, key, etag, mode, offload_prefix or os.getenv('MEDIA_OFFLOAD_PREFIX', DEFAULT_OFFLOAD_PREFIX))
+    else:
+        # conditional=True handles Range, If-Range and If-None-Match
+        response = send_from_directory(storage.root, key, conditional=True, etag=etag)
+        # Werkzeug only advertises ranges on range responses; players need it up front to seek
+        response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = cache_control_for(key)
+    return response
@@ -0,0 +1,88 @@
+"""Keyset (cursor) pagination helpers.
+
+Lists are ordered by a timestamp field with ``_id`` as a tie-breaker. A cursor
+is an opaque, URL-safe token holding the sort key of the last item returned;
+the next page is everything strictly after it. Unlike ``skip``/``offset``,
+the cost of fetching a page does not grow with how far the client has
+scrolled, as long as a compound index on the filter fields followed by
+``(<field>, _id)`` backs the query.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a ``limit`` query parameter, clamped to ``1..maximum``."""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(timestamp, object_id):
+    """Build an opaque cursor from the sort key of the last item on a page."""
+    payload = json.dumps({'t': timestamp.isoformat(), 'i': str(object_id)})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(timestamp, ObjectId)`` from a cursor, or raise ValueError."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['t']), ObjectId(payload['i'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def keyset_filter(field, cursor, descending=True):
+    """Mongo filter selecting the items that come after ``cursor``."""
+    timestamp, object_id = decode_cursor(cursor)
+    op = '$lt' if descending else '$gt'
+    return {
+        '$or': [
+            {field: {op: timestamp}},
+            {field: timestamp, '_id': {op: object_id}}
+        ]
+    }
+
+
+def keyset_sort(field, descending=True):
+    direction = -1 if descending else 1
+    return [(field, direction), ('_id', direction)]
+
+
+def paginate(collection, query, field, limit, cursor=None, descending=True, projection=None, max_time_ms=None):
+    """Fetch one page of ``collection``.
+
+    Returns ``(documents, next_cursor)``; ``next_cursor`` is None on the last
+    page. One extra document is read to know whether another page exists.
+    ``max_time_ms`` makes the server abort the query (raising
+    ``ExecutionTimeout``) instead of letting it run on.
+    """
+    if cursor:
+        query = {'$and': [query, keyset_filter(field, cursor, descending)]}
+    find = (
+        collection.find(query, projection)
+        .sort(keyset_sort(field, descending))
+        .limit(limit + 1)
+    )
+    if max_time_ms is not None:
+        find = find.max_time_ms(max_time_ms)
+    documents = list(find)
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(last[field], last['_id'])
+    return documents, next_cursor
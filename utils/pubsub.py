@@ -0,0 +1,161 @@
+"""In-process publish/subscribe for pushing events to open streams.
+
+Streaming endpoints (Server-Sent Events) subscribe to a channel and block on
+their subscription; writers publish an event on the channel after the write.
+Each subscription has a bounded queue, so a slow client can never make the
+publisher block or grow memory without limit: when its queue is full the
+subscription is marked as overflowed and the stream ends, and the client
+reconnects and catches up from the database using its last event id.
+
+The broker only reaches subscribers in the same process. With several worker
+processes, set ``PUBSUB_BACKEND=mongo``: every process then tails a MongoDB
+change stream on the watched collections and republishes inserts locally, so
+an event reaches subscribers regardless of which worker handled the write.
+Change streams need a replica set; if the server does not support them we
+fall back to publishing in-process.
+"""
+
+import logging
+import os
+import queue
+import threading
+from collections import defaultdict
+
+DEFAULT_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """A bounded queue of events for one listener on one channel."""
+
+    def __init__(self, broker, channel, maxsize=DEFAULT_QUEUE_SIZE):
+        self.broker = broker
+        self.channel = channel
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # The client is not keeping up; it will resync from the database
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Return the next event, or None if none arrived within ``timeout``."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Broker:
+    """Fan events out to every subscription on a channel within this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel, maxsize=DEFAULT_QUEUE_SIZE):
+        subscription = Subscription(self, channel, maxsize)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, event):
+        """Deliver ``event`` to the current subscribers of ``channel``; returns how many."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+        return len(subscriptions)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+
+_broker = Broker()
+
+# Collections whose inserts are delivered by a change stream relay
+_relayed_collections = set()
+
+
+def get_broker():
+    return _broker
+
+
+def publish(collection_name, channels, event):
+    """Publish an event caused by a write to ``collection_name``.
+
+    Skipped when a change stream relay already delivers inserts on that
+    collection, so subscribers do not get the event twice.
+    """
+    if collection_name in _relayed_collections:
+        return
+    for channel in channels:
+        _broker.publish(channel, event)
+
+
+def _relay(collection_name, stream, channels_for, format_event):
+    try:
+        with stream:
+            for change in stream:
+                try:
+                    document = change['fullDocument']
+                    event = format_event(document)
+                    for channel in channels_for(document):
+                        _broker.publish(channel, event)
+                except Exception as e:
+                    logging.error(f"Change stream relay error: {str(e)}")
+    except Exception as e:
+        logging.error(f"Change stream on '{collection_name}' closed, using in-process pub/sub: {str(e)}")
+    finally:
+        # Writers go back to publishing themselves
+        _relayed_collections.discard(collection_name)
+
+
+def watch_collection(collection, channels_for, format_event):
+    """Relay inserts on ``collection`` to the local broker via a change stream.
+
+    ``channels_for(document)`` returns the channels an inserted document is
+    published on and ``format_event(document)`` the event payload. Returns
+    False (and leaves in-process publishing in place) when change streams are
+    not available.
+    """
+    try:
+        # Opening the stream fails immediately on servers without change streams
+        stream = collection.watch([{'$match': {'operationType': 'insert'}}])
+    except Exception as e:
+        logging.warning(f"Change streams unavailable for '{collection.name}', using in-process pub/sub: {str(e)}")
+        return False
+
+    _relayed_collections.add(collection.name)
+    thread = threading.Thread(
+        target=_relay,
+        args=(collection.name, stream, channels_for, format_event),
+        name=f"change-stream-{collection.name}",
+        daemon=True
+    )
+    thread.start()
+    return True
+
+
+def use_change_streams():
+    return os.getenv('PUBSUB_BACKEND', 'memory').lower() == 'mongo'
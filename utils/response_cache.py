@@ -0,0 +1,248 @@
+"""Cache for read-heavy JSON GET endpoints.
+
+``cached_response`` memoizes the JSON body of a view per path and query
+string, and answers with an ``ETag`` so browsers revalidate with
+``If-None-Match`` and get a bodyless ``304`` when nothing changed.
+
+Entries are grouped in scopes (``uploads:<user_id>``, ``dashboard``,
+``users``). Each scope has a generation number that is part of the cache
+key; the write functions bump it (``invalidate``), which makes every entry
+of the scope unreachable at once without scanning keys. Entries also expire
+after ``RESPONSE_CACHE_TTL`` seconds, which bounds staleness for changes the
+app does not see (e.g. edits made directly in the database).
+
+Backends, chosen with ``RESPONSE_CACHE_BACKEND``:
+
+``memory`` (default)
+    An LRU with TTL per process. Scope generations are kept in MongoDB
+    (``database/cachegenerationdatahandler.py``), so a write in any process,
+    another gunicorn worker or the job worker, invalidates the entries of
+    every process; a cache hit costs one lookup by ``_id``.
+``redis``
+    Any Redis-compatible server at ``RESPONSE_CACHE_URL`` (needs the
+    ``redis`` package), shared by every process, so invalidation is
+    immediate everywhere.
+``none``
+    Disables caching (ETags are still sent).
+
+Only successful responses are cached, and ``cached_response`` must be
+applied inside ``require_auth`` so unauthenticated requests never reach it.
+"""
+
+import hashlib
+import json
+import itertools
+import logging
+import os
+import threading
+from functools import wraps
+
+from cachetools import TTLCache
+from flask import Response, request
+
+from database.cachegenerationdatahandler import bump_generation, get_generations
+
+DEFAULT_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+DEFAULT_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 2048))
+
+KEY_PREFIX = 'beehive:response:'
+
+# Browsers may keep responses but must revalidate them with the ETag every time
+CACHE_CONTROL = 'private, no-cache'
+
+
+class SharedGenerations:
+    """Scope generations in MongoDB, the same for every process."""
+
+    def get(self, scopes):
+        return get_generations(scopes)
+
+    def bump(self, scope):
+        bump_generation(scope)
+
+
+class LocalGenerations:
+    """Scope generations of this process only.
+
+    A generation is forgotten ``ttl`` seconds after it was set, once every
+    entry cached under the one before has expired; generations are never
+    reused, so forgetting one cannot make an outdated entry reachable again.
+    When more than ``max_scopes`` scopes are invalidated within ``ttl`` the
+    oldest is forgotten early, and the epoch moves on to drop all entries.
+    """
+
+    def __init__(self, max_scopes=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self._values = TTLCache(maxsize=max_scopes, ttl=ttl)
+        self._next = itertools.count(1)
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, scopes):
+        with self._lock:
+            return [f'{self._epoch}.{self._values.get(scope, 0)}' for scope in scopes]
+
+    def bump(self, scope):
+        with self._lock:
+            self._values.expire()
+            if scope not in self._values and self._values.currsize >= self._values.maxsize:
+                self._epoch += 1
+            self._values[scope] = next(self._next)
+
+
+class MemoryCache:
+    """LRU with TTL in this process; generations are local unless ``generations`` is given."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, generations=None):
+        self._entries = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._generations = generations or LocalGenerations(max_entries, ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+
+    def generations(self, scopes):
+        return self._generations.get(scopes)
+
+    def bump(self, scope):
+        self._generations.bump(scope)
+
+
+class RedisCache:
+    """Shared cache in a Redis-compatible server."""
+
+    def __init__(self, url, ttl=DEFAULT_TTL, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self.client.get(KEY_PREFIX + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(KEY_PREFIX + key, json.dumps(value), ex=self.ttl)
+
+    def generations(self, scopes):
+        values = self.client.mget([f'{KEY_PREFIX}gen:{scope}' for scope in scopes]) if scopes else []
+        return [int(value or 0) for value in values]
+
+    def bump(self, scope):
+        self.client.incr(f'{KEY_PREFIX}gen:{scope}')
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def generations(self, scopes):
+        return [0] * len(scopes)
+
+    def bump(self, scope):
+        pass
+
+
+def cache_from_env(environ=os.environ):
+    backend = environ.get('RESPONSE_CACHE_BACKEND', 'memory').lower()
+    ttl = int(environ.get('RESPONSE_CACHE_TTL', DEFAULT_TTL))
+    if backend == 'memory':
+        return MemoryCache(int(environ.get('RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)), ttl,
+                           generations=SharedGenerations())
+    if backend == 'redis':
+        return RedisCache(environ.get('RESPONSE_CACHE_URL', 'redis://localhost:6379/0'), ttl)
+    if backend == 'none':
+        return NullCache()
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND '{backend}'")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The response cache of this process, configured from the environment."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = cache_from_env()
+    return _cache
+
+
+def uploads_scope(user_id):
+    return f'uploads:{user_id}'
+
+
+DASHBOARD_SCOPE = 'dashboard'
+USERS_SCOPE = 'users'
+
+
+def invalidate(*scopes):
+    """Drop every cached response of ``scopes``. Never raises: a failed
+    invalidation must not fail the write that triggered it."""
+    cache = get_cache()
+    for scope in scopes:
+        try:
+            cache.bump(scope)
+        except Exception as e:
+            logging.error(f"Response cache invalidation of '{scope}' failed: {str(e)}")
+
+
+def body_etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def _respond(body, etag):
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    # 304 with no body when the browser already has this version
+    return response.make_conditional(request)
+
+
+def cached_response(scopes):
+    """Cache the JSON body of a GET view.
+
+    ``scopes(**view_args)`` returns the scopes the response depends on.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            scope_names = list(scopes(**kwargs))
+            try:
+                generations = cache.generations(scope_names)
+                key = '|'.join([request.full_path, *(f'{s}@{g}' for s, g in zip(scope_names, generations))])
+                entry = cache.get(key)
+            except Exception as e:
+                # A broken cache server degrades to uncached responses
+                logging.error(f"Response cache read failed: {str(e)}")
+                key, entry = None, None
+            if entry is not None:
+                return _respond(entry['body'].encode('utf-8'), entry['etag'])
+
+            response = view(*args, **kwargs)
+            if isinstance(response, tuple):
+                # Error responses and explicit status codes are passed through
+                return response
+            if response.status_code != 200 or response.mimetype != 'application/json':
+                return response
+            body = response.get_data()
+            etag = body_etag(body)
+            if key is not None:
+                try:
+                    cache.set(key, {'body': body.decode('utf-8'), 'etag': etag})
+                except Exception as e:
+                    logging.error(f"Response cache write failed: {str(e)}")
+            return _respond(body, etag)
+        return wrapper
+    return decorator
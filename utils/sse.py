@@ -0,0 +1,63 @@
+"""Server-Sent Events helpers.
+
+``event_stream`` turns a pub/sub subscription into the body of a
+``text/event-stream`` response. Streams end after ``max_duration`` seconds
+(or when the subscription overflows) so request workers are recycled; the
+browser's EventSource reconnects on its own and sends the id of the last
+event it received in the ``Last-Event-ID`` header, which the endpoint uses to
+replay what was missed.
+"""
+
+import json
+import time
+
+from flask import Response, stream_with_context
+
+HEARTBEAT_INTERVAL = 15
+MAX_STREAM_DURATION = 300
+RETRY_MS = 3000
+
+
+def format_sse(data, event=None, event_id=None):
+    """Encode one event in the text/event-stream wire format."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    payload = json.dumps(data, default=str)
+    lines.extend(f"data: {line}" for line in payload.splitlines())
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(subscription, backlog=(), event=None, event_id=None,
+                 heartbeat=HEARTBEAT_INTERVAL, max_duration=MAX_STREAM_DURATION):
+    """Yield ``backlog`` then live events from ``subscription`` as SSE frames.
+
+    ``event_id(data)`` gives the id sent with each event. The subscription is
+    closed when the generator finishes, including when the client disconnects.
+    """
+    event_id = event_id or (lambda data: None)
+    deadline = time.monotonic() + max_duration
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        for data in backlog:
+            yield format_sse(data, event, event_id(data))
+
+        while time.monotonic() < deadline and not subscription.overflowed:
+            data = subscription.get(timeout=heartbeat)
+            if data is None:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(data, event, event_id(data))
+    finally:
+        subscription.close()
+
+
+def sse_response(generator):
+    response = Response(stream_with_context(generator), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
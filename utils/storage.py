@@ -0,0 +1,278 @@
+"""Storage backends for uploaded media.
+
+Everything the app stores (uploads, voice notes, image variants, PDF
+thumbnails) is addressed by a key relative to the storage root, e.g.
+``blobs/ab/cd/<sha256>.png``. Two backends implement the same interface:
+
+``LocalStorage``
+    Files under a local directory (``static/uploads`` by default), served
+    through ``/media`` (see utils/media.py) or offloaded to the reverse proxy.
+``S3Storage``
+    An S3-compatible bucket (AWS S3, MinIO, ...). Uploads of more than
+    ``S3_MULTIPART_THRESHOLD`` bytes are sent as multipart uploads, and media
+    is handed to browsers as presigned URLs so the bytes never pass through
+    the app.
+
+``get_storage`` picks the backend from the environment:
+
+    STORAGE_BACKEND         local (default) or s3
+    UPLOAD_FOLDER           local root (default static/uploads)
+    S3_BUCKET               bucket name
+    S3_PREFIX               key prefix inside the bucket (default none)
+    S3_ENDPOINT_URL         endpoint of an S3-compatible service, e.g. http://localhost:9000 for MinIO
+    S3_REGION               region name
+    S3_PRESIGN_EXPIRES      lifetime of presigned URLs in seconds (default 3600)
+    S3_MULTIPART_THRESHOLD  size in bytes above which multipart upload is used (default 8 MiB)
+
+Credentials for S3 come from the usual AWS variables or config files.
+"""
+
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+from werkzeug.security import safe_join
+
+from utils.chunked_upload import copy_stream
+
+DEFAULT_UPLOAD_FOLDER = 'static/uploads'
+
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Keys that embed the SHA-256 of their content: blobs, image variants and the
+# thumbnails of blobs (see utils/blobstore.py, derivatives.py, thumbnails.py).
+# The bytes behind such a key never change.
+CONTENT_ADDRESSED_KEY = re.compile(
+    r'^(?:blobs|derivatives|thumbnails)/(?:[0-9a-f]{2}/)+(?P<digest>[0-9a-f]{64}(?:_[a-z0-9]+)?)\.[a-z0-9]+$'
+)
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class StorageError(Exception):
+    """Raised for invalid keys or failed storage operations."""
+    pass
+
+
+def content_type_for(key):
+    return mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+
+def content_digest(key):
+    """The content hash (plus variant suffix) embedded in ``key``, or None if the key is not content-addressed."""
+    match = CONTENT_ADDRESSED_KEY.match(key or '')
+    return match.group('digest') if match else None
+
+
+class LocalStorage:
+    """Keys are paths below ``root``."""
+
+    # Temporary files live inside the root so moving them into place is a rename
+    TMP_DIR = '.tmp'
+
+    def __init__(self, root=DEFAULT_UPLOAD_FOLDER, base_url='/media'):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise StorageError(f"Invalid storage key '{key}'")
+        return path
+
+    def local_path(self, key):
+        return self.path(key)
+
+    def temp_path(self):
+        tmp_dir = os.path.join(self.root, self.TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, f'{uuid.uuid4().hex}.part')
+
+    def put_stream(self, key, stream, content_type=None):
+        """Write a file-like stream to ``key``; returns the number of bytes written."""
+        tmp = self.temp_path()
+        try:
+            with open(tmp, 'wb') as out:
+                size = copy_stream(stream, out)
+            self.put_file(key, tmp, content_type)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return size
+
+    def put_file(self, key, path, content_type=None):
+        """Move the local file ``path`` to ``key``."""
+        dest = self.path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.move(path, dest)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key, expires=None):
+        return f'{self.base_url}/{key}'
+
+    @contextmanager
+    def local_copy(self, key):
+        yield self.path(key)
+
+
+class CountingReader:
+    """Wraps a stream and counts the bytes read from it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.count += len(chunk)
+        return chunk
+
+
+class S3Storage:
+    """Keys are object keys (below ``prefix``) in an S3-compatible bucket."""
+
+    def __init__(self, bucket, prefix='', client=None, endpoint_url=None, region=None,
+                 presign_expires=3600, multipart_threshold=MULTIPART_CHUNK_SIZE):
+        if client is None:
+            import boto3
+            client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.presign_expires = presign_expires
+        self.transfer_config = None
+        try:
+            from boto3.s3.transfer import TransferConfig
+            self.transfer_config = TransferConfig(
+                multipart_threshold=multipart_threshold,
+                multipart_chunksize=max(multipart_threshold, 5 * 1024 * 1024)
+            )
+        except ImportError:
+            pass
+
+    def object_key(self, key):
+        if not key or key.startswith('/') or '..' in key.split('/'):
+            raise StorageError(f"Invalid storage key '{key}'")
+        return self.prefix + key
+
+    def local_path(self, key):
+        return None
+
+    def temp_path(self):
+        fd, path = tempfile.mkstemp(suffix='.part')
+        os.close(fd)
+        return path
+
+    def _transfer_kwargs(self, key, content_type):
+        kwargs = {'ExtraArgs': {'ContentType': content_type or content_type_for(key)}}
+        if content_digest(key):
+            # Lets browsers and CDNs keep presigned downloads of immutable objects
+            kwargs['ExtraArgs']['CacheControl'] = IMMUTABLE_CACHE_CONTROL
+        if self.transfer_config is not None:
+            kwargs['Config'] = self.transfer_config
+        return kwargs
+
+    def put_stream(self, key, stream, content_type=None):
+        """Upload a file-like stream (multipart above the threshold); returns its size."""
+        reader = CountingReader(stream)
+        self.client.upload_fileobj(reader, self.bucket, self.object_key(key), **self._transfer_kwargs(key, content_type))
+        return reader.count
+
+    def put_file(self, key, path, content_type=None):
+        """Upload the local file ``path`` to ``key`` and remove it."""
+        self.client.upload_file(path, self.bucket, self.object_key(key), **self._transfer_kwargs(key, content_type))
+        os.remove(path)
+
+    def open(self, key):
+        """A streaming body; read it in chunks."""
+        return self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))['Body']
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except Exception as e:
+            error = getattr(e, 'response', {}).get('Error', {})
+            if error.get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head['ContentLength']
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+    def url(self, key, expires=None):
+        """A presigned GET URL the browser can fetch directly."""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self.object_key(key)},
+            ExpiresIn=expires or self.presign_expires
+        )
+
+    @contextmanager
+    def local_copy(self, key):
+        """Download ``key`` to a temporary file for code that needs a real path."""
+        path = self.temp_path()
+        try:
+            self.client.download_file(self.bucket, self.object_key(key), path)
+            yield path
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def storage_from_env(environ=os.environ):
+    backend = environ.get('STORAGE_BACKEND', 'local').lower()
+    if backend == 's3':
+        return S3Storage(
+            environ['S3_BUCKET'],
+            prefix=environ.get('S3_PREFIX', ''),
+            endpoint_url=environ.get('S3_ENDPOINT_URL') or None,
+            region=environ.get('S3_REGION') or None,
+            presign_expires=int(environ.get('S3_PRESIGN_EXPIRES', 3600)),
+            multipart_threshold=int(environ.get('S3_MULTIPART_THRESHOLD', MULTIPART_CHUNK_SIZE))
+        )
+    if backend == 'local':
+        return LocalStorage(environ.get('UPLOAD_FOLDER', DEFAULT_UPLOAD_FOLDER))
+    raise StorageError(f"Unknown STORAGE_BACKEND '{backend}'")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """The storage backend of this process, configured from the environment."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = storage_from_env()
+    return _storage
@@ -0,0 +1,95 @@
+"""PDF thumbnail rendering.
+
+Thumbnails are rendered off the request path by the job worker: the upload
+handler only enqueues a ``pdf_thumbnail`` job and marks the image as
+``pending``; until the job finishes, ``/thumbnails/<filename>`` serves a
+placeholder. Thumbnails are kept in the storage backend under
+``thumbnails/``.
+"""
+
+import os
+
+import fitz
+from bson import ObjectId
+from PIL import Image
+
+from database.userdatahandler import get_image_by_id, set_thumbnail_status
+from utils.blobstore import BLOBS_DIR, is_blob_path
+from utils.job_queue import register_handler
+from utils.storage import get_storage
+
+THUMBNAIL_JOB = 'pdf_thumbnail'
+
+THUMBNAILS_DIR = 'thumbnails'
+
+
+def thumbnail_filename(filename):
+    """Thumbnail path relative to the thumbnails folder.
+
+    Content-addressed uploads keep their shard directories
+    (``blobs/ab/cd/<hash>.pdf`` -> ``ab/cd/<hash>.jpg``), so identical PDFs
+    share one thumbnail.
+    """
+    if is_blob_path(filename):
+        filename = filename[len(BLOBS_DIR) + 1:]
+    base, ext = os.path.splitext(filename)
+    return base + '.jpg' if ext.lower() == '.pdf' else filename
+
+
+def thumbnail_key(filename):
+    """Storage key of the thumbnail of the upload stored at ``filename``."""
+    return f'{THUMBNAILS_DIR}/{thumbnail_filename(filename)}'
+
+
+def generate_pdf_thumbnail(storage, filename):
+    """Generate an image from the first page of a PDF using PyMuPDF."""
+    key = thumbnail_key(filename)
+    if storage.exists(key):
+        # Rendered already for an identical upload
+        return key
+
+    with storage.local_copy(filename) as pdf_path:
+        pdf_document = fitz.open(pdf_path)
+        try:
+            # select only the first page for the thumbnail
+            first_page = pdf_document.load_page(0)
+
+            zoom = 2  # Increase for higher resolution
+            mat = fitz.Matrix(zoom, zoom)
+            pix = first_page.get_pixmap(matrix=mat)
+        finally:
+            pdf_document.close()
+
+    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+    # Render to a temporary file so the placeholder is served until the JPEG is complete
+    tmp_path = storage.temp_path()
+    try:
+        image.save(tmp_path, 'JPEG')
+        storage.put_file(key, tmp_path, 'image/jpeg')
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return key
+
+
+def mark_thumbnail_failed(payload, error):
+    set_thumbnail_status(ObjectId(payload['image_id']), 'failed')
+
+
+@register_handler(THUMBNAIL_JOB, on_failure=mark_thumbnail_failed)
+def handle_pdf_thumbnail_job(payload):
+    """Job handler: render the thumbnail and record the outcome on the image document."""
+    image_id = ObjectId(payload['image_id'])
+    if get_image_by_id(image_id) is None:
+        # The upload was deleted before we got to it
+        return
+
+    set_thumbnail_status(image_id, 'processing')
+    try:
+        generate_pdf_thumbnail(get_storage(), payload['filename'])
+    except Exception:
+        set_thumbnail_status(image_id, 'pending')
+        raise
+    set_thumbnail_status(image_id, 'ready')
@@ -0,0 +1,23 @@
+"""Run Beehive background jobs (PDF thumbnails, voice notes, ...) in a separate process.
+
+Usage:
+    python worker.py
+
+Any number of workers can run against the same database; jobs are claimed
+atomically from the MongoDB ``jobs`` collection.
+"""
+
+import logging
+import os
+
+# Importing the handler modules registers them with the job queue
+import database.statsdatahandler  # noqa: F401
+import utils.audio  # noqa: F401
+import utils.chunked_upload  # noqa: F401
+import utils.derivatives  # noqa: F401
+import utils.thumbnails  # noqa: F401
+from utils.job_queue import run_worker
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    run_worker(poll_interval=float(os.getenv('JOB_POLL_INTERVAL', 1.0)))